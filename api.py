@@ -0,0 +1,145 @@
+"""
+API JSON read-only untuk data kurikulum.
+
+Semua data diambil dari snapshot kurikulum terkompilasi, jadi tidak ada
+workbook yang dibuka per request. Isi response hanya bergantung pada versi
+kurikulum, sehingga:
+
+- ETag (strong) = versi API + versi kurikulum; klien cukup revalidasi dan
+  mendapat 304 selama file kurikulum tidak berubah.
+- URL dengan ``?v=<versi>`` yang cocok dengan versi aktif di-cache lama
+  (``immutable``); versi yang sudah usang diarahkan ke URL versi terbaru.
+"""
+from flask import Blueprint, abort, current_app, jsonify, redirect, request, url_for
+
+from curriculum import CurriculumUnavailable, UnknownCurriculum
+
+# Naikkan kalau bentuk response berubah, supaya ETag lama tidak dianggap valid
+API_VERSION = "1"
+
+api = Blueprint("api", __name__, url_prefix="/api/v1")
+
+
+def get_snapshot():
+    # ?kurikulum=<id> memilih kurikulum; tanpa parameter = kurikulum default
+    try:
+        return current_app.extensions["curricula"].get(request.args.get("kurikulum") or None)
+    except UnknownCurriculum as e:
+        abort(404, description=str(e))
+    except CurriculumUnavailable:
+        abort(503, description="Data kurikulum sedang tidak bisa dibaca, coba beberapa saat lagi.")
+
+
+def get_course_snapshot(nama_matkul):
+    snapshot = get_snapshot()
+    if not snapshot.has_matkul(nama_matkul):
+        abort(404, description=f"Mata kuliah '{nama_matkul}' tidak ada di kurikulum")
+    return snapshot
+
+
+def versioned_json(snapshot, payload):
+    """Response JSON dengan ETag dan Cache-Control sesuai versi kurikulum"""
+    requested = request.args.get("v")
+    if requested and requested != snapshot.version:
+        args = dict(request.view_args, **request.args.to_dict())
+        args["v"] = snapshot.version
+        response = redirect(url_for(request.endpoint, **args))
+        response.cache_control.no_cache = True
+        return response
+
+    response = jsonify(dict(payload, version=snapshot.version))
+    response.set_etag(f"{API_VERSION}-{snapshot.version}")
+    response.cache_control.public = True
+    if requested:
+        response.cache_control.max_age = current_app.config["API_CACHE_MAX_AGE"]
+        response.cache_control.immutable = True
+    else:
+        # Tanpa versi di URL: selalu revalidasi (murah, cukup 304)
+        response.cache_control.no_cache = True
+    return response.make_conditional(request)
+
+
+@api.route("/curricula")
+def list_curricula():
+    # Daftar id saja (dari config), tidak memuat kurikulum yang belum dipakai
+    curricula = current_app.extensions["curricula"]
+    loaded = curricula.loaded()
+    return jsonify({
+        "default": curricula.default,
+        "curricula": [
+            {
+                "id": curriculum_id,
+                "label": curricula.label(curriculum_id),
+                "version": loaded[curriculum_id].version if curriculum_id in loaded else None,
+            }
+            for curriculum_id in curricula.ids()
+        ],
+    })
+
+
+@api.route("/courses")
+def list_courses():
+    snapshot = get_snapshot()
+    courses = [
+        {"nama": nama, "kode": snapshot.rps_data(nama)["kode_matkul"]}
+        for nama in snapshot.matkul_list()
+    ]
+    return versioned_json(snapshot, {"courses": courses})
+
+
+@api.route("/search")
+def search_courses():
+    query = request.args.get("q", "")
+    limit = request.args.get("limit", 10, type=int)
+    if limit < 1:
+        abort(400, description="limit minimal 1")
+    limit = min(limit, current_app.config["API_SEARCH_MAX_RESULTS"])
+    snapshot = get_snapshot()
+    return versioned_json(snapshot, {"query": query, "results": snapshot.search_index.search(query, limit)})
+
+
+@api.route("/courses/<nama_matkul>")
+def course_detail(nama_matkul):
+    snapshot = get_course_snapshot(nama_matkul)
+    data = snapshot.rps_data(nama_matkul)
+    return versioned_json(snapshot, {
+        "nama": nama_matkul,
+        "kode": data["kode_matkul"],
+        "semester": data["semester"],
+        "rumpun": data["rumpun"],
+        "sks": data["bobot_sks"],
+    })
+
+
+@api.route("/courses/<nama_matkul>/cpl")
+def course_cpl(nama_matkul):
+    snapshot = get_course_snapshot(nama_matkul)
+    return versioned_json(snapshot, {"nama": nama_matkul, **snapshot.cpl_cpmk_sub(nama_matkul)})
+
+
+def is_api_request():
+    """Request ke URL di bawah prefix API, termasuk yang tidak cocok dengan route mana pun"""
+    return request.path == api.url_prefix or request.path.startswith(api.url_prefix + "/")
+
+
+def api_error(error):
+    # Error API dalam JSON, bukan halaman error.html
+    response = jsonify({"error": error.description, "status": error.code})
+    response.status_code = error.code
+    return response
+
+
+# Didaftarkan per kode karena handler app (error.html) per kode lebih diutamakan
+# Flask daripada handler blueprint per kelas exception
+for _code in (400, 404, 405, 500, 503):
+    api.register_error_handler(_code, api_error)
+
+
+# Error routing (URL/method tidak cocok) terjadi sebelum request punya
+# blueprint, jadi handler blueprint di atas tidak terpanggil. 404 ditangani
+# handler 404 aplikasi (lihat app.py) lewat ``is_api_request``.
+@api.app_errorhandler(405)
+def method_not_allowed(error):
+    if is_api_request():
+        return api_error(error)
+    return error
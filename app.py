@@ -1,18 +1,39 @@
-from flask import Flask, render_template, request, send_file, redirect, url_for, abort, send_from_directory
-import openpyxl
+from flask import Blueprint, Flask, Response, current_app, g, has_request_context, jsonify, render_template, request, send_file, redirect, url_for, abort, send_from_directory
+import cProfile
+import functools
+import gc
+import hmac
 import os
 import io
-import xlsxwriter
+import hashlib
+import threading
+import time
+import tracemalloc
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from werkzeug.exceptions import HTTPException
 from werkzeug.utils import secure_filename
 from datetime import datetime
-from collections import defaultdict
-from xlsxwriter.utility import xl_rowcol_to_cell, xl_col_to_name
-import re
 import logging
-from logging.handlers import TimedRotatingFileHandler
+import re
+from api import api, api_error, is_api_request
+from curriculum import CurriculumRegistry, CurriculumUnavailable, UnknownCurriculum
+from engine import CurriculumSlice, Engine, SpooledSink, parse_course_file, resolve_dokumen, resolve_format
+from watcher import CurriculumWatcher, disable_watchers
+from history import GROUPS, HistoryStore, file_sha1
+from jsonlog import configure_logging, forking_workers
+from layout import (
+    DOCUMENT_FAMILIES, IMAGE_DATA, SheetPartCache, fingerprint, init_render_worker, preload_image,
+)
+from metrics import (
+    CONTENT_TYPE, MEMORY_BUCKETS, SIZE_BUCKETS, MemoryBudgetExceeded, Registry, begin_stages, end_stages,
+    server_timing, stage,
+)
+from preview import PreviewCache, build_preview
+from profiling import ARTIFACT_KINDS, ProfileStore
+from sheet_spec import LOGO_FILE
 # import string
 
-app = Flask(__name__)
 # Get the absolute path of the current directory
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 
@@ -21,340 +42,471 @@ LOG_FILE = os.path.join(BASE_DIR, "rps_generator.log")
 
 logger = logging.getLogger("RPSGenerator")
 
+# X-Request-ID dari proxy dipakai ulang kalau formatnya aman untuk log
+REQUEST_ID_PATTERN = re.compile(r"^[A-Za-z0-9._-]{1,64}$")
+
 # Folder untuk menyimpan data upload
 UPLOAD_FOLDER = os.path.join(BASE_DIR, "uploads")
-os.makedirs(UPLOAD_FOLDER, exist_ok=True)
-app.config["UPLOAD_FOLDER"] = UPLOAD_FOLDER
 
 # Path ke Excel Template daftar matkul
 EXCEL_FILE = os.path.join(BASE_DIR, "data", "Final Template Kurikulum 2025.xlsx")
 
-SHEET_MATKUL = "9. Susunan Mata Kuliah"
-SHEET_CPL = "2. CPL Prodi"
-SHEET_CPMK = "12.2. list CPMK"
-SHEET_SUBCPMK = "15. Pemetaan MK-CPMK-Su"
+TEMPLATE_RUBRIK_FILE = os.path.join(BASE_DIR, "data", "Template Rubrik.xlsx")
+
+bp = Blueprint("rps", __name__)
+
+
+def create_app(config=None):
+    """Application factory: set config dan state aplikasi, lalu warm-up"""
+    app = Flask(__name__)
+    app.config["UPLOAD_FOLDER"] = UPLOAD_FOLDER
+    app.config["CURRICULUM_FILE"] = EXCEL_FILE
+
+    # Workbook hasil generate ditulis ke spooled temp file: tetap di RAM selama
+    # ukurannya di bawah batas ini, lalu otomatis pindah ke file temp di disk
+    app.config["OUTPUT_SPOOL_MAX_SIZE"] = 512 * 1024
+
+    # Cache XML per worksheet (key = sidik jari input sheet), dipakai ulang
+    # antar request supaya sheet yang tidak berubah tidak dirender ulang
+    app.config["SHEET_CACHE_MAX_BYTES"] = 32 * 1024 * 1024
+
+    # Jumlah proses untuk mode ZIP (satu workbook per dokumen, dirender paralel).
+    # 0/1 = render berurutan di proses web. Tiap proses punya cache sheet
+    # sendiri sebesar SHEET_CACHE_MAX_BYTES / jumlah proses
+    app.config["RENDER_PROCESSES"] = os.cpu_count() or 1
+
+    # True: tanggal dokumen diambil dari waktu upload (kalau tidak diisi
+    # manual) dan metadata workbook/ZIP dibuat tetap, jadi input sama = byte
+    # output sama. Mengubah Tgl. PENETAPAN dan tanggal KTR yang terlihat
+    # pengguna, jadi default-nya tetap tanggal hari ini
+    app.config["DETERMINISTIC_OUTPUT"] = False
+
+    # Muat aset dan kurikulum saat aplikasi dibuat, bukan saat request pertama
+    app.config["WARM_UP"] = True
+
+    # File kurikulum yang gagal dibaca tidak dicoba ulang sebelum backoff ini
+    # lewat (dobel tiap gagal, maksimal RETRY_MAX); request memakai snapshot terakhir
+    app.config["CURRICULUM_RETRY_MIN_SECONDS"] = 5
+    app.config["CURRICULUM_RETRY_MAX_SECONDS"] = 300
+
+    # Beberapa kurikulum dalam satu deployment, dipilih lewat field "kurikulum":
+    # {id: {"file": path, "label": ..., "sheet_matkul": ..., "sheet_subcpmk": ...,
+    #       "matkul_rows": (3, 69), "subcpmk_rows": (3, 272)}}.
+    # None = satu kurikulum "default" dari CURRICULUM_FILE. Kurikulum dibaca saat
+    # pertama dipakai; lewat CURRICULUM_CACHE_MAX_BYTES yang lama tidak dipakai dilepas
+    app.config["CURRICULA"] = None
+    app.config["DEFAULT_CURRICULUM"] = None
+    app.config["CURRICULUM_CACHE_MAX_BYTES"] = 256 * 1024 * 1024
+
+    # Watcher latar belakang yang memuat ulang kurikulum saat file di data/
+    # diganti (tanpa restart): "auto" (inotify, fallback polling), "inotify",
+    # "poll", atau None = file diperiksa di tiap request seperti biasa
+    app.config["CURRICULUM_WATCH"] = "auto"
+    app.config["CURRICULUM_WATCH_INTERVAL"] = 2.0
+
+    # Pool proses render dan watcher kurikulum tidak dimulai oleh create_app
+    # (import, benchmark, dan test tidak memulai thread/proses). True = dimulai
+    # saat request pertama di tiap proses yang melayani request, jadi master
+    # pre-fork tidak punya thread watcher saat fork (dipakai wsgi.py dan app.run)
+    app.config["BACKGROUND_SERVICES"] = False
+
+    # Cache-Control max-age (detik) untuk /api/v1/... dengan ?v=<versi kurikulum>
+    app.config["API_CACHE_MAX_AGE"] = 365 * 24 * 3600
+    app.config["API_SEARCH_MAX_RESULTS"] = 50
+
+    # HTML /preview per sidik jari (hash upload + baris kurikulum mata kuliah)
+    app.config["PREVIEW_CACHE_MAX_BYTES"] = 8 * 1024 * 1024
+
+    # Log JSON per baris, ditulis thread latar belakang dan dirotasi harian.
+    # None = tanpa file log; "{pid}" di nama file = satu file per worker
+    app.config["LOG_FILE"] = LOG_FILE
+    app.config["LOG_LEVEL"] = "INFO"
+    app.config["LOG_ROTATE_WHEN"] = "midnight"
+    app.config["LOG_BACKUP_COUNT"] = 14
+
+    # Token operator untuk endpoint /admin/* dan profiling per request.
+    # None = fitur admin mati
+    app.config["ADMIN_TOKEN"] = os.environ.get("RPS_ADMIN_TOKEN")
+    app.config["PROFILE_FOLDER"] = os.path.join(BASE_DIR, "profiles")
+    app.config["PROFILE_KEEP"] = 50
+
+    # tracemalloc: puncak alokasi per tahap jadi metrik. Mahal (render bisa
+    # 2-3x lebih lambat), jadi default mati. MEMORY_BUDGET_BYTES membatasi
+    # alokasi per request (otomatis menyalakan tracing); None = tanpa batas
+    app.config["MEMORY_TRACING"] = False
+    app.config["MEMORY_BUDGET_BYTES"] = None
+
+    # Riwayat generate (SQLite) untuk query latency di /admin/history; None = mati
+    app.config["HISTORY_DB"] = os.path.join(BASE_DIR, "rps_history.sqlite3")
+    app.config["HISTORY_MAX_RESULTS"] = 1000
+
+    if config:
+        app.config.update(config)
+
+    configure_logging(
+        logger, app.config["LOG_FILE"], level=app.config["LOG_LEVEL"],
+        when=app.config["LOG_ROTATE_WHEN"], backup_count=app.config["LOG_BACKUP_COUNT"],
+        filters=[RequestIdFilter()],
+    )
+    if (app.config["MEMORY_TRACING"] or app.config["MEMORY_BUDGET_BYTES"]) and not tracemalloc.is_tracing():
+        tracemalloc.start()
+    os.makedirs(app.config["UPLOAD_FOLDER"], exist_ok=True)
+    app.extensions["sheet_part_cache"] = SheetPartCache(app.config["SHEET_CACHE_MAX_BYTES"])
+    app.extensions["preview_cache"] = PreviewCache(app.config["PREVIEW_CACHE_MAX_BYTES"])
+    # Pool proses render dibuat saat request ZIP pertama (butuh config app)
+    app.extensions["engine"] = Engine(
+        cache=app.extensions["sheet_part_cache"], executor=functools.partial(get_render_pool, app),
+    )
+    app.extensions["curricula"] = CurriculumRegistry(
+        app.config["CURRICULA"] or {"default": {"file": app.config["CURRICULUM_FILE"]}},
+        default=app.config["DEFAULT_CURRICULUM"],
+        max_bytes=app.config["CURRICULUM_CACHE_MAX_BYTES"],
+        retry_min=app.config["CURRICULUM_RETRY_MIN_SECONDS"],
+        retry_max=app.config["CURRICULUM_RETRY_MAX_SECONDS"],
+    )
+    # Store kurikulum default (warm-up, /readyz, metrik degraded)
+    app.extensions["curriculum"] = app.extensions["curricula"].store()
+    app.extensions["curricula"].listeners.append(
+        functools.partial(invalidate_changed_courses, app.extensions["sheet_part_cache"])
+    )
+    app.extensions["metrics"] = create_metrics(app)
+    app.extensions["profiles"] = ProfileStore(app.config["PROFILE_FOLDER"], app.config["PROFILE_KEEP"])
+    app.extensions["history"] = HistoryStore(app.config["HISTORY_DB"]) if app.config["HISTORY_DB"] else None
+    app.register_blueprint(bp)
+    app.register_blueprint(api)
+
+    if app.config["WARM_UP"]:
+        warm_up(app)
+    # Diisi start_services
+    app.extensions["curriculum_watcher"] = None
+    app.extensions["services_pid"] = None
+    return app
+
+
+_services_lock = threading.Lock()
+
+
+def start_services(app):
+    """Mulai pool proses render lalu watcher kurikulum, sekali per proses.
+
+    Pool dibuat lebih dulu supaya workernya di-fork sebelum thread watcher ada.
+    """
+    if app.extensions["services_pid"] == os.getpid():
+        return
+    with _services_lock:
+        if app.extensions["services_pid"] == os.getpid():
+            return
+        get_render_pool(app)
+        watcher = app.extensions["curriculum_watcher"]
+        if app.config["CURRICULUM_WATCH"] and not (watcher and watcher.running):
+            # Watcher warisan proses induk (threadnya tidak ikut ter-fork) dipakai lagi
+            if watcher is None:
+                watcher = CurriculumWatcher(
+                    app.extensions["curricula"], app.config["CURRICULUM_WATCH"],
+                    app.config["CURRICULUM_WATCH_INTERVAL"],
+                )
+            app.extensions["curriculum_watcher"] = watcher.start()
+        app.extensions["services_pid"] = os.getpid()
 
-MATKUL_START_ROW = 3
-MATKUL_END_ROW = 69
-MATKUL_COLUMN = "D"
 
+class RequestIdFilter(logging.Filter):
+    """Tambahkan ``request_id`` ke record yang dibuat di dalam request"""
+
+    def filter(self, record):
+        if has_request_context() and "request_id" in g:
+            record.request_id = g.request_id
+        return True
+
+
+def invalidate_changed_courses(sheet_cache, previous, snapshot):
+    """Buang sheet cache milik mata kuliah yang barisnya berubah di kurikulum baru.
+
+    Key cache sudah berupa sidik jari input, jadi sheet lama tidak mungkin
+    terpakai untuk data baru; yang dibuang di sini hanya entri yang tidak akan
+    pernah kena hit lagi, supaya tempatnya dipakai mata kuliah lain.
+    """
+    changed = previous.changed_courses(snapshot)
+    if not changed:
+        return
+    removed = sheet_cache.invalidate(
+        lambda tag: tag is not None and tag[0] == previous.path and tag[1] in changed
+    )
+    logger.info("Sheet cache diinvalidasi", extra={
+        "curriculum": previous.path, "version": snapshot.version,
+        "changed_courses": sorted(changed), "removed_sheets": removed,
+    })
+
+
+def warm_up(app):
+    """Muat logo, Template Rubrik, dan kurikulum default terkompilasi ke memori.
+
+    Dengan server pre-fork (mis. ``gunicorn --preload wsgi:app``) fungsi ini
+    jalan sekali di proses master, dan worker hasil fork berbagi memori
+    tersebut secara copy-on-write.
+    """
+    load_assets(app)
 
-def get_matkul_list():
-    """Read matkul list from Excel file"""
     try:
-        wb = openpyxl.load_workbook(EXCEL_FILE, data_only=True)
-        sheet = wb[SHEET_MATKUL]
-        matkul = [
-            sheet[f"{MATKUL_COLUMN}{row}"].value
-            for row in range(MATKUL_START_ROW, MATKUL_END_ROW + 1)
-            if sheet[f"{MATKUL_COLUMN}{row}"].value is not None
+        app.extensions["curricula"].get()
+    except CurriculumUnavailable:
+        # Sudah dicatat CurriculumStore; /readyz tetap 503 sampai file bisa dibaca
+        pass
+
+    # Objek hasil warm-up dipindah ke generasi permanen GC, supaya GC di
+    # worker tidak menyentuh (dan menyalin) halaman memori milik master
+    gc.freeze()
+
+
+def load_assets(app):
+    """Baca logo dan Template Rubrik ke memori"""
+    preload_image(LOGO_FILE)
+
+    with open(TEMPLATE_RUBRIK_FILE, "rb") as fh:
+        data = fh.read()
+    app.extensions["template_rubrik"] = (data, hashlib.sha1(data).hexdigest())
+
+
+def assets_loaded(app):
+    return LOGO_FILE in IMAGE_DATA and "template_rubrik" in app.extensions
+
+
+def create_metrics(app):
+    """Registry metrik aplikasi untuk endpoint /metrics"""
+    registry = Registry()
+    registry.counter(
+        "rps_http_requests_total", "Jumlah request HTTP per endpoint", ("endpoint", "method", "status"),
+    )
+    registry.histogram(
+        "rps_http_request_duration_seconds",
+        "Durasi request sampai response dibuat (tanpa waktu kirim body)", ("endpoint",),
+    )
+    registry.histogram(
+        "rps_stage_duration_seconds",
+        "Durasi per tahap generate (kurikulum, upload, render per dokumen, close)", ("stage",),
+    )
+    registry.histogram(
+        "rps_output_size_bytes", "Ukuran file hasil /download-rps", ("format",), buckets=SIZE_BUCKETS,
+    )
+    registry.histogram(
+        "rps_stage_peak_memory_bytes", "Puncak alokasi Python per tahap (hanya kalau tracemalloc aktif)",
+        ("stage",), buckets=MEMORY_BUCKETS,
+    )
+    registry.gauge(
+        "rps_generations_in_flight", "Request /download-rps yang sedang diproses atau menunggu di proses ini",
+    )
+    registry.counter(
+        "rps_memory_budget_exceeded_total", "Request yang dihentikan karena melewati MEMORY_BUDGET_BYTES",
+    )
+
+    @registry.collector
+    def cache_metrics():
+        sheet_cache = app.extensions["sheet_part_cache"]
+        curriculum = app.extensions["curriculum"]
+        curricula = app.extensions["curricula"]
+        watcher = app.extensions.get("curriculum_watcher")
+        sheet_lookups = sheet_cache.hits + sheet_cache.misses
+        curriculum_lookups = curriculum.hits + curriculum.compiles
+        return [
+            ("rps_sheet_cache_hits_total", "counter", "Sheet yang diambil dari SheetPartCache",
+             [({}, sheet_cache.hits)]),
+            ("rps_sheet_cache_misses_total", "counter", "Sheet yang dirender karena belum ada di cache",
+             [({}, sheet_cache.misses)]),
+            ("rps_sheet_cache_hit_ratio", "gauge", "Rasio hit SheetPartCache sejak proses mulai",
+             [({}, sheet_cache.hits / sheet_lookups if sheet_lookups else 0)]),
+            ("rps_sheet_cache_bytes", "gauge", "Total ukuran XML di SheetPartCache",
+             [({}, sheet_cache.size)]),
+            ("rps_sheet_cache_entries", "gauge", "Jumlah sheet di SheetPartCache",
+             [({}, len(sheet_cache))]),
+            ("rps_sheet_cache_invalidations_total", "counter",
+             "Sheet yang dibuang dari cache karena baris kurikulum mata kuliahnya berubah",
+             [({}, sheet_cache.invalidations)]),
+            ("rps_curriculum_compiles_total", "counter", "Berapa kali workbook kurikulum dibaca ulang",
+             [({}, curriculum.compiles)]),
+            ("rps_curriculum_hit_ratio", "gauge", "Rasio snapshot kurikulum yang dipakai ulang",
+             [({}, curriculum.hits / curriculum_lookups if curriculum_lookups else 0)]),
+            ("rps_curriculum_degraded", "gauge",
+             "1 kalau file kurikulum terbaru gagal dimuat (snapshot lama dipakai atau tidak ada)",
+             [({}, int(curriculum.degraded))]),
+            ("rps_curriculum_load_failures_total", "counter", "Percobaan memuat kurikulum yang gagal",
+             [({}, curriculum.load_failures)]),
+            ("rps_curriculum_stale_served_total", "counter",
+             "Request yang dilayani snapshot kurikulum lama karena file terbaru gagal dimuat",
+             [({}, curriculum.stale)]),
+            ("rps_curricula_loaded", "gauge", "Jumlah kurikulum yang sedang termuat di memori",
+             [({}, len(curricula.loaded()))]),
+            ("rps_curricula_bytes", "gauge", "Perkiraan ukuran snapshot kurikulum yang termuat",
+             [({}, curricula.size)]),
+            ("rps_curricula_evictions_total", "counter",
+             "Snapshot kurikulum yang dilepas karena CURRICULUM_CACHE_MAX_BYTES",
+             [({}, curricula.evictions)]),
+            ("rps_curriculum_reloads_total", "counter", "Snapshot kurikulum yang ditukar oleh watcher",
+             [({}, watcher.reloads if watcher else 0)]),
         ]
-        wb.close()
-        return matkul
-    except Exception as e:
-        # Log error agar tahu penyebabnya, tapi program tetap jalan
-        print(f"[WARNING] Gagal membaca file Excel List MK: {EXCEL_FILE} -> {e}")
 
-def get_rps_data(nama_matkul):
+    return registry
+
+
+_render_pool = None
+_render_pool_lock = threading.Lock()
+
+
+def _reset_render_pool():
+    # Pool milik proses induk tidak bisa dipakai di proses hasil fork
+    global _render_pool, _render_pool_lock
+    _render_pool = None
+    _render_pool_lock = threading.Lock()
+
+
+os.register_at_fork(after_in_child=_reset_render_pool)
+
+
+def init_render_process(cache_max_bytes):
+    # Worker render tidak melayani request: watcher warisan induk dihentikan
+    disable_watchers()
+    init_render_worker(cache_max_bytes)
+
+
+def get_render_pool(app=None):
+    """ProcessPoolExecutor untuk mode ZIP, dibuat saat pertama dipakai"""
+    global _render_pool
+    app = app or current_app
+    processes = app.config["RENDER_PROCESSES"]
+    if processes <= 1:
+        return None
+    with _render_pool_lock:
+        if _render_pool is not None and _render_pool._broken:
+            # Ada worker yang mati (OOM killer, SIGKILL); pool tidak bisa dipakai lagi
+            logger.warning("Pool proses render rusak, dibuat ulang", extra={"error": str(_render_pool._broken)})
+            _render_pool.shutdown(wait=False, cancel_futures=True)
+            _render_pool = None
+        if _render_pool is None:
+            workers = min(processes, len(DOCUMENT_FAMILIES))
+            pool = ProcessPoolExecutor(
+                max_workers=workers,
+                initializer=init_render_process,
+                # Semua worker berbagi satu batas SHEET_CACHE_MAX_BYTES
+                initargs=(app.config["SHEET_CACHE_MAX_BYTES"] // workers,),
+            )
+            # Dengan start method fork semua worker dibuat saat submit pertama;
+            # dipaksa di sini supaya worker tidak memulai listener log sendiri
+            with forking_workers():
+                pool.submit(int).result()
+            _render_pool = pool
+    return _render_pool
+
+
+def require_admin(token):
+    """Abort kalau ``token`` bukan ADMIN_TOKEN (404 kalau fitur admin tidak aktif)"""
+    expected = current_app.config["ADMIN_TOKEN"]
+    if not expected:
+        abort(404, description="Fitur admin tidak aktif")
+    if not token or not hmac.compare_digest(token.encode(), expected.encode()):
+        abort(403, description="Token admin tidak valid")
+
+
+def profile_on_request(view):
+    """Jalankan view di bawah cProfile kalau request membawa token profiling.
+
+    Token dikirim lewat header ``X-Profile-Token`` atau parameter ``profile``;
+    artefaknya disimpan di PROFILE_FOLDER dan id-nya dikembalikan di header
+    ``X-Profile-Id``.
+    """
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        token = request.headers.get("X-Profile-Token") or request.values.get("profile")
+        if not token:
+            return view(*args, **kwargs)
+        require_admin(token)
+
+        # Render dijalankan di proses ini (tanpa process pool dan tanpa cache
+        # sheet) supaya ikut terprofil
+        g.profiling = True
+        profiler = cProfile.Profile()
+        start = time.perf_counter()
+        status = 500
+        try:
+            response = profiler.runcall(view, *args, **kwargs)
+            status = response.status_code
+        except HTTPException as e:
+            status = e.code
+            raise
+        finally:
+            profile_id = current_app.extensions["profiles"].save(profiler, g.request_id, {
+                "endpoint": request.path,
+                "matkul": request.form.get("nama_matkul"),
+                "tahun": request.form.get("tahun"),
+                "format": request.form.get("format", "xlsx"),
+                "status": status,
+                "duration_ms": round((time.perf_counter() - start) * 1000, 1),
+                "sheet_cache_bypassed": True,
+            })
+            logger.info("profiled", extra={"profile_id": profile_id, "status": status})
+        response.headers["X-Profile-Id"] = profile_id
+        return response
+    return wrapper
+
+
+def selected_curriculum():
+    """Id kurikulum dari field/parameter "kurikulum" request ini (None = default)"""
+    if has_request_context():
+        return request.values.get("kurikulum") or None
+    return None
+
+
+def get_curriculum():
+    """Snapshot kurikulum yang dipilih request (dikompilasi ulang kalau file berubah).
+
+    Kalau file terbaru gagal dibaca, yang dikembalikan snapshot terakhir yang
+    valid; CurriculumUnavailable kalau belum pernah ada yang berhasil dimuat,
+    UnknownCurriculum kalau id kurikulum tidak terdaftar.
+    """
+    return current_app.extensions["curricula"].get(selected_curriculum())
+
+
+def get_matkul_list():
+    """Read matkul list from Excel file"""
     try:
-        wb = openpyxl.load_workbook(EXCEL_FILE, data_only=True)
-        sheet = wb[SHEET_MATKUL]
-
-        result = {
-            "kode_matkul": None,
-            "semester": None,
-            "rumpun": None,
-            "bobot_sks": None
-        }
+        return get_curriculum().matkul_list()
+    except CurriculumUnavailable:
+        # Sudah dicatat CurriculumStore; halaman tetap tampil dengan daftar kosong
+        return []
+    except UnknownCurriculum as e:
+        abort(404, description=str(e))
 
-        for row in range(MATKUL_START_ROW, MATKUL_END_ROW + 1):
-            matkul_name = sheet[f"D{row}"].value  # cari nama matkul di kolom D
-            if matkul_name and str(matkul_name).strip().lower() == str(nama_matkul).strip().lower():
-                result["kode_matkul"] = str(int(sheet[f"C{row}"].value))
-                result["semester"] = sheet[f"N{row}"].value
-                result["rumpun"] = sheet[f"O{row}"].value
-                result["bobot_sks"] = sheet[f"E{row}"].value
-                break  # berhenti setelah ketemu
-
-        wb.close()
-        return result
-    except Exception as e:
-        # Log error agar tahu penyebabnya, tapi program tetap jalan
-        print(f"[WARNING] Gagal membaca file Excel RPS data: {EXCEL_FILE} -> {e}")
+def get_rps_data(nama_matkul):
+    return get_curriculum().rps_data(nama_matkul)
 
 def get_cpl_cpmk_sub_list(nama_matkul):
     """Ambil daftar CPL, CPMK, dan SubCPMK berdasarkan nama matkul"""
-    try:
-        wb = openpyxl.load_workbook(EXCEL_FILE, data_only=True)
-        sheet = wb[SHEET_SUBCPMK]
-
-        cpls_kode, cpls_desc = [], []
-        cpmks_kode, cpmks_desc = [], []
-        subcpmks_kode, subcpmks_desc = [], []
-
-        for row in range(3, 273):  # B3:F272 + H:I
-            mk = sheet[f"B{row}"].value
-            if mk and mk.strip().lower() == nama_matkul.strip().lower():
-                # ambil CPL
-                cpl_kode = sheet[f"H{row}"].value
-                cpl_desc = sheet[f"I{row}"].value
-                if cpl_kode: cpls_kode.append(str(cpl_kode))
-                if cpl_desc: cpls_desc.append(str(cpl_desc))
-
-                # ambil CPMK
-                cpmk_kode = sheet[f"C{row}"].value
-                cpmk_desc = sheet[f"D{row}"].value
-                if cpmk_kode: cpmks_kode.append(str(cpmk_kode))
-                if cpmk_desc: cpmks_desc.append(str(cpmk_desc))
-
-                # ambil SubCPMK
-                subcpmk_kode = sheet[f"E{row}"].value
-                subcpmk_desc = sheet[f"F{row}"].value
-                if subcpmk_kode: subcpmks_kode.append(str(subcpmk_kode))
-                if subcpmk_desc: subcpmks_desc.append(str(subcpmk_desc))
-
-        wb.close()
-        return {
-            "cpl_kode": cpls_kode,
-            "cpl_desc": cpls_desc,
-            "cpmk_kode": cpmks_kode,
-            "cpmk_desc": cpmks_desc,
-            "subcpmk_kode": subcpmks_kode,
-            "subcpmk_desc": subcpmks_desc,
-        }
-    except Exception as e:
-        # Log error agar tahu penyebabnya, tapi program tetap jalan
-        print(f"[WARNING] Gagal membaca file Excel Sub CPMK: {EXCEL_FILE} -> {e}")
+    return get_curriculum().cpl_cpmk_sub(nama_matkul)
+
+def get_upload_path(nama_matkul, tahun):
+    """Path absolut file upload data_[matkul]_[tahun].xlsx"""
+    return os.path.join(current_app.config["UPLOAD_FOLDER"], f"data_{nama_matkul}_{tahun}.xlsx")
+
+def get_document_date(nama_matkul, tahun, tanggal=None):
+    """Tanggal dokumen (Tgl. PENETAPAN RPS dan tanggal tanda tangan KTR).
+
+    Urutan: input ``tanggal`` (YYYY-MM-DD), lalu waktu upload file data kalau
+    DETERMINISTIC_OUTPUT aktif. None berarti pakai tanggal hari ini.
+    """
+    if tanggal:
+        try:
+            return datetime.strptime(tanggal, "%Y-%m-%d")
+        except ValueError:
+            raise ValueError(f"Format tanggal '{tanggal}' tidak valid, gunakan YYYY-MM-DD")
+    if current_app.config["DETERMINISTIC_OUTPUT"]:
+        try:
+            return datetime.fromtimestamp(os.path.getmtime(get_upload_path(nama_matkul, tahun)))
+        except OSError:
+            return None
+    return None
 
 def get_matkul_data(nama_matkul, tahun):
     """Ambil semua data terkait matkul dari file data_[matkul]_[tahun].xlsx"""
-    # filename = f"uploads/data_{nama_matkul}_{tahun}.xlsx"
-    # wb = openpyxl.load_workbook(filename, data_only=True)
-
-    # Use absolute path
-    filename = os.path.join(UPLOAD_FOLDER, f"data_{nama_matkul}_{tahun}.xlsx")
-    
-    try:
-        wb = openpyxl.load_workbook(filename, data_only=True)
-    except FileNotFoundError:
-        raise ValueError(f"File '{filename}' tidak ditemukan")
-    except Exception as e:
-        raise ValueError(f"Error membuka file '{filename}': {str(e)}")
-    
-    sheet_name = nama_matkul.split()[0]
-    if sheet_name not in wb.sheetnames:
-        wb.close()
-        raise ValueError(f"Sheet '{nama_matkul}' tidak ditemukan dalam {filename}")
-
-    sheet = wb[sheet_name]
-
-    # pustaka, tim, syarat
-    pustaka_utama, pustaka_pendukung, team_teaching, nik, matkul_syarat = [], [], [], [], []
-
-    # Pertemuan
-    minggu_ke, subcpmk_weekly, indikator, kriteria, kriteria_numbered, materi, bobot, pustaka_weekly = [], [], [], [], [], [], [], []
-    materi_non_uts_uas, materi_non_uts_uas_numbered, materi_weekly_numbered = [], [], []
-
-    # Kelas
-    kelas, jml_mhs, hari, tempat, tahun_ajar = [], [], [], [], []
-
-    # CPL/CPMK/subCPMK bobot
-    cpl_bobot, cpmk_bobot, subcpmk_bobot, total_bobot = [], [], [], []
-
-    # iterasi baris mulai baris ke-2
-    for row in sheet.iter_rows(min_row=2, values_only=True):
-        # A:E
-        col_a, col_b, col_c, col_d, col_e = row[0:5]
-        # G:M (kolom 6-11, total 6 kolom)
-        col_g, col_h, col_i, col_j, col_k, col_l, col_m = row[6:13]
-        # O:Q (kolom 14-16, total 3 kolom)
-        col_o, col_p, col_q = row[14:17]
-        # Y
-        col_y = row[24]
-        # AA:AE
-        col_aa, col_ab, col_ac, col_ad, col_ae = row[26:31]
-
-        if col_a: pustaka_utama.append(str(col_a))
-        if col_b: pustaka_pendukung.append(str(col_b))
-        if col_c: team_teaching.append(str(col_c))
-        if col_d: nik.append(str(col_d))
-        if col_e: matkul_syarat.append(str(col_e))
-
-        if col_g: minggu_ke.append(str(col_g))
-        if col_h: subcpmk_weekly.append(str(col_h))
-        if col_i: indikator.append(str(col_i))
-        if col_j: kriteria.append(str(col_j))
-        if col_k: materi.append(str(col_k))
-        if col_l is None:
-            # skip (jangan append, supaya tidak bikin array kepanjangan)
-            continue
-        elif str(col_l).strip() == "-":
-            bobot.append("0")
-        else:
-            bobot.append(str(col_l))
-        if col_m: pustaka_weekly.append(str(col_m))
-
-        if col_o: cpl_bobot.append(str(col_o))
-        if col_p: cpmk_bobot.append(str(col_p))
-        if col_q: subcpmk_bobot.append(str(col_q))
-        if col_y: total_bobot.append(str(col_y))
-
-        if col_aa: kelas.append(str(col_aa))
-        if col_ab: jml_mhs.append(str(col_ab))
-        if col_ac: hari.append(str(col_ac))
-        if col_ad: tempat.append(str(col_ad))
-        if col_ae: tahun_ajar.append(str(col_ae))
-
-    wb.close()
-
-    # --- Olahan materi ---
-    exclude_keywords = ["Evaluasi UTS", "Evaluasi UAS", "Proyek Akhir"]
-
-    # Filter materi, buang yang mengandung kata di exclude_keywords
-    materi_non_uts_uas = [m for m in materi if not any(kw in str(m) for kw in exclude_keywords)]
-
-    # Tambahkan numbering untuk materi non-UTS/UAS
-    materi_non_uts_uas_numbered = [f"{i+1}. {m}" for i, m in enumerate(materi_non_uts_uas)]
-
-    # Numbering untuk semua materi, tapi jangan loncati index
-    materi_weekly_numbered = []
-    counter = 1
-    for m in materi:
-        if any(kw in str(m) for kw in exclude_keywords):
-            materi_weekly_numbered.append(m)  # tampilkan apa adanya, tanpa nomor
-        else:
-            materi_weekly_numbered.append(f"{counter}. {m}")
-            counter += 1  # hanya naik kalau materi bukan evaluasi
-
-    # --- Olahan kriteria (penomoran per jenis) ---
-    kriteria_numbered = []
-    counter_map = {}  # simpan hitungan per jenis
-    for k in kriteria:
-        if not k: 
-            continue
-        if "Evaluasi UTS" in k or "Evaluasi UAS" in k:
-            kriteria_numbered.append(k)
-            continue
-        if ":" in k:
-            jenis, isi = k.split(":", 1)
-            jenis = jenis.strip()
-            counter_map[jenis] = counter_map.get(jenis, 0) + 1
-            kriteria_numbered.append(f"{jenis} {counter_map[jenis]}:{isi.strip()}")
-        else:
-            kriteria_numbered.append(k)
-
-    # --- Rubrik ---
-    def extract_rubrik(tag):
-        """Cari subcpmk dari weekly jika kriteria mengandung [tag]"""
-        return list({subcpmk_weekly[i] for i, k in enumerate(kriteria) if k and f"[{tag}]" in k})
-
-    rubrik_SP1_subcpmk = extract_rubrik("SP1")
-    rubrik_H1_subcpmk = extract_rubrik("H1")
-    rubrik_H2_subcpmk = extract_rubrik("H2")
-    rubrik_H3_subcpmk = extract_rubrik("H3")
-    rubrik_A1_subcpmk = extract_rubrik("A1")
-    rubrik_A2_subcpmk = extract_rubrik("A2")
-    rubrik_A3_subcpmk = extract_rubrik("A3")
-
-    # fungsi lookup subcpmk → CPL
-    def map_to_cpl(subcpmk_list):
-        mapped = []
-        for sc in subcpmk_list:
-            if sc in subcpmk_bobot:
-                idx = subcpmk_bobot.index(sc)
-                if idx < len(cpl_bobot):
-                    mapped.append(cpl_bobot[idx])
-        return mapped
-
-    rubrik_SP1_cpl = map_to_cpl(rubrik_SP1_subcpmk)
-    rubrik_H1_cpl = map_to_cpl(rubrik_H1_subcpmk)
-    rubrik_H2_cpl = map_to_cpl(rubrik_H2_subcpmk)
-    rubrik_H3_cpl = map_to_cpl(rubrik_H3_subcpmk)
-    rubrik_A1_cpl = map_to_cpl(rubrik_A1_subcpmk)
-    rubrik_A2_cpl = map_to_cpl(rubrik_A2_subcpmk)
-    rubrik_A3_cpl = map_to_cpl(rubrik_A3_subcpmk)
-
-    def nomor_indikator(subcpmk_weekly, subcpmk_bobot, indikator):
-        exclude_keywords = ["Evaluasi UTS", "Evaluasi UAS"]
-
-        # counter untuk setiap subcpmk
-        subcpmk_counter = {k: 0 for k in subcpmk_bobot}
-        indikator_numbered = []
-
-        for sub, ind in zip(subcpmk_weekly, indikator):
-            if not ind:
-                indikator_numbered.append("")
-            elif any(kw in str(ind) for kw in exclude_keywords):
-                indikator_numbered.append(ind)  # tampilkan apa adanya
-            else:
-                if sub in subcpmk_bobot:
-                    idx = subcpmk_bobot.index(sub) + 1  # index di subcpmk_bobot (mulai dari 1)
-                    subcpmk_counter[sub] += 1           # urutan keberapa dalam subcpmk
-                    nomor = f"{idx}.{subcpmk_counter[sub]}"
-                    indikator_numbered.append(f"{nomor} {ind}")
-                else:
-                    indikator_numbered.append(ind)  # fallback kalau sub tidak ada di bobot
-        return indikator_numbered
-    
-    # --- Olahan indikator dengan nomor per subcpmk ---
-    indikator_numbered = nomor_indikator(subcpmk_weekly, subcpmk_bobot, indikator)
-
-    bobot_dict = defaultdict(int)
-    for i_cpmk, i_bobot in zip(cpmk_bobot, total_bobot):
-        bobot_dict[i_cpmk] += int(float(i_bobot))
-
-    seen = []
-    bobot_per_cpmk = []
-    for cpmk in cpmk_bobot:
-        if cpmk not in seen:
-            seen.append(cpmk)
-            bobot_per_cpmk.append(bobot_dict[cpmk])
-
-    return {
-        "pustaka_utama": pustaka_utama,
-        "pustaka_pendukung": pustaka_pendukung,
-        "team_teaching": team_teaching,
-        "nik": nik,
-        "matkul_syarat": matkul_syarat,
-        "minggu_ke": minggu_ke,
-        "subcpmk_weekly": subcpmk_weekly,
-        "indikator": indikator,
-        "indikator_numbered": indikator_numbered,
-        "materi": materi,
-        "bobot": bobot,
-        "pustaka_weekly": pustaka_weekly,
-        "kelas": kelas,
-        "jml_mhs": jml_mhs,
-        "hari": hari,
-        "tempat": tempat,
-        "tahun_ajar": tahun_ajar,
-        "materi_non_uts_uas": materi_non_uts_uas,
-        "materi_non_uts_uas_numbered": materi_non_uts_uas_numbered,
-        "materi_weekly_numbered": materi_weekly_numbered,
-        "kriteria": kriteria,
-        "kriteria_numbered": kriteria_numbered,
-        "cpl_bobot": cpl_bobot,
-        "cpmk_bobot": cpmk_bobot,
-        "bobot_per_cpmk": bobot_per_cpmk,
-        "subcpmk_bobot": subcpmk_bobot,
-        "total_bobot": total_bobot,
-        "rubrik_SP1_subcpmk": rubrik_SP1_subcpmk,
-        "rubrik_SP1_cpl": rubrik_SP1_cpl,
-        "rubrik_H1_subcpmk": rubrik_H1_subcpmk,
-        "rubrik_H1_cpl": rubrik_H1_cpl,
-        "rubrik_H2_subcpmk": rubrik_H2_subcpmk,
-        "rubrik_H2_cpl": rubrik_H2_cpl,
-        "rubrik_H3_subcpmk": rubrik_H3_subcpmk,
-        "rubrik_H3_cpl": rubrik_H3_cpl,
-        "rubrik_A1_subcpmk": rubrik_A1_subcpmk,
-        "rubrik_A1_cpl": rubrik_A1_cpl,
-        "rubrik_A2_subcpmk": rubrik_A2_subcpmk,
-        "rubrik_A2_cpl": rubrik_A2_cpl,
-        "rubrik_A3_subcpmk": rubrik_A3_subcpmk,
-        "rubrik_A3_cpl": rubrik_A3_cpl,
-    }
+    return parse_course_file(get_upload_path(nama_matkul, tahun), nama_matkul)
 
-@app.route("/", methods=["GET", "POST"])
+@bp.route("/", methods=["GET", "POST"])
 def index():
     matkul_list = get_matkul_list()
     selected_matkul = None
@@ -372,41 +524,70 @@ def index():
                 safe_name = secure_filename(file.filename)
                 ext = os.path.splitext(safe_name)[1]  # ambil ekstensi
                 new_filename = f"data_{selected_matkul}_{tahun}{ext}"
-                save_path = os.path.join(app.config["UPLOAD_FOLDER"], new_filename)
+                save_path = os.path.join(current_app.config["UPLOAD_FOLDER"], new_filename)
                 file.save(save_path)
                 uploaded_file = new_filename  # <-- simpan nama file
 
+    curricula = current_app.extensions["curricula"]
     return render_template(
         "index.html",
+        curricula=[(curriculum_id, curricula.label(curriculum_id)) for curriculum_id in curricula.ids()],
+        selected_curriculum=selected_curriculum() or curricula.default,
         matkul_list=matkul_list,
         selected_matkul=selected_matkul,
         tahun=tahun,
         uploaded_file=uploaded_file,  # <-- kirim ke template
+        dokumen_list=DOCUMENT_FAMILIES,
     )
 
 
-@app.route("/download-rps", methods=["POST"])
+@bp.route("/download-rps", methods=["POST"])
+@profile_on_request
 def download_rps():
     matkul = request.form.get("nama_matkul")
     tahun = request.form.get("tahun") or str(datetime.now().year)
+    if not matkul:
+        abort(400, description="Nama mata kuliah wajib diisi")
 
-    # cpl_cpmk_sub = get_cpl_cpmk_sub_list(matkul)
-    # matkul_data = get_matkul_data(matkul,tahun)
-    # rps_data = get_rps_data(matkul)
+    try:
+        # Checkbox "dokumen" (kosong = semua dokumen) dan format "xlsx"/"zip"
+        dokumen = resolve_dokumen(request.form.getlist("dokumen"))
+        output_format = resolve_format(request.form.get("format", "xlsx"))
+    except ValueError as e:
+        abort(400, description=str(e))
+
+    # Dicatat ke riwayat generate saat response selesai dibuat (lihat record_request_metrics)
+    g.generation = {"matkul": matkul, "tahun": tahun, "format": output_format, "dokumen": dokumen}
+    kurikulum = selected_curriculum() or current_app.extensions["curricula"].default
 
     try:
         # Log the attempt
-        logger.info(f"Attempting to generate RPS for {matkul} ({tahun})")
+        logger.info(f"Attempting to generate RPS for {matkul} ({tahun}, kurikulum {kurikulum})")
 
-        cpl_cpmk_sub = get_cpl_cpmk_sub_list(matkul)
-        logger.info(f"Successfully retrieved CPL/CPMK/SubCPMK data")
+        with stage("curriculum"):
+            # Satu snapshot untuk seluruh request, meski kurikulum dimuat ulang di tengah jalan
+            curriculum = CurriculumSlice.from_curriculum(get_curriculum(), matkul)
+        logger.info(f"Successfully retrieved curriculum data")
 
-        matkul_data = get_matkul_data(matkul, tahun)
+        with stage("upload"):
+            matkul_data = get_matkul_data(matkul, tahun)
         logger.info(f"Successfully retrieved matkul data")
+        g.generation.update(
+            weeks=len(matkul_data["minggu_ke"]),
+            subcpmk=len(dict.fromkeys(matkul_data["subcpmk_bobot"])),
+            cpl=len(dict.fromkeys(matkul_data["cpl_bobot"])),
+        )
 
-        rps_data = get_rps_data(matkul)
-        logger.info(f"Successfully retrieved RPS data")
+        # Tanggal dokumen tetap (input/waktu upload) => output deterministik
+        today = get_document_date(matkul, tahun, request.form.get("tanggal"))
 
+    except MemoryBudgetExceeded as e:
+        memory_budget_exceeded(e)
+    except CurriculumUnavailable as e:
+        logger.error(f"Curriculum unavailable: {e}")
+        abort(503, description="Data kurikulum sedang tidak bisa dibaca, coba beberapa saat lagi.")
+    except UnknownCurriculum as e:
+        abort(404, description=str(e))
     except FileNotFoundError as e:
         logger.error(f"File not found: {e}")
         abort(404, description=f"File data untuk mata kuliah '{matkul}' tahun {tahun} tidak ditemukan. Pastikan file sudah diupload.")
@@ -414,1449 +595,427 @@ def download_rps():
         logger.error(f"Data error: {e}")
         abort(400, description=str(e))
     except Exception as e:
-        logger.error(f"Unexpected error: {e}")
+        logger.exception(f"Unexpected error: {e}")
         abort(500, description=f"Terjadi kesalahan sistem: {str(e)}")
 
+    try:
+        # Sheet dirender urut baris (constant_memory) ke spooled temp file
+        result = current_app.extensions["engine"].generate(
+            SpooledSink(current_app.config["OUTPUT_SPOOL_MAX_SIZE"]), matkul, tahun, matkul_data, curriculum,
+            today=today, dokumen=dokumen, output_format=output_format,
+            # Request yang diprofil merender semua sheet di proses ini, tanpa
+            # cache sheet, supaya loop plan/render benar-benar terukur
+            parallel=not g.get("profiling"), use_cache=not g.get("profiling"),
+        )
+    except MemoryBudgetExceeded as e:
+        memory_budget_exceeded(e)
+    except ValueError as e:
+        logger.error(f"Data error: {e}")
+        abort(400, description=str(e))
+    except Exception as e:
+        logger.exception(f"Error generating Excel file: {e}")
+        abort(500, description=f"Terjadi kesalahan saat membuat file Excel: {str(e)}")
+    current_app.extensions["metrics"]["rps_output_size_bytes"].observe(result.size, format=output_format)
+    g.generation["output_bytes"] = result.size
+
+    # File dikirim bertahap per chunk; temp file dihapus saat response ditutup
+    output = result.output
+    response = send_file(output, as_attachment=True, download_name=result.filename, mimetype=result.mimetype)
+    response.content_length = result.size
+    response.call_on_close(output.close)
+
+    # Satu record per file yang dibuat, untuk analisis kapasitas
+    logger.info("generated", extra={
+        "matkul": matkul,
+        "tahun": tahun,
+        "kurikulum": kurikulum,
+        "format": output_format,
+        "dokumen": dokumen,
+        "size": result.size,
+        "duration_ms": round((time.perf_counter() - g.request_start) * 1000, 1),
+        "stages": {name: round(seconds * 1000, 1) for name, seconds in g.stage_timings.items()},
+        "peak_memory": g.stage_timings.peaks or None,
+    })
+    return response
+
+
+def memory_budget_exceeded(error):
+    """Gagalkan request dengan 413 alih-alih membiarkan worker kehabisan memori"""
+    logger.warning("memory budget exceeded", extra={"used": error.used, "budget": error.budget})
+    current_app.extensions["metrics"]["rps_memory_budget_exceeded_total"].inc()
+    abort(413, description=f"Dokumen terlalu besar untuk diproses: {error}")
+
+@bp.route("/preview")
+def preview_rps():
+    """Preview HTML isi RPS dari file upload, tanpa membangun workbook"""
+    matkul = request.args.get("nama_matkul")
+    tahun = request.args.get("tahun") or str(datetime.now().year)
     if not matkul:
         abort(400, description="Nama mata kuliah wajib diisi")
 
-    
     try:
-        output = io.BytesIO()
-        workbook = xlsxwriter.Workbook(output, {"in_memory": True})
-        worksheet = workbook.add_worksheet("RPS")
-
-        # Atur ukuran kolom
-        worksheet.set_column("A:A", 5)        # Kolom A kecil
-        worksheet.set_column("B:B", 18)       # Kolom B - L agak besar (2x normal)
-        worksheet.set_column("C:C", 36)       # Kolom B - L agak besar (2x normal)
-        worksheet.set_column("D:L", 18)       # Kolom B - L agak besar (2x normal)
-
-        # Format header dengan background hitam, font putih, center
-        header_small = workbook.add_format({
-            "align": "center",
-            "valign": "vcenter",
-            "font_name": "Tahoma",
-            "font_size": 12,
-            "border": 1,
-            "bold": True,
-            "font_color": "white",
-            "bg_color": "black",
-            "text_wrap": True
-        })
-
-        header_big = workbook.add_format({
-            "font_name": "Tahoma",
-            "font_size": 28,
-            "border": 1,
-            "bold": True,
-            "align": "center",
-            "font_color": "white",
-            "bg_color": "black",
-            "valign": "vcenter"
-        })
-
-        header_medium = workbook.add_format({
-            "font_name": "Tahoma",
-            "font_size": 18,
-            "border": 1,
-            "bold": True,
-            "align": "center",
-            "font_color": "white",
-            "bg_color": "black",
-            "valign": "vcenter"
-        })
-
-        # Format judul: bg abu + font hitam
-        title_format = workbook.add_format({
-            "font_name": "Tahoma",
-            "font_size": 12,
-            "border": 1,
-            "align": "center",
-            "valign": "vcenter",
-            "bold": True,
-            "font_color": "black",
-            "text_wrap": True,
-            "bg_color": "#C0C0C0"  # abu-abu
-        })
-
-        # Format judul: bg abu + font hitam
-        title_format_green = workbook.add_format({
-            "font_name": "Tahoma",
-            "font_size": 12,
-            "border": 1,
-            "align": "center",
-            "valign": "vcenter",
-            "bold": True,
-            "font_color": "black",
-            "text_wrap": True,
-            "bg_color": "green"  # abu-abu
-        })
-
-        title_cpl_format = workbook.add_format({
-            "font_name": "Tahoma",
-            "font_size": 12,
-            "border": 1,
-            "align": "left",
-            "valign": "vcenter",
-            "bold": True,
-            "font_color": "black",
-            "bg_color": "#C0C0C0"  # abu-abu
-        })
-
-        title_porto_format = workbook.add_format({
-            "font_name": "Tahoma",
-            "font_size": 9,
-            "border": 1,
-            "align": "center",
-            "valign": "vcenter",
-            "bold": True,
-            "font_color": "black",
-            "text_wrap": True,
-            "bg_color": "yellow"  # abu-abu
-        })
-
-        title_threshold_format = workbook.add_format({
-            "font_name": "Tahoma",
-            "font_size": 9,
-            "border": 1,
-            "align": "center",
-            "valign": "vcenter",
-            "bold": True,
-            "font_color": "black",
-            "text_wrap": True,
-            "bg_color": "yellow",
-            "num_format": "0%" # abu-abu
-        })
-
-        text_porto_format = workbook.add_format({
-            "font_name": "Tahoma",
-            "font_size": 8,
-            "border": 1,
-            "align": "center",
-            "valign": "vcenter",
-            "text_wrap": True,
-            "font_color": "black"
-        })
-
-        title_korelasi_format = workbook.add_format({
-            "font_name": "Tahoma",
-            "font_size": 12,
-            "border": 1,
-            "align": "center",
-            "valign": "vcenter",
-            "bold": True,
-            "font_color": "black",
-            "text_wrap": True
-        })
-
-        title_kontrak_format = workbook.add_format({
-            "font_name": "Tahoma",
-            "font_size": 12,
-            "border": 1,
-            "align": "left",
-            "valign": "vcenter",
-            "bold": True,
-            "font_color": "black",
-            "text_wrap": True
-        })
-
-        # Format text
-        text_format = workbook.add_format({
-            "font_name": "Tahoma",
-            "font_size": 12,
-            "border": 1,
-            "align": "center",
-            "valign": "vcenter",
-            "text_wrap": True,
-            "font_color": "black"
-        })
-
-        # Format text
-        text_ttd_format = workbook.add_format({
-            "font_name": "Tahoma",
-            "font_size": 12,
-            "align": "center",
-            "valign": "vcenter",
-            "text_wrap": True,
-            "font_color": "black"
-        })
-
-        # Format text
-        text_cpl_format = workbook.add_format({
-            "font_name": "Tahoma",
-            "font_size": 12,
-            "border": 1,
-            "align": "left",
-            "valign": "vcenter",
-            "font_color": "black",
-            "text_wrap": True
-        })
-
-        # Format text
-        text_otorisasi_format = workbook.add_format({
-            "font_name": "Tahoma",
-            "font_size": 12,
-            "border": 1,
-            "align": "center",
-            "valign": "bottom",
-            "font_color": "black"
-        })
-
-        date_format = workbook.add_format({
-            "font_name": "Tahoma",
-            "font_size": 12,
-            "align": "center",
-            "valign": "vcenter",
-            "border": 1,
-            "num_format": "dd-mm-yyyy"
-        })
-
-        percent_format_bold = workbook.add_format({
-            "font_name": "Tahoma",
-            "font_size": 12,
-            "border": 1,
-            "align": "center",
-            "valign": "vcenter",
-            "bold": True,
-            "font_color": "black",
-            "text_wrap": True,
-            "num_format": "0%"
-        })
-
-        percent_format_bold_fill = workbook.add_format({
-            "font_name": "Tahoma",
-            "font_size": 12,
-            "border": 1,
-            "align": "center",
-            "valign": "vcenter",
-            "bold": True,
-            "font_color": "black",
-            "text_wrap": True,
-            "num_format": "0%",
-            "bg_color": "#C0C0C0"
-        })
-
-        percent_format = workbook.add_format({
-            "font_name": "Tahoma",
-            "font_size": 12,
-            "border": 1,
-            "align": "center",
-            "valign": "vcenter",
-            "font_color": "black",
-            "text_wrap": True,
-            "num_format": "0%"
-        })
-
-        # Header
-        # Tambahkan logo
-        # Set tinggi baris header (sedikit lebih tinggi dari normal)
-        worksheet.set_row(1, 22)  # baris 2
-        worksheet.set_row(2, 22)  # baris 3
-        worksheet.set_row(3, 22)  # baris 4
-        worksheet.set_row(4, 26)  # baris 5
-        worksheet.merge_range("B2:B5", "", header_medium)
-        worksheet.insert_image("B2", "data/logo.png", {
-            "x_scale": 1.5,  # perkecil jika perlu
-            "y_scale": 1.5,
-            "x_offset": 10,  # sedikit geser biar rapi
-            "y_offset": 2,
-        })
-        
-        worksheet.merge_range("C2:J2", "UNIVERSITAS WARMADEWA", header_medium)
-        worksheet.merge_range("C3:J3", "FAKULTAS TEKNIK DAN PERENCANAAN", header_medium)
-        worksheet.merge_range("C4:J4", "PROGRAM STUDI TEKNIK KOMPUTER", header_medium)
-        worksheet.merge_range("C5:J5", "RENCANA PEMBELAJARAN SEMESTER", header_big)
-
-        kode_dokumen_rps = f'FTP-TKOM-RPS-{rps_data["kode_matkul"]}-{tahun}'
-        worksheet.merge_range("K2:L3", "Kode Dokumen", header_small)
-        worksheet.merge_range("K4:L5", str(kode_dokumen_rps), header_small)
-
-        # Matakuliah Info
-        worksheet.merge_range("B6:C6", "MATA KULIAH (MK)", title_format)
-        worksheet.merge_range("D6:E6", "KODE", title_format)
-        worksheet.write("F6", "RUMPUN MK", title_format)
-        worksheet.merge_range("G6:I6", "BOBOT (SKS)", title_format)
-        worksheet.write("J6", "SEMESTER", title_format)
-        worksheet.merge_range("K6:L6", "Tgl. PENETAPAN", title_format)
-
-        worksheet.merge_range("B7:C9", matkul , text_format)
-        worksheet.merge_range("D7:E9", rps_data["kode_matkul"] , text_format)
-        worksheet.merge_range("F7:F9", rps_data["rumpun"], text_format)
-        worksheet.merge_range("G7:I9", str(int(rps_data["bobot_sks"])), text_format)
-        worksheet.merge_range("J7:J9", rps_data["semester"], text_format)
-        today = datetime.now()
-        worksheet.merge_range("K7:L9", today, date_format)
-
-        # Otorisasi
-        worksheet.merge_range("B10:C10", "OTORISASI / PENGESAHAN", title_format)
-        worksheet.merge_range("D10:F10", "Dosen Pengembang RPS", title_format)    
-        worksheet.merge_range("G10:I10", "Koordinator Mata Kuliah", title_format)    
-        worksheet.merge_range("J10:L10", "Ketua Program Studi", title_format)
-
-        worksheet.set_row(10, 110)  # baris 11
-
-        worksheet.merge_range("B11:C11", "OTORISASI / PENGESAHAN", text_otorisasi_format)
-        worksheet.merge_range("D11:F11", matkul_data["team_teaching"][0], text_otorisasi_format)    
-        worksheet.merge_range("G11:I11", "I Made Adi Bhaskara, S.Kom., M.T.", text_otorisasi_format)    
-        worksheet.merge_range("J11:L11", "Ir. I Made Surya Kumara, S.T., M.Sc.", text_otorisasi_format)
-
-        # Placeholder CPL, CPMK, etc.
-        # Buat struktur baru tanpa duplikat
-        unique_cpmk = {}
-        unique_cpl = {}
-        for kode, desc in zip(cpl_cpmk_sub["cpmk_kode"], cpl_cpmk_sub["cpmk_desc"]):
-            if kode not in unique_cpmk:
-                unique_cpmk[kode] = desc  # simpan hanya sekali
-        
-        for kode, desc in zip(cpl_cpmk_sub["cpl_kode"], cpl_cpmk_sub["cpl_desc"]):
-            if kode not in unique_cpl:
-                unique_cpl[kode] = desc  # simpan hanya sekali
-
-        # Replace data lama dengan yang unik
-        cpl_cpmk_sub["cpl_kode"] = list(unique_cpl.keys())
-        cpl_cpmk_sub["cpl_desc"] = list(unique_cpl.values())
-        cpl_cpmk_sub["cpmk_kode"] = list(unique_cpmk.keys())
-        cpl_cpmk_sub["cpmk_desc"] = list(unique_cpmk.values())
-
-        cpl_start_row = 12
-        worksheet.merge_range(f'C{cpl_start_row}:L{cpl_start_row}', "CPL-PRODI yang dibebankan pada MK", title_cpl_format)
-        for i in range(len(cpl_cpmk_sub["cpl_kode"])):
-            worksheet.write(f'C{cpl_start_row+1+i}', cpl_cpmk_sub["cpl_kode"][i], text_cpl_format)
-            worksheet.merge_range(f'D{cpl_start_row+1+i}:L{cpl_start_row+1+i}', cpl_cpmk_sub["cpl_desc"][i], text_cpl_format)
-
-        cpmk_start_row = cpl_start_row+1+len(cpl_cpmk_sub["cpl_kode"])
-        worksheet.merge_range(f'C{cpmk_start_row}:K{cpmk_start_row}', "Capaian Pembelajaran Mata Kuliah (CPMK)", title_cpl_format)
-        worksheet.write(f'L{cpmk_start_row}', "Bobot (%)", title_cpl_format)
-
-        for i in range(len(cpl_cpmk_sub["cpmk_kode"])):
-            worksheet.write(f'C{cpmk_start_row+1+i}', cpl_cpmk_sub["cpmk_kode"][i], text_cpl_format)
-            worksheet.merge_range(f'D{cpmk_start_row+1+i}:K{cpmk_start_row+1+i}', cpl_cpmk_sub["cpmk_desc"][i], text_cpl_format)
-            worksheet.write(f'L{cpmk_start_row+1+i}', int(matkul_data["bobot_per_cpmk"][i]), text_cpl_format)
-
-        subcpmk_start_row = cpmk_start_row+1+len(cpl_cpmk_sub["cpmk_kode"])
-        worksheet.merge_range(f'C{subcpmk_start_row}:L{subcpmk_start_row}', "Kemampuan akhir tiap tahapan belajar (Sub-CPMK)", title_cpl_format)
-        for i in range(len(cpl_cpmk_sub["subcpmk_kode"])):
-            worksheet.write(f'C{subcpmk_start_row+1+i}', cpl_cpmk_sub["subcpmk_kode"][i], text_cpl_format)
-            worksheet.merge_range(f'D{subcpmk_start_row+1+i}:L{subcpmk_start_row+1+i}', cpl_cpmk_sub["subcpmk_desc"][i], text_cpl_format)
-
-        korelasi_start_row = subcpmk_start_row+1+len(cpl_cpmk_sub["subcpmk_kode"])
-        worksheet.merge_range(f'C{korelasi_start_row}:L{korelasi_start_row}', "Korelasi CPL terhadap Sub CPMK", title_cpl_format)
-
-        
-        for row in range(korelasi_start_row+1, korelasi_start_row + 2 + len(cpl_cpmk_sub["subcpmk_kode"]) + 1):
-            for col in range(2, 12):  # D=3, L=11 (0-based index)
-                worksheet.write(row-1, col, "", text_cpl_format)
-        
-        # baris terakhir untuk total
-        total_row = korelasi_start_row + len(cpl_cpmk_sub["subcpmk_kode"]) + 1
-        worksheet.write(total_row, 2, "Total", title_korelasi_format)
-
-        for i in range(len(cpl_cpmk_sub["subcpmk_kode"])):
-            worksheet.write(f'C{korelasi_start_row+2+i}', cpl_cpmk_sub["subcpmk_kode"][i], title_korelasi_format)
-
-        start_cpl_col = 3
-        end_cpl_col = start_cpl_col + len(cpl_cpmk_sub["cpl_kode"])
-        for col in range(start_cpl_col,end_cpl_col):
-            worksheet.write(korelasi_start_row, col, cpl_cpmk_sub["cpl_kode"][col-3], title_korelasi_format)
-
-        # # Isi bobot sesuai CPL
-        # cpl_col_map = {kode: start_cpl_col + idx for idx, kode in enumerate(cpl_cpmk_sub["cpl_kode"])}
-        # for i, sub in enumerate(cpl_cpmk_sub["subcpmk_kode"]):
-        #     row = korelasi_start_row + 1 + i
-        #     kode = matkul_data["cpl_bobot"][i]
-        #     bobot = int(float(matkul_data["total_bobot"][i])/100)
-        #     if kode in cpl_col_map:
-        #         col = cpl_col_map[kode]
-        #         worksheet.write(row, col, bobot, percent_format)
-
-        # === Tambahkan SUM total di baris "Total" ===
-        # for col in range(start_cpl_col, end_cpl_col):
-        #     col_letter = xlsxwriter.utility.xl_col_to_name(col)  # ubah index ke huruf Excel
-        #     start_row = korelasi_start_row + 1
-        #     end_row = korelasi_start_row + len(cpl_cpmk_sub["subcpmk_kode"])
-        #     formula = f"=SUM({col_letter}{start_row+1}:{col_letter}{end_row+1})"
-        #     worksheet.write_formula(total_row, col, formula, percent_format_bold)
-
-        # --- isi bobot sesuai CPL (dan akumulasikan totals per kolom) ---
-        cpl_col_map = {kode: start_cpl_col + idx for idx, kode in enumerate(cpl_cpmk_sub["cpl_kode"])}
-
-        # inisialisasi totals per kolom (numeric col index)
-        totals = {col: 0.0 for col in range(start_cpl_col, end_cpl_col)}
-
-        bobot_per_cpl = []
-
-        for i, sub in enumerate(cpl_cpmk_sub["subcpmk_kode"]):
-            excel_row = korelasi_start_row + 1 + i               # Excel row number (1-based)
-            kode = matkul_data["cpl_bobot"][i]
-            # bobot sebagai fraction (mis. 25 -> 0.25) untuk format persen
-            try:
-                bobot = float(matkul_data["total_bobot"][i]) / 100.0
-            except Exception:
-                bobot = 0.0
-
-            if kode in cpl_col_map:
-                col = cpl_col_map[kode]                          # numeric col (0-based as used before)
-                col_letter = xlsxwriter.utility.xl_col_to_name(col)  # convert to letter, ex. 3 -> 'D'
-                # tulis nilai persen ke sel, pakai format percent_format
-                worksheet.write(f"{col_letter}{excel_row+1}", bobot, percent_format)
-                bobot_per_cpl.append(bobot)
-                # akumulasikan total per kolom
-                totals[col] += bobot
-
-        # === tulis total (sebagai angka persen) di baris "Total" tanpa formula ===
-        total_row = korelasi_start_row + len(cpl_cpmk_sub["subcpmk_kode"]) + 2  # baris Excel tempat "Total"
-        total_per_cpl = []
-        for col in range(start_cpl_col, end_cpl_col):
-            col_letter = xlsxwriter.utility.xl_col_to_name(col)
-            total_value = totals.get(col, 0.0)
-            total_per_cpl.append(total_value)
-            worksheet.write(f"{col_letter}{total_row}", total_value, percent_format_bold)
-
-        worksheet.merge_range(f"B{cpl_start_row}:B{total_row}", "Capaian Pembelajaran", title_korelasi_format)
-
-        desc_start_row = total_row + 1
-        worksheet.set_row(desc_start_row-1, 110)  # baris 11
-        worksheet.write(f"B{desc_start_row}", "Deskripsi Singkat MK", title_korelasi_format)
-        
-        materi_str = ", ".join(matkul_data["materi_non_uts_uas"])
-        description_matkul = (
-            f"Mata kuliah {matkul} membahas konsep teoritis, metode, "
-            f"dan implementasi mengenai materi seperti {materi_str}."
-        )
-        worksheet.merge_range(f'C{desc_start_row}:L{desc_start_row}', description_matkul, text_cpl_format)
-
-        bahan_start_row = desc_start_row + 1
-        bahan_end_row = bahan_start_row + len(matkul_data["materi_non_uts_uas_numbered"]) - 1
-        worksheet.merge_range(f"B{bahan_start_row}:B{bahan_end_row}", "Bahan Kajian/Materi Pembelajaran", title_korelasi_format)
-        for i in range(len(matkul_data["materi_non_uts_uas_numbered"])):
-            worksheet.merge_range(f'C{desc_start_row+1+i}:L{desc_start_row+1+i}', matkul_data["materi_non_uts_uas_numbered"][i], text_cpl_format)
-
-        pustaka_start_row = bahan_end_row + 1
-        pustaka_utama_end_row = pustaka_start_row + len(matkul_data["pustaka_utama"])
-        pustaka_pendukung_end_row = pustaka_utama_end_row + len(matkul_data["pustaka_pendukung"]) + 1
-        worksheet.merge_range(f"B{pustaka_start_row}:B{pustaka_pendukung_end_row}", "Pustaka", title_korelasi_format)
-        worksheet.merge_range(f"C{pustaka_start_row}:L{pustaka_start_row}", "Utama:", title_cpl_format)
-        worksheet.merge_range(f"C{pustaka_utama_end_row+1}:L{pustaka_utama_end_row+1}", "Pendukung:", title_cpl_format)
-        
-        for i in range(len(matkul_data["pustaka_utama"])):
-            worksheet.merge_range(f'C{pustaka_start_row+1+i}:L{pustaka_start_row+1+i}', matkul_data["pustaka_utama"][i], text_cpl_format)
-        
-        for i in range(len(matkul_data["pustaka_pendukung"])):
-            worksheet.merge_range(f'C{pustaka_utama_end_row+2+i}:L{pustaka_utama_end_row+2+i}', matkul_data["pustaka_pendukung"][i], text_cpl_format)
-        
-        dosen_start_row = pustaka_pendukung_end_row + 1
-        dosen_end_row = dosen_start_row + len(matkul_data["team_teaching"]) - 1
-        worksheet.merge_range(f"B{dosen_start_row}:B{dosen_end_row}", "Dosen Pengampu", title_korelasi_format)
-        for i in range(len(matkul_data["team_teaching"])):
-            worksheet.merge_range(f'C{dosen_start_row+i}:L{dosen_start_row+i}', matkul_data["team_teaching"][i], text_cpl_format)
-
-        syarat_start_row = dosen_end_row + 1
-        dosen_end_row = syarat_start_row + len(matkul_data["matkul_syarat"]) - 1
-        if dosen_end_row == syarat_start_row:
-            worksheet.write(f"B{syarat_start_row}", "Matakuliah Syarat", title_korelasi_format)
-        else:
-            worksheet.merge_range(f"B{syarat_start_row}:B{dosen_end_row}", "Matakuliah Syarat", title_korelasi_format)
-        for i in range(len(matkul_data["matkul_syarat"])):
-            worksheet.merge_range(f'C{syarat_start_row+i}:L{syarat_start_row+i}', matkul_data["matkul_syarat"][i], text_cpl_format)
-
-        # Pertemuan Mingguan 
-        # Header
-        mingguan_start_row = dosen_end_row + 1 
-        worksheet.merge_range(f"B{mingguan_start_row}:B{mingguan_start_row+2}", "Mg Ke-", title_format)
-        worksheet.write(f"B{mingguan_start_row+3}", "(1)", title_format)
-
-        worksheet.merge_range(f"C{mingguan_start_row}:C{mingguan_start_row+2}", "Kemampuan akhir tiap tahapan belajar (Sub-CPMK)", title_format)
-        worksheet.write(f"C{mingguan_start_row+3}", "(2)", title_format)
-
-        worksheet.merge_range(f"D{mingguan_start_row}:G{mingguan_start_row}", "Penilaian", title_format)
-        worksheet.merge_range(f"D{mingguan_start_row+1}:E{mingguan_start_row+2}", "Indikator", title_format)
-        worksheet.merge_range(f"F{mingguan_start_row+1}:G{mingguan_start_row+2}", "Teknik dan Instrumen Penilaian", title_format)
-        worksheet.merge_range(f"D{mingguan_start_row+3}:E{mingguan_start_row+3}", "(3)", title_format)
-        worksheet.merge_range(f"F{mingguan_start_row+3}:G{mingguan_start_row+3}", "(4)", title_format)
-
-        worksheet.merge_range(f"H{mingguan_start_row}:I{mingguan_start_row+1}", "Strategi Pembelajaran dan Metode Pembelajaran [Estimasi Waktu]", title_format)
-        worksheet.write(f"H{mingguan_start_row+2}", "Luring (offline)", title_format)
-        worksheet.write(f"I{mingguan_start_row+2}", "Daring (online)", title_format)
-        worksheet.write(f"H{mingguan_start_row+3}", "(5)", title_format)
-        worksheet.write(f"I{mingguan_start_row+3}", "(6)", title_format)
-
-        worksheet.merge_range(f"J{mingguan_start_row}:K{mingguan_start_row+2}", "Materi Pembelajaran dan Daftar Referensi \n[Pustaka]", title_format)
-        worksheet.merge_range(f"J{mingguan_start_row+3}:K{mingguan_start_row+3}", "(7)", title_format)
-
-        worksheet.merge_range(f"L{mingguan_start_row}:L{mingguan_start_row+2}", "Bobot Penilaian (%)", title_format)
-        worksheet.write(f"L{mingguan_start_row+3}", "(8)", title_format)
-
-        # Body RPS
-        mingguan_body_start_row = mingguan_start_row + 4
-        len_mingguan = len(matkul_data["minggu_ke"])
-
-        weekly_subcpmk_desc = []
-
-        for i in range(len_mingguan):
-            worksheet.write(f'B{mingguan_body_start_row+i}', int(float(matkul_data["minggu_ke"][i])), text_cpl_format)
-
-            # === cari deskripsi subcpmk ===
-            subcpmk_kode = matkul_data["subcpmk_weekly"][i]
-            subcpmk_desc = ""
-            if "subcpmk_kode" in cpl_cpmk_sub and "subcpmk_desc" in cpl_cpmk_sub:
-                if subcpmk_kode in cpl_cpmk_sub["subcpmk_kode"]:
-                    idx = cpl_cpmk_sub["subcpmk_kode"].index(subcpmk_kode)
-                    subcpmk_desc = cpl_cpmk_sub["subcpmk_desc"][idx]
-
-            weekly_subcpmk_desc.append(subcpmk_desc)
-            worksheet.write(
-                f'C{mingguan_body_start_row+i}',
-                f'{subcpmk_desc} ({subcpmk_kode}) ',
-                text_cpl_format
-            )
-
-            indikator_text = matkul_data["indikator_numbered"][i]
-
-            # === Cek apakah ini baris evaluasi ===
-            if "Evaluasi UTS" in indikator_text or "Evaluasi UAS" in indikator_text:
-                # Merge dari C sampai K, isi dengan teks evaluasi
-                worksheet.merge_range(
-                    f'D{mingguan_body_start_row+i}:K{mingguan_body_start_row+i}',
-                    indikator_text,
-                    title_format
-                )
-                # Tetap isi bobot di L
-                worksheet.write(f'L{mingguan_body_start_row+i}', int(float(matkul_data["bobot"][i])), text_cpl_format)
-                continue  # skip ke iterasi berikutnya
-
-            worksheet.merge_range(f'D{mingguan_body_start_row+i}:E{mingguan_body_start_row+i}', indikator_text, text_cpl_format)
-            worksheet.merge_range(f'F{mingguan_body_start_row+i}:G{mingguan_body_start_row+i}', matkul_data["kriteria_numbered"][i], text_cpl_format)
-
-            if "Tugas" in matkul_data["kriteria_numbered"][i]:
-                worksheet.write(f'H{mingguan_body_start_row+i}', f"Ekspository dan diskusi [TM : {rps_data['bobot_sks']}x50'] Task Based Learning [TB : {rps_data['bobot_sks']}x50']", text_cpl_format)
-            else:
-                worksheet.write(f'H{mingguan_body_start_row+i}', f"Ekspository dan diskusi [TM : {rps_data['bobot_sks']}x50']", text_cpl_format)
-
-            worksheet.write(f'I{mingguan_body_start_row+i}', f"Link materi [BM : {rps_data['bobot_sks']}x50']", text_cpl_format)
-
-            worksheet.merge_range(
-                f'J{mingguan_body_start_row+i}:K{mingguan_body_start_row+i}',
-                f'{matkul_data["materi_weekly_numbered"][i]} \n[{matkul_data["pustaka_weekly"][i]}]',
-                text_cpl_format
-            )
-
-            worksheet.write(f'L{mingguan_body_start_row+i}', float(matkul_data["bobot"][i]), text_cpl_format)
-
-        blueprint_start_row = mingguan_body_start_row + len_mingguan + 2
-
-        worksheet.merge_range(f"B{blueprint_start_row}:L{blueprint_start_row}", "BLUE PRINT PENILAIAN ATAU RENCANA ASESMEN DAN EVALUASI (RAE)", title_format)
-        
-        start_col_green = 1  # B
-        end2_col_green = 11
-        end_col_green = 2 + len(cpl_cpmk_sub["cpl_kode"])  # geser ke kanan sesuai jumlah CPL
-
-        start_green_cell = xl_rowcol_to_cell(blueprint_start_row, start_col_green)
-        end_green_cell = xl_rowcol_to_cell(blueprint_start_row, end_col_green)
-        start2_green_cell = xl_rowcol_to_cell(blueprint_start_row, end_col_green+1)
-        end2_green_cell = xl_rowcol_to_cell(blueprint_start_row, end2_col_green)
-
-        worksheet.merge_range(f'{start_green_cell}:{end_green_cell}', "KRITERIA PENILAIAN", title_format_green)
-        worksheet.merge_range(f'{start2_green_cell}:{end2_green_cell}', "RANGE NILAI", title_format_green)
-
-        worksheet.merge_range(f'B{blueprint_start_row+2}:B{blueprint_start_row+3}', "Bobot", title_format)
-        worksheet.merge_range(f'C{blueprint_start_row+2}:C{blueprint_start_row+3}', "Teknik dan Penilaian", title_format)
-
-        for col in range(start_cpl_col,end_cpl_col):
-            worksheet.write(blueprint_start_row + 1, col, cpl_cpmk_sub["cpl_kode"][col-3], title_format)
-            worksheet.write(blueprint_start_row + 2, col, total_per_cpl[col-3], percent_format_bold_fill)
-        
-        start_asm_cell = xl_rowcol_to_cell(blueprint_start_row+1, end_col_green+1)
-        end_asm_cell = xl_rowcol_to_cell(blueprint_start_row+2, end_col_green+1)
-
-        worksheet.merge_range(f'{start_asm_cell}:{end_asm_cell}', "Bobot Asesmen", title_format)
-
-        start_range_cell = xl_rowcol_to_cell(blueprint_start_row+1, end_col_green+2)
-        end_range_cell = xl_rowcol_to_cell(blueprint_start_row+(len(matkul_data["subcpmk_bobot"]) + 5), 11)    
-
-        worksheet.merge_range(f'{start_range_cell}:{end_range_cell}', "Nilai akhir diatas dikonversikan kedalam huruf mutu menggunakan kriteria penilaian sebagai berikut:\nRENTANGAN NILAI :\n85.00 - 100.00 : A (UNGGUL - LULUS)                \n75.00 - 84.99   : AB (BAIK SEKALI - LULUS)              \n70.00 - 74.99   : B (BAIK - LULUS)             \n60.00 - 69.99   : BC (CUKUP BAIK - TIDAK LULUS)\n55.00 - 59.99   : C (CUKUP - TIDAK LULUS)\n50.00 - 54.99   : CD (KURANG - TIDAK LULUS)\n44.00 - 49.99   : D (KURANG SEKALI - TIDAK LULUS)\n0.00 - 43.99     : E (GAGAL - TIDAK LULUS)", text_cpl_format)
-
-        # tentukan start row/col dan end row/col
-        start_row = blueprint_start_row + 3
-        start_col = 3
-        end_row = blueprint_start_row + 7
-        end_col = end_col_green + 1
-
-        # isi semua cell di range dengan border
-        for row in range(start_row, end_row + 1):
-            for col in range(start_col, end_col + 1):
-                worksheet.write(row, col, "", text_format)
-            for i in range(len(cpl_cpmk_sub["subcpmk_kode"])):
-                worksheet.write(f'B{blueprint_start_row+4+i}', cpl_cpmk_sub["subcpmk_kode"][i], text_format)
-
-        kriteria_per_subcpmk = []
-        rubrik_per_subcpmk = []
-
-        for kode in cpl_cpmk_sub["subcpmk_kode"]:
-            # cari semua kriteria untuk subcpmk ini
-            related_kriteria = [
-                matkul_data["kriteria"][i]
-                for i, wk in enumerate(matkul_data["subcpmk_weekly"])
-                if wk == kode
-            ]
-
-            # cek apakah ada "Tugas" 
-            if any("Tugas" in k for k in related_kriteria): 
-                kriteria_per_subcpmk.append("Ekspository dan diskusi (Oral Assessment), Multiple Choice Questions (MCQ) dan Short Answer Questions (SAQ)") 
-            else: 
-                kriteria_per_subcpmk.append("Kuis, diskusi, dan wawancara pemahaman (Oral Assessment)")
-            
-            # kumpulkan semua teks di dalam [ ... ]
-            rubrik_items = []
-            if related_kriteria:
-                for k in related_kriteria:
-                    matches = re.findall(r"\[(.*?)\]", k)
-                    rubrik_items.extend(matches)
-            rubrik_per_subcpmk.append(", ".join(rubrik_items) if rubrik_items else "")
-
-        for i in range(len(cpl_cpmk_sub["subcpmk_kode"])): 
-            worksheet.write(f'C{blueprint_start_row+4+i}', kriteria_per_subcpmk[i], text_format)
-
-        for i, sub in enumerate(cpl_cpmk_sub["subcpmk_kode"]):
-            excel_row = blueprint_start_row + 3 + i               # Excel row number (1-based)
-            kode = matkul_data["cpl_bobot"][i]
-            # bobot sebagai fraction (mis. 25 -> 0.25) untuk format persen
+        with stage("curriculum"):
+            curriculum = get_curriculum()
+            if not curriculum.has_matkul(matkul):
+                abort(404, description=f"Mata kuliah '{matkul}' tidak ada di kurikulum")
+    except UnknownCurriculum as e:
+        abort(404, description=str(e))
+    except CurriculumUnavailable:
+        abort(503, description="Data kurikulum sedang tidak bisa dibaca, coba beberapa saat lagi.")
+
+    upload_hash = file_sha1(get_upload_path(matkul, tahun))
+    if upload_hash is None:
+        abort(404, description=f"File data untuk mata kuliah '{matkul}' tahun {tahun} tidak ditemukan. Pastikan file sudah diupload.")
+    # Isi preview hanya bergantung pada file upload dan baris kurikulum mata kuliah ini
+    key = fingerprint("preview", upload_hash, curriculum.cache_tag(matkul), tahun)
+    etag = key[:32]
+    if request.if_none_match.contains(etag):
+        response = current_app.response_class(status=304)
+    else:
+        cache = current_app.extensions["preview_cache"]
+        html = cache.get(key)
+        if html is None:
             try:
-                bobot = int(float(matkul_data["total_bobot"][i]))
-            except Exception:
-                bobot = 0
-
-            if kode in cpl_col_map:
-                col = cpl_col_map[kode]                          # numeric col (0-based as used before)
-                col_letter = xlsxwriter.utility.xl_col_to_name(col)  # convert to letter, ex. 3 -> 'D'
-                # tulis nilai persen ke sel, pakai format percent_format
-                worksheet.write(f"{col_letter}{excel_row+1}", f'Nilai x {bobot}% \n({rubrik_per_subcpmk[i]})', percent_format)
-
-        for i in range(len(cpl_cpmk_sub["subcpmk_kode"])):
-            worksheet.write(blueprint_start_row+3+i, end_col_green+1, matkul_data["total_bobot"][i], text_format)
-
-        last_rps_start_row = blueprint_start_row + len(cpl_cpmk_sub["subcpmk_kode"]) + 4
-        worksheet.merge_range(f'B{last_rps_start_row}:C{last_rps_start_row}', "JUMLAH", title_korelasi_format)
-        worksheet.merge_range(f'B{last_rps_start_row+1}:C{last_rps_start_row+1}', "NILAI MATA KULIAH", title_korelasi_format)
-        worksheet.merge_range(f'B{last_rps_start_row+2}:C{last_rps_start_row+2}', "NILAI CPL", title_korelasi_format)
-
-        # buat label AA, BB, CC, ... sesuai jumlah CPL
-        labels = [chr(65 + i) * 2 for i in range(len(cpl_cpmk_sub["cpl_kode"]))]  # A=65 di ASCII
-
-        # tulis label di row last_rps_start_row
-        for idx, col in enumerate(range(start_cpl_col, end_cpl_col)):
-            worksheet.write(last_rps_start_row-1, col, labels[idx], title_korelasi_format)
-            worksheet.write(
-                last_rps_start_row + 1,
-                col,
-                f"{labels[idx]}/{total_per_cpl[idx]} x100",
-                title_korelasi_format,
-            )
-
-        # merge semua kolom di row last_rps_start_row untuk teks gabungan
-        merged_start = xlsxwriter.utility.xl_col_to_name(start_cpl_col)
-        merged_end = xlsxwriter.utility.xl_col_to_name(end_cpl_col - 1)
-        worksheet.merge_range(
-            f"{merged_start}{last_rps_start_row+1}:{merged_end}{last_rps_start_row+1}",
-            " + ".join(labels),
-            title_korelasi_format,
+                with stage("upload"):
+                    matkul_data = get_matkul_data(matkul, tahun)
+                with stage("context"):
+                    model = build_preview(
+                        matkul, tahun, curriculum.rps_data(matkul), curriculum.cpl_cpmk_sub(matkul), matkul_data,
+                    )
+            except ValueError as e:
+                abort(400, description=str(e))
+            with stage("render.preview"):
+                html = render_template("preview.html", p=model, kurikulum=selected_curriculum()).encode("utf-8")
+            cache.put(key, html)
+        response = current_app.response_class(html, content_type="text/html; charset=utf-8")
+    response.set_etag(etag)
+    # File upload bisa ditimpa dengan nama yang sama, jadi selalu revalidasi (murah: 304)
+    response.cache_control.private = True
+    response.cache_control.no_cache = True
+    return response
+
+@bp.route("/download-template")
+def download_template():
+    preloaded = current_app.extensions.get("template_rubrik")
+    if preloaded is None:
+        return send_from_directory(
+            os.path.dirname(TEMPLATE_RUBRIK_FILE),
+            os.path.basename(TEMPLATE_RUBRIK_FILE),
+            as_attachment=True
         )
+    # Isi file sudah dimuat saat warm-up, jadi tidak ada baca disk per request
+    data, etag = preloaded
+    return send_file(
+        io.BytesIO(data),
+        as_attachment=True,
+        download_name=os.path.basename(TEMPLATE_RUBRIK_FILE),
+        mimetype="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+        etag=etag,
+    )
 
-        ######################## RPM ######################
-        def write_rpm_template(rpm_sheet_name, judul_kriteria, subcpmk_rpm, indikator_numbered_rpm, minggu_rpm, bobot_rpm):
-            worksheet_rpm = workbook.add_worksheet(rpm_sheet_name)
-            # Header
-            # Tambahkan logo
-            # Set tinggi baris header (sedikit lebih tinggi dari normal)
-            # Atur ukuran kolom
-            worksheet_rpm.set_column("A:A", 5)        # Kolom A kecil
-            worksheet_rpm.set_column("B:B", 18)       # Kolom B - L agak besar (2x normal)
-            worksheet_rpm.set_column("C:J", 18)       # Kolom B - L agak besar (2x normal)
-            worksheet_rpm.set_row(1, 22)  # baris 2
-            worksheet_rpm.set_row(2, 22)  # baris 3
-            worksheet_rpm.set_row(3, 22)  # baris 4
-            worksheet_rpm.set_row(4, 26)  # baris 5
-            worksheet_rpm.merge_range("B2:B5", "", header_medium)
-            worksheet_rpm.insert_image("B2", "data/logo.png", {
-                "x_scale": 1.5,  # perkecil jika perlu
-                "y_scale": 1.5,
-                "x_offset": 10,  # sedikit geser biar rapi
-                "y_offset": 2,
-            })
-            
-            worksheet_rpm.merge_range("C2:H2", "UNIVERSITAS WARMADEWA", header_medium)
-            worksheet_rpm.merge_range("C3:H3", "FAKULTAS TEKNIK DAN PERENCANAAN", header_medium)
-            worksheet_rpm.merge_range("C4:H4", "PROGRAM STUDI TEKNIK KOMPUTER", header_medium)
-            worksheet_rpm.merge_range("C5:H5", "RENCANA PENUGASAN MAHASISWA", header_big)
-
-            kode_dokumen_rpm = f'FTP-TKOM-RPM-{rps_data["kode_matkul"]}-{tahun}'
-            worksheet_rpm.merge_range("I2:J3", "Kode Dokumen", header_small)
-            worksheet_rpm.merge_range("I4:J5", str(kode_dokumen_rpm), header_small)
-
-            worksheet_rpm.merge_range("B6:C6", "MATA KULIAH (MK)", title_cpl_format)
-            worksheet_rpm.merge_range("D6:J6", matkul, text_cpl_format)
-
-            worksheet_rpm.merge_range("B7:C7", "KODE", title_cpl_format)
-            worksheet_rpm.merge_range("D7:E7", rps_data["kode_matkul"], text_cpl_format)
-            worksheet_rpm.write("F7", "SKS", title_cpl_format)
-            worksheet_rpm.write("G7", str(int(rps_data["bobot_sks"])), text_cpl_format)
-            worksheet_rpm.write("H7", "SEMESTER", title_cpl_format)
-            worksheet_rpm.merge_range("I7:J7", rps_data["semester"], text_cpl_format)
-
-            worksheet_rpm.merge_range("B8:C11", "DOSEN PENGAMPU", title_cpl_format)
-            # Buat 4 baris kosong dulu
-            for i in range(4):
-                worksheet_rpm.merge_range(f"D{8+i}:J{8+i}", "", text_cpl_format)
-
-            # Isi nama dosen sesuai jumlah
-            if len(matkul_data["team_teaching"]) < 5:
-                for i in range(len(matkul_data["team_teaching"])):                
-                    worksheet_rpm.write(f"D{8+i}", matkul_data["team_teaching"][i], text_cpl_format)
-            else:
-                worksheet_rpm.write("D8", matkul_data["team_teaching"][0], text_cpl_format)
-
-            worksheet_rpm.merge_range("B12:F12", "BENTUK TUGAS", title_cpl_format)
-            worksheet_rpm.merge_range("B13:F13", "Penugasan Individu", text_cpl_format)
-            worksheet_rpm.merge_range("G12:J12", "WAKTU PENGERJAAN TUGAS", title_cpl_format)
-            worksheet_rpm.merge_range("G13:J13", f'Minggu ke-{int(float(minggu_rpm))}', text_cpl_format)
-
-            worksheet_rpm.merge_range("B14:J14", "JUDUL TUGAS", title_cpl_format)
-            worksheet_rpm.merge_range("B15:J15", judul_kriteria, text_cpl_format)
-
-            worksheet_rpm.merge_range("B16:J16", "SUB CAPAIAN PEMBELAJARAN MATA KULIAH", title_cpl_format)
-            worksheet_rpm.merge_range("B17:J17", subcpmk_rpm, text_cpl_format)
-
-            worksheet_rpm.merge_range("B18:J18", "DESKRIPSI TUGAS", title_cpl_format)
-            worksheet_rpm.merge_range("B19:J19", indikator_numbered_rpm, text_cpl_format)
-
-            worksheet_rpm.merge_range("B20:J20", "METODE PENGERJAAN TUGAS", title_cpl_format)
-            worksheet_rpm.merge_range("B21:J21", "Mahasiswa menjawab soal yang diberikan pada saat perkuliahan", text_cpl_format)
-            worksheet_rpm.merge_range("B22:J22", "BENTUK DAN FORMAT LUARAN", title_cpl_format)
-            worksheet_rpm.write("B23", "a. Obyek Garapan", title_korelasi_format)
-            worksheet_rpm.merge_range("C23:J23", "Daftar soal", text_cpl_format)
-            worksheet_rpm.write("B24", "b. Bentuk Luaran", title_korelasi_format)
-            worksheet_rpm.merge_range("C24:J24", "Penjelasan dan analisis", text_cpl_format)
-            
-            worksheet_rpm.merge_range("B25:J25", "INDIKATOR, KRITERIA, dan BOBOT PENILAIAN", title_cpl_format)
-            worksheet_rpm.merge_range("B26:J26", f'Indikator: {indikator_numbered_rpm}', text_cpl_format)
-            worksheet_rpm.merge_range("B27:J27", "", text_cpl_format)
-            worksheet_rpm.merge_range("B28:J28", f'Bobot Penilaian : {bobot_rpm} % dari total 100% penilaian mata kuliah', text_cpl_format)
-            worksheet_rpm.merge_range("B29:J29", "Kriteria Penilaian: Terlampir", text_cpl_format)
-
-            worksheet_rpm.merge_range("B30:J30", "JADWAL PELAKSANAAN", title_cpl_format)
-            worksheet_rpm.merge_range("B31:J31", f'Minggu ke-{int(float(minggu_rpm))}', text_cpl_format)
-
-            worksheet_rpm.merge_range("B32:J32", "LAIN-LAIN", title_cpl_format)
-            worksheet_rpm.merge_range("B33:J33", "-", text_cpl_format)
-
-            worksheet_rpm.merge_range("B34:J34", "REFERENSI", title_cpl_format)
-            for i in range(len(matkul_data["pustaka_utama"])):
-                worksheet_rpm.merge_range(f'B{35+i}:J{35+i}', matkul_data["pustaka_utama"][i], text_cpl_format)
-            
-            for i in range(len(matkul_data["pustaka_pendukung"])):
-                worksheet_rpm.merge_range(f'B{35+len(matkul_data["pustaka_utama"])+i}:J{35+len(matkul_data["pustaka_utama"])+i}', matkul_data["pustaka_pendukung"][i], text_cpl_format)
-   
-        # --- Variabel kontrol ---
-        def to_number(value):
-            try:
-                return float(value)
-            except (ValueError, TypeError):
-                return 0
-        
-        rpm_index = 1
-        tugas_count = 0
-        kuis_count = 0
-        has_uts = False
-        has_uas = False
-
-        # --- Variabel agregasi untuk UTS & UAS ---
-        uts_minggu = None
-        uts_bobot_total = 0
-        uts_indikator = None
-
-        uas_minggu = None
-        uas_bobot_total = 0
-        uas_indikator = None
-
-        # --- Loop semua kriteria ---
-        for i in range(len(matkul_data["kriteria_numbered"])):
-            kriteria = matkul_data["kriteria_numbered"][i]
-
-            if "Tugas" in kriteria:
-                tugas_count += 1
-                sheet_name = f"RPM{rpm_index} (Tugas {tugas_count})"
-                write_rpm_template(
-                    sheet_name,
-                    kriteria,
-                    weekly_subcpmk_desc[i],
-                    matkul_data["indikator_numbered"][i],
-                    matkul_data["minggu_ke"][i],
-                    matkul_data["bobot"][i],
-                )
-                rpm_index += 1
-
-            elif "Kuis" in kriteria:
-                kuis_count += 1
-                sheet_name = f"RPM{rpm_index} (Kuis {kuis_count})"
-                write_rpm_template(
-                    sheet_name,
-                    kriteria,
-                    weekly_subcpmk_desc[i],
-                    matkul_data["indikator_numbered"][i],
-                    matkul_data["minggu_ke"][i],
-                    matkul_data["bobot"][i],
-                )
-                rpm_index += 1
-
-            elif "Evaluasi UTS" in kriteria:
-                has_uts = True
-                uts_bobot_total += to_number(matkul_data["bobot"][i])
-                if uts_minggu is None:
-                    uts_minggu = matkul_data["minggu_ke"][i]
-                if uts_indikator is None:
-                    uts_indikator = matkul_data["indikator_numbered"][i]
-
-            elif "Evaluasi UAS" in kriteria:
-                has_uas = True
-                uas_bobot_total += to_number(matkul_data["bobot"][i])
-                if uas_minggu is None:
-                    uas_minggu = matkul_data["minggu_ke"][i]
-                if uas_indikator is None:
-                    uas_indikator = matkul_data["indikator_numbered"][i]
-
-        # --- Tambahkan sheet UTS kalau ada ---
-        if has_uts:
-            sheet_name = f"RPM{rpm_index} (Evaluasi UTS)"
-            write_rpm_template(
-                sheet_name,
-                "Evaluasi UTS",
-                "Evaluasi UTS",
-                uts_indikator,
-                uts_minggu,
-                uts_bobot_total,
-            )
-            rpm_index += 1
-
-        # --- Tambahkan sheet UAS kalau ada ---
-        if has_uas:
-            sheet_name = f"RPM{rpm_index} (Evaluasi UAS)"
-            write_rpm_template(
-                sheet_name,
-                "Evaluasi UAS",
-                "Evaluasi UAS",
-                uas_indikator,
-                uas_minggu,
-                uas_bobot_total,
-            )
-            rpm_index += 1
-
-        ############################## RUBRIK ################################
-        rubrik_list = [
-            ("SP1", "Skala Persepsi", "Rubrik Penilaian Presentasi Lisan Mahasiswa"),
-            ("H1", "Holistik", "Rubrik Penilaian Penugasan Mahasiswa"),
-            ("H2", "Holistik", "Rubrik Penilaian UTS/UAS Mahasiswa"),
-            ("H3", "Holistik", "Rubrik Penilaian Rancangan Proposal Mahasiswa"),
-            ("A1", "Analitik", "Rubrik Penilaian Presentasi Makalah Mahasiswa"),
-            ("A2", "Analitik", "Rubrik Penilaian Project Based Learning Mahasiswa"),
-            ("A3", "Analitik", "Rubrik Penilaian Capstone Project Mahasiswa"),
-        ]
-
-        for kode_rubrik, type_rubrik, header_title in rubrik_list:
-            subcpmk_rub_key = f"rubrik_{kode_rubrik}_subcpmk"
-            cpl_rub_key = f"rubrik_{kode_rubrik}_cpl"
-
-            subcpmk_rub_data = matkul_data[subcpmk_rub_key]
-            cpl_rub_data = matkul_data[cpl_rub_key]
-
-            if not subcpmk_rub_data or not cpl_rub_data:
-                continue  # skip kalau kosong
-
-            # --- Buat worksheet ---
-            sheet_title = f"RUB {kode_rubrik}"
-            worksheet_rub = workbook.add_worksheet(sheet_title)
-
-            # Atur ukuran kolom
-            worksheet_rub.set_column("A:A", 5)        # Kolom A kecil
-            worksheet_rub.set_column("B:I", 25)       # Kolom B - L agak besar (2x normal)
-            worksheet_rub.set_row(1, 22)  # baris 2
-            worksheet_rub.set_row(2, 22)  # baris 3
-            worksheet_rub.set_row(3, 22)  # baris 4
-            worksheet_rub.set_row(4, 22)  # baris 5
-            worksheet_rub.merge_range("B2:B5", "", header_medium)
-            worksheet_rub.insert_image("B2", "data/logo.png", {
-                "x_scale": 1.5,  # perkecil jika perlu
-                "y_scale": 1.5,
-                "x_offset": 10,  # sedikit geser biar rapi
-                "y_offset": 2,
-            })
-
-            # --- Header utama ---            
-            worksheet_rub.merge_range("C2:G2", "UNIVERSITAS WARMADEWA", header_medium)
-            worksheet_rub.merge_range("C3:G3", "FAKULTAS TEKNIK DAN PERENCANAAN", header_medium)
-            worksheet_rub.merge_range("C4:G4", "PROGRAM STUDI TEKNIK KOMPUTER", header_medium)
-            worksheet_rub.merge_range("C5:G5", header_title, header_small)
-
-            kode_dokumen_rub = f'FTP-TKOM-RUB-{rps_data["kode_matkul"]}-{tahun}'
-            worksheet_rub.merge_range("H2:I3", "Kode Dokumen", header_small)
-            worksheet_rub.merge_range("H4:I5", str(kode_dokumen_rub), header_small)
-
-            # # --- Info MK ---
-            worksheet_rub.merge_range("B6:C6", "MATA KULIAH", title_cpl_format)
-            worksheet_rub.merge_range("D6:I6", matkul, text_cpl_format)
-
-            worksheet_rub.merge_range("B7:C7", "KODE", title_cpl_format)
-            worksheet_rub.merge_range("D7:I7", rps_data["kode_matkul"], text_cpl_format)
-
-            worksheet_rub.merge_range("B8:C11", "DOSEN PENGAMPU", title_cpl_format)
-            # Buat 4 baris kosong dulu
-            for i in range(4):
-                worksheet_rub.merge_range(f"D{8+i}:I{8+i}", "", text_cpl_format)
-
-            # Isi nama dosen sesuai jumlah
-            if len(matkul_data["team_teaching"]) < 5:
-                for i in range(len(matkul_data["team_teaching"])):                
-                    worksheet_rub.write(f"D{8+i}", matkul_data["team_teaching"][i], text_cpl_format)
-            else:
-                worksheet_rub.write("D8", matkul_data["team_teaching"][0], text_cpl_format)
-
-            worksheet_rub.merge_range("B12:C12", "SEMESTER", title_cpl_format)
-            worksheet_rub.merge_range("D12:I12", rps_data["semester"], text_cpl_format)
-
-            worksheet_rub.merge_range("B13:C13", "SKS", title_cpl_format)
-            worksheet_rub.merge_range("D13:I13", rps_data["bobot_sks"], text_cpl_format)
-
-            # --- Cari semua kriteria yang ada kode rubrik (misal "SP1") ---
-            related_kriteria = [
-                k for k in matkul_data["kriteria_numbered"] if kode_rubrik in k
-            ]
-            tugas_str = "\n ".join(related_kriteria)
-
-            worksheet_rub.set_row(13, 15*len(related_kriteria))  # baris 14
-
-            worksheet_rub.merge_range("B14:C14", "Tugas", title_cpl_format)
-            worksheet_rub.merge_range("D14:I14", tugas_str, text_cpl_format)
-
-            worksheet_rub.merge_range("B15:C15", "Tipe", title_cpl_format)
-            worksheet_rub.merge_range("D15:I15", type_rubrik, text_cpl_format)
-
-            worksheet_rub.merge_range("B16:C16", "Sifat", title_cpl_format)
-            worksheet_rub.merge_range("D16:I16", "Individu", text_cpl_format)
-
-            # --- Capaian & deskripsi ---
-            worksheet_rub.merge_range("B17:C17", "Capaian", title_cpl_format)
-
-            row = 16
-            # Buat 4 baris kosong dulu
-            for i in range(len(subcpmk_rub_data)):
-                worksheet_rub.merge_range(f"E{17+i}:I{17+i}", "", text_cpl_format)
-
-            for idx, (subcpmk, cpl) in enumerate(zip(subcpmk_rub_data, cpl_rub_data)):
-                try:
-                    sub_desc = cpl_cpmk_sub["subcpmk_desc"][idx]  # ambil berdasarkan urutan
-                except (IndexError, TypeError):
-                    sub_desc = ""
-                worksheet_rub.write(row, 3, subcpmk, title_korelasi_format)
-                worksheet_rub.write(row, 4, sub_desc, text_cpl_format)
-                row += 1
-        
-        #################################### KONTRAK ##################################
-        """
-        Membuat sheet KONTRAK dengan header mirip RPS template.
-        """
-        worksheet_kontrak = workbook.add_worksheet("KTR")
-
-        # Atur ukuran kolom
-        worksheet_kontrak.set_column("A:A", 5)        # Kolom A kecil
-        worksheet_kontrak.set_column("B:L", 18)       # Kolom B - L agak besar (2x normal)
-
-        # --- Header dengan logo ---
-        worksheet_kontrak.set_row(1, 22)  # baris 2
-        worksheet_kontrak.set_row(2, 22)  # baris 3
-        worksheet_kontrak.set_row(3, 22)  # baris 4
-        worksheet_kontrak.set_row(4, 26)  # baris 5
-        worksheet_kontrak.merge_range("B2:B5", "", header_medium)
-
-        worksheet_kontrak.insert_image("B2", "data/logo.png", {
-            "x_scale": 1.5,
-            "y_scale": 1.5,
-            "x_offset": 10,
-            "y_offset": 2,
-        })
-
-        worksheet_kontrak.merge_range("C2:J2", "UNIVERSITAS WARMADEWA", header_medium)
-        worksheet_kontrak.merge_range("C3:J3", "FAKULTAS TEKNIK DAN PERENCANAAN", header_medium)
-        worksheet_kontrak.merge_range("C4:J4", "PROGRAM STUDI TEKNIK KOMPUTER", header_medium)
-        worksheet_kontrak.merge_range("C5:J5", "KONTRAK PERKULIAHAN", header_big)
-
-        kode_dokumen_kontrak = f'FTP-TKOM-KTR-{rps_data["kode_matkul"]}-{tahun}'
-        worksheet_kontrak.merge_range("K2:L3", "Kode Dokumen", header_small)
-        worksheet_kontrak.merge_range("K4:L5", str(kode_dokumen_kontrak), header_small)
-
-        # --- Info Mata Kuliah ---
-        worksheet_kontrak.merge_range("B6:D6", "MATA KULIAH (MK)", title_format)
-        worksheet_kontrak.merge_range("E6:F6", "KODE", title_format)
-        worksheet_kontrak.merge_range("G6:H6", "RUMPUN MK", title_format)
-        worksheet_kontrak.merge_range("I6:J6", "BOBOT (SKS)", title_format)
-        worksheet_kontrak.merge_range("K6:L6", "SEMESTER", title_format)
-
-        worksheet_kontrak.merge_range("B7:D7", matkul, text_format)
-        worksheet_kontrak.merge_range("E7:F7", rps_data["kode_matkul"], text_format)
-        worksheet_kontrak.merge_range("G7:H7", rps_data["rumpun"], text_format)
-        worksheet_kontrak.merge_range("I7:J7", str(int(rps_data["bobot_sks"])), text_format)
-        worksheet_kontrak.merge_range("K7:L7", rps_data["semester"], text_format)
-
-        worksheet_kontrak.merge_range("B8:F8", "DOSEN PENGAMPU", title_format)
-        worksheet_kontrak.write("G8", "KELAS", title_format)
-        worksheet_kontrak.write("H8", "JUMLAH MAHASISWA", title_format)
-        worksheet_kontrak.merge_range("I8:J8", "HARI PERTEMUAN", title_format)
-        worksheet_kontrak.merge_range("K8:L8", "TEMPAT PERTEMUAN", title_format)
-
-        # Buat 4 baris kosong dulu
-        for i in range(4):
-            worksheet_kontrak.merge_range(f"B{9+i}:F{9+i}", "", text_cpl_format)
-
-        # Isi nama dosen sesuai jumlah
-        if len(matkul_data["team_teaching"]) < 5:
-            for i in range(len(matkul_data["team_teaching"])):                
-                worksheet_kontrak.write(f"B{9+i}", matkul_data["team_teaching"][i], text_cpl_format)
-        else:
-            worksheet_kontrak.write(f"B{9+i}", matkul_data["team_teaching"][0], text_cpl_format)
-
-        worksheet_kontrak.merge_range("G9:G12", matkul_data["kelas"][0], text_format)
-        worksheet_kontrak.merge_range("H9:H12", matkul_data["jml_mhs"][0], text_format)
-        worksheet_kontrak.merge_range("I9:J12", matkul_data["hari"][0], text_format)
-        worksheet_kontrak.merge_range("K9:L12", matkul_data["tempat"][0], text_format)
-
-        # --- Isi Kontrak Placeholder ---
-        worksheet_kontrak.merge_range("B13:L13", "KONTRAK PERKULIAHAN", title_cpl_format)
-
-        kontrak_sections = [
-            "MANFAAT MATA KULIAH",
-            "DESKRIPSI SINGKAT MATA KULIAH",
-            "TUJUAN PEMBELAJARAN",
-            "MATERI / KAJIAN PERKULIAHAN",
-            "STRATEGI PEMBELAJARAN",
-            "REFRENSI",
-            "TUGAS - TUGAS",
-            "KRITERIA PENILAIAN",
-            "TATA TERTIB",
-            "JADWAL PERKULIAHAN",
-            "KETENTUAN REMEDIAL",
-            "PERNYATAAN",
-        ]
-
-        kontrak_sections_2 = [
-            "\n".join(cpl_cpmk_sub["cpl_desc"]),  # manfaat = semua CPL
-            description_matkul,                   # deskripsi singkat MK
-            "\n".join(cpl_cpmk_sub["subcpmk_desc"]),  # tujuan pembelajaran
-            "\n".join(matkul_data["materi_non_uts_uas_numbered"]),  # materi perkuliahan
-            """Metode pembelajaran dalam kelas ini adalah menggunakan metode small group discussion, Cooperative learning, dan Contextual learning. Sedangkan bentuk pembelajaran adalah berupa : 
-        1. Kuliah tatap muka (luring)
-        2. Diskusi antar mahasiswa sesuai kelompok serta bimbingan dengan dosen sebagai fasilitator;
-        3. Praktik sederhana berupa pembuatan tugas kelompok dan individu.""",
-            "\n".join(matkul_data["pustaka_utama"] + matkul_data["pustaka_pendukung"]),  # referensi
-            """1. Tugas perkuliahan dapat berupa tugas individu maupun tugas kelompok (dilihat pada RTM)
-        2. Tugas diberikan oleh dosen pengampu mata kuliah berdasarkan materi yang sedang dibahas, dapat berupa gambar dan uraian
-        3. Format tugas maupun waktu pengumpulan tugas ditentukan pada saat tugas diberikan oleh dosen pengampu.
-        4. Keterlambatan pengumpulan tugas dari waktu yang telah ditentukan akan mendapat pengurangan nilai.""",
-            """Nilai akhir mata kuliah diperoleh dari beberapa komponen penilaian seperti Latihan soal, Tugas Mandiri, Quiz, UTS, dan UAS. Bobot penilaian secara umum dikelompokkan sebagai berikut :                                                                                                                                                                                                                                                                                                                               
-        1. Latihan soal 
-        2. Tugas Mandiri
-        3. Quiz
-        4. Ujian Tengah Semester 
-        5. Ujian Akhir Semester
-
-        Nilai akhir diatas dikonversikan kedalam huruf mutu menggunakan kriteria penilaian sbb:
-        RENTANGAN NILAI :
-        80.00 – 100     = A         Unggul
-        75.00 – 79.99  = AB        Baik Sekali
-        70.00 – 74.99  = B          Baik
-        60.00 – 69.99  = BC        Cukup Baik
-        55.00 – 59.99  = C          Cukup
-        50.00 – 54.99  = CD        Kurang
-        44.00 – 49.99  = D          Sangat Kurang
-        0.00 – 43.99    = E          Gagal
-        0.00 – 0.00      = T          Tidak Aktif""",
-            """1. Mahasiswa diwajibkan menggunakan pakaian yang pantas (kemeja/kaos tidak oblong) pada waktu mengikuti perkuliahan di kelas maupun online.
-        2. Mahasiswa wajib menaktifkan video kamera saat melakukan kuliah daring / zoom meeting.
-        3. Keterlambatan masuk di kelas hanya diijinkan maksimal 60 menit dari jadwal, kecuali ada hal-hal yang bersifat khusus.
-        4. Pada perkuliahan daring/online, mahasiswa tidak diperkenankan melakukan keributan di kelas dalam bentuk apapun selama perkuliahan berlangsung, kecuali pada saat diskusi (saat zoom meeting mode mute kecuali saat diijinkan berbicara).
-        5. Mahasiswa wajib hadir minimal 75 % dari tatap muka, jika dibawah 75% maka tidak diperkenankan mengikuti remidi
-        6. Tidak ada ujian susulan untuk UTS dan UAS, kecuali dengan alasan jelas.
-        7. Hasil evaluasi mahasiswa wajib dikembalikan pada mahasiswa 2 minggu setelah ujian berakhir.
-        8. Protes nilai dilayani paling lama 1 minggu setelah nilai keluar
-        9. Mahasiswa diperkenankan membawa makanan ringan dan minuman didalam kelas saat praktik di lab. dan diharapkan untuk menjaga kebersihan""",
-            "Terlampir",  # jadwal
-            "Hal-hal lain yang belum dicantumkan disini akan diatur kemudian.",  # ketentuan remedial
-            """Saya yang bertandatangan dibawah ini menyatakan bahwa :
-        (1) Telah memahami dan bersedia untuk menerima serta mentaati semua yang telah diuraikan dalam kontrak perkuliahan ini dengan penuh kesadaran dan tanggungjawab.
-        (2) Bersedia menerima sanksi atas pelanggaran yang dilakukan."""  # pernyataan
-        ]
-
-        # --- Tulis ke worksheet ---
-        worksheet_kontrak.set_row(13, 15*8)  # baris 14
-        worksheet_kontrak.set_row(14, 15*8)  # baris 15
-        worksheet_kontrak.set_row(15, 15*8)  # baris 16
-        worksheet_kontrak.set_row(16, 15*len(matkul_data["materi_non_uts_uas_numbered"]))  # baris 17
-        worksheet_kontrak.set_row(17, 15*8)  # baris 18
-        worksheet_kontrak.set_row(18, 15*(len(matkul_data["pustaka_utama"])+len(matkul_data["pustaka_pendukung"])))  # baris 19
-        worksheet_kontrak.set_row(19, 15*8)  # baris 20
-        worksheet_kontrak.set_row(20, 15*20)  # baris 21
-        worksheet_kontrak.set_row(21, 15*15)  # baris 22
-        worksheet_kontrak.set_row(24, 15*8)  # baris 25
-        for i, (judul, isi) in enumerate(zip(kontrak_sections, kontrak_sections_2)):
-            row = 14 + i
-            worksheet_kontrak.write(f"B{row}", i + 1, text_format)
-            worksheet_kontrak.merge_range(f"C{row}:E{row}", judul, title_kontrak_format)
-            worksheet_kontrak.merge_range(f"F{row}:L{row}", isi, text_cpl_format)
-        
-        today = datetime.now().strftime("%d-%m-%Y")
-        worksheet_kontrak.merge_range("B28:L28", today, text_ttd_format)
-        worksheet_kontrak.merge_range("B29:D29", "Perwakilan Mahasiswa", text_ttd_format)
-        worksheet_kontrak.merge_range("B35:D35", "_______________________________", text_ttd_format)
-        worksheet_kontrak.merge_range("B36:D36", "NIM.", text_ttd_format)
-
-        worksheet_kontrak.merge_range("J29:L29", "Koordinator MK", text_ttd_format)
-        worksheet_kontrak.merge_range("J35:L35", matkul_data["team_teaching"][0], text_ttd_format)
-        worksheet_kontrak.merge_range("J36:L36", matkul_data["nik"][0], text_ttd_format)
-
-        # Bagian Mengetahui
-        worksheet_kontrak.merge_range("F40:H40", "Mengetahui", text_ttd_format)
-        worksheet_kontrak.merge_range("F41:H41", "Ketua Program Studi Teknik Komputer", text_ttd_format)
-        worksheet_kontrak.merge_range("F42:H42", "Fakultas Teknik dan Perencanaan", text_ttd_format)
-        worksheet_kontrak.merge_range("F43:H43", "Universitas Warmadewa", text_ttd_format)
-
-        # Spasi tanda tangan (misalnya 2–3 baris kosong)
-        worksheet_kontrak.merge_range("F48:H48", "I Made Surya Kumara, S.T., M.Sc.", text_ttd_format)
-        worksheet_kontrak.merge_range("F49:H49", "NIK. 230700584", text_ttd_format)
-
-        ############################## PORTO ############################################
-        # --- Buat worksheet Portofolio Penilaian ---
-        sheet_title_porto = f"LEMBAR KERJA - PORTO"
-        worksheet_porto = workbook.add_worksheet(sheet_title_porto)
-
-        # Helper: konversi index kolom ke huruf Excel
-        def colnum_to_excel_name(n):
-            """Convert column number (1=A, 2=B, ...) to Excel letter(s)."""
-            name = ""
-            while n > 0:
-                n, remainder = divmod(n - 1, 26)
-                name = chr(65 + remainder) + name
-            return name
-
-        # Hitung total kolom untuk portofolio
-        total_cols = (len(matkul_data["subcpmk_weekly"]) * 3) + len(cpl_cpmk_sub["cpl_kode"]) + 2  
-
-        # Mulai dari kolom E → index = 5
-        end_col_index = 5 + total_cols - 1  
-        end_col_letter = colnum_to_excel_name(end_col_index)
-
-        end_col_min_index = end_col_index - 1  
-        end_col_min_letter = colnum_to_excel_name(end_col_min_index)
-
-        end_col_header = end_col_index - 6
-        end_col_header_letter = colnum_to_excel_name(end_col_header)
-
-        startkode_col_header = end_col_header + 1
-        startkode_col_header_letter = colnum_to_excel_name(startkode_col_header)
-
-        # Atur ukuran kolom sama dengan rubrik
-        worksheet_porto.set_column("A:A", 2)
-        worksheet_porto.set_column("B:B", 5)
-        worksheet_porto.set_column("C:C", 15)       
-        worksheet_porto.set_column("D:D", 30)
-        worksheet_porto.set_column(f"E:{end_col_letter}", 5)       
-        worksheet_porto.set_row(1, 22)  # baris 2
-        worksheet_porto.set_row(2, 22)  # baris 3
-        worksheet_porto.set_row(3, 22)  # baris 4
-        worksheet_porto.set_row(4, 28)  # baris 5
-
-        # Logo
-        worksheet_porto.merge_range("B2:C5", "", header_medium)
-        worksheet_porto.insert_image("B2", "data/logo.png", {
-            "x_scale": 1.5,
-            "y_scale": 1.5,
-            "x_offset": 10,
-            "y_offset": 2,
-        })
-
-        # --- Header utama ---
-        worksheet_porto.merge_range(f"D2:{end_col_header_letter}2", "UNIVERSITAS WARMADEWA", header_medium)
-        worksheet_porto.merge_range(f"D3:{end_col_header_letter}3", "FAKULTAS TEKNIK DAN PERENCANAAN", header_medium)
-        worksheet_porto.merge_range(f"D4:{end_col_header_letter}4", "PROGRAM STUDI TEKNIK KOMPUTER", header_medium)
-        worksheet_porto.merge_range(f"D5:{end_col_header_letter}5", "PORTOFOLIO PENILAIAN", header_big)
-
-        kode_dokumen_porto = f'FTP-TKOM-PORTO-{rps_data["kode_matkul"]}-{tahun}'
-        worksheet_porto.merge_range(f"{startkode_col_header_letter}2:{end_col_letter}3", "Kode Dokumen", header_small)
-        worksheet_porto.merge_range(f"{startkode_col_header_letter}4:{end_col_letter}5", str(kode_dokumen_porto), header_small)
-
-        # --- Info MK ---
-        worksheet_porto.merge_range("B6:D6", "Mata Kuliah", title_cpl_format)
-        worksheet_porto.merge_range(f"E6:{end_col_letter}6", matkul, text_cpl_format)
-
-        worksheet_porto.merge_range("B7:D7", "Kode Mata Kuliah", title_cpl_format)
-        worksheet_porto.merge_range(f"E7:{end_col_letter}7", rps_data["kode_matkul"], text_cpl_format)
-
-        worksheet_porto.merge_range("B8:D8", "Kelas", title_cpl_format)
-        worksheet_porto.merge_range(f"E8:{end_col_letter}8", matkul_data["kelas"][0], text_cpl_format)
-
-        worksheet_porto.merge_range("B9:D9", "Semester", title_cpl_format)
-        worksheet_porto.merge_range(f"E9:{end_col_letter}9", rps_data["semester"][0], text_cpl_format)
-
-        worksheet_porto.merge_range("B10:D10", "Tahun Ajaran", title_cpl_format)
-        worksheet_porto.merge_range(f"E10:{end_col_letter}10", matkul_data["tahun_ajar"][0], text_cpl_format)
-
-        # Dosen pengampu
-        worksheet_porto.merge_range(f"B11:D14", "Dosen Pengampu", title_cpl_format)
-
-        # Isi dosen mulai dari baris 12
-        for i, dosen in enumerate(matkul_data["team_teaching"]):
-            worksheet_porto.merge_range(f"E{11+i}:{end_col_letter}{11+i}", dosen, text_cpl_format)
-
-        # --- Step 1: Siapkan kriteria_kode ---
-        kriteria_kode = []
-        for item in matkul_data["kriteria_numbered"]:
-            before_colon = item.split(":")[0].strip()
-            inside_bracket = re.search(r"\[(.*?)\]", item)
-            inside_bracket = inside_bracket.group(0) if inside_bracket else ""
-            kriteria_kode.append(f"{before_colon} {inside_bracket}")
-
-        # --- Step 2: Mapping subcpmk → cpl, cpmk ---
-        mapping = {
-            sub: (matkul_data["cpl_bobot"][i], matkul_data["cpmk_bobot"][i])
-            for i, sub in enumerate(matkul_data["subcpmk_bobot"])
+@bp.route("/healthz")
+def healthz():
+    """Liveness: proses hidup dan bisa melayani request"""
+    return jsonify({"status": "ok"})
+
+
+@bp.route("/readyz")
+def readyz():
+    """Readiness: 200 hanya kalau aset dan kurikulum sudah dimuat, selain itu 503.
+
+    Worker yang belum warm (mis. WARM_UP=False atau file kurikulum baru
+    tersedia) dimuat di sini, jadi proxy yang polling /readyz sekaligus
+    memanaskannya sebelum traffic masuk.
+    """
+    app = current_app._get_current_object()
+    errors = {}
+    if not assets_loaded(app):
+        try:
+            load_assets(app)
+        except OSError as e:
+            errors["assets"] = str(e)
+    curriculum_store = app.extensions["curriculum"]
+    curricula = app.extensions["curricula"]
+    watcher = app.extensions["curriculum_watcher"]
+    try:
+        # Saat degraded tidak membaca file lagi sebelum backoff lewat
+        curriculum_store.get()
+    except CurriculumUnavailable as e:
+        errors["curriculum"] = str(e)
+    if curriculum_store.degraded:
+        errors.setdefault("curriculum", curriculum_store.last_error)
+
+    snapshot = curriculum_store.current
+    sheet_cache = app.extensions["sheet_part_cache"]
+    sheet_lookups = sheet_cache.hits + sheet_cache.misses
+    curriculum_lookups = curriculum_store.hits + curriculum_store.compiles
+    # Degraded tetap 200: request masih dilayani dari snapshot terakhir yang valid
+    ready = assets_loaded(app) and snapshot is not None
+    if not ready:
+        status = "not_ready"
+    elif curriculum_store.degraded:
+        status = "degraded"
+    else:
+        status = "ready"
+    body = {
+        "status": status,
+        "checks": {
+            "assets": assets_loaded(app),
+            "curriculum": snapshot is not None,
+            "curriculum_fresh": not curriculum_store.degraded,
+        },
+        "errors": errors,
+        "curriculum": snapshot and {
+            "path": snapshot.path,
+            "version": snapshot.version,
+            "loaded_at": snapshot.loaded_at.isoformat(timespec="seconds"),
+            "courses": len(snapshot.matkul_list()),
+        },
+        "curriculum_failures": curriculum_store.degraded and {
+            "consecutive": curriculum_store.failures,
+            "last_error": curriculum_store.last_error,
+            "retry_in_s": round(max(0.0, curriculum_store.retry_at - time.monotonic()), 1),
+        } or None,
+        "caches": {
+            "sheet_part": {
+                "entries": len(sheet_cache),
+                "bytes": sheet_cache.size,
+                "max_bytes": sheet_cache.max_bytes,
+                "hit_rate": round(sheet_cache.hits / sheet_lookups, 3) if sheet_lookups else None,
+                "invalidations": sheet_cache.invalidations,
+            },
+            "curriculum": {
+                "compiles": curriculum_store.compiles,
+                "hit_rate": round(curriculum_store.hits / curriculum_lookups, 3) if curriculum_lookups else None,
+            },
+            "curricula": {
+                "registered": len(curricula.ids()),
+                "loaded": sorted(curricula.loaded()),
+                "bytes": curricula.size,
+                "max_bytes": curricula.max_bytes,
+                "evictions": curricula.evictions,
+            },
+        },
+        "watcher": watcher and {
+            "backend": watcher.backend,
+            "running": watcher.running,
+            "reloads": watcher.reloads,
+        },
+        "queue": {
+            "in_flight": app.extensions["metrics"]["rps_generations_in_flight"].value(),
+            "render_processes": app.config["RENDER_PROCESSES"],
+        },
+    }
+    return jsonify(body), 200 if ready else 503
+
+
+@bp.route("/metrics")
+def metrics():
+    """Metrik proses ini dalam format teks Prometheus"""
+    return Response(current_app.extensions["metrics"].render(), content_type=CONTENT_TYPE)
+
+
+@bp.before_app_request
+def assign_request_id():
+    request_id = request.headers.get("X-Request-ID", "")
+    g.request_id = request_id if REQUEST_ID_PATTERN.match(request_id) else uuid.uuid4().hex
+
+
+@bp.before_app_request
+def ensure_services():
+    if current_app.config["BACKGROUND_SERVICES"]:
+        start_services(current_app._get_current_object())
+
+
+@bp.before_app_request
+def start_request_timer():
+    g.request_start = time.perf_counter()
+    g.stage_timings, g.stage_token = begin_stages(current_app.config["MEMORY_BUDGET_BYTES"])
+    if request.endpoint == "rps.download_rps":
+        current_app.extensions["metrics"]["rps_generations_in_flight"].inc()
+        g.in_flight = True
+
+
+@bp.after_app_request
+def record_request_metrics(response):
+    start = g.pop("request_start", None)
+    if start is None:
+        return response
+    response.headers["X-Request-ID"] = g.request_id
+    elapsed = time.perf_counter() - start
+    registry = current_app.extensions["metrics"]
+    endpoint = request.url_rule.rule if request.url_rule else "unmatched"
+    registry["rps_http_requests_total"].inc(endpoint=endpoint, method=request.method, status=response.status_code)
+    registry["rps_http_request_duration_seconds"].observe(elapsed, endpoint=endpoint)
+
+    timings = g.stage_timings
+    for name, seconds in timings.items():
+        registry["rps_stage_duration_seconds"].observe(seconds, stage=name)
+    for name, peak in timings.peaks.items():
+        registry["rps_stage_peak_memory_bytes"].observe(peak, stage=name)
+
+    generation = g.pop("generation", None)
+    history = current_app.extensions["history"]
+    if generation is not None and history is not None:
+        if generation.get("matkul") and generation.get("tahun"):
+            # Di-hash thread penulis riwayat, bukan di jalur request; request
+            # yang gagal parse juga tercatat
+            generation["upload_path"] = get_upload_path(generation["matkul"], generation["tahun"])
+        history.record(dict(
+            generation,
+            ts=datetime.now().isoformat(timespec="seconds"),
+            request_id=g.request_id,
+            duration_ms=round(elapsed * 1000, 1),
+            stages={name: round(seconds * 1000, 1) for name, seconds in timings.items()},
+            sheets=timings.counts.get("sheets", 0),
+            cache_hits=timings.counts.get("sheet_cache_hits", 0),
+            cache_misses=timings.counts.get("sheet_cache_misses", 0),
+            status=response.status_code,
+        ))
+    # Rincian per tahap terlihat di tab Network/Timing devtools browser
+    if timings.items():
+        response.headers["Server-Timing"] = server_timing(timings, total=elapsed)
+    return response
+
+
+@bp.teardown_app_request
+def stop_stage_timer(exc):
+    token = g.pop("stage_token", None)
+    if token is not None:
+        end_stages(token)
+    if g.pop("in_flight", False):
+        current_app.extensions["metrics"]["rps_generations_in_flight"].dec()
+
+
+def admin_token():
+    return request.headers.get("X-Admin-Token") or request.args.get("token")
+
+
+@bp.route("/admin/profiles")
+def list_profiles():
+    """Daftar profil yang tersimpan (JSON), terbaru dulu"""
+    require_admin(admin_token())
+    profiles = current_app.extensions["profiles"].list()
+    for profile in profiles:
+        profile["files"] = {
+            kind: url_for("rps.download_profile", profile_id=profile["id"], kind=kind)
+            for kind in ARTIFACT_KINDS
         }
+    return jsonify(profiles)
 
-        # --- Step 3: Isi cpl_weekly & cpmk_weekly ---
-        cpl_weekly = []
-        cpmk_weekly = []
-        for sub in matkul_data["subcpmk_weekly"]:
-            cpl, cpmk = mapping[sub]
-            cpl_weekly.append(cpl)
-            cpmk_weekly.append(cpmk)
-
-        # --- Step 4: Buat data_porto sebagai dict ---
-        data_porto = [
-            {
-                "kriteria_kode": kriteria_kode[i],
-                "subcpmk": matkul_data["subcpmk_weekly"][i],
-                "cpmk": cpmk_weekly[i],
-                "cpl": cpl_weekly[i],
-                "bobot": matkul_data["bobot"][i]
-            }
-            for i in range(len(matkul_data["subcpmk_weekly"]))
-        ]
-
-        # --- Step 5: Reorder by cpl ---
-        data_porto_reordered = sorted(data_porto, key=lambda x: x["cpl"])
-
-        # --- Step 6: Sisipkan "NILAI PER CPL" bila CPL berubah ---
-        final_data = []
-        last_cpl = None
-        for row in data_porto_reordered:
-            current_cpl = row["cpl"]
-            if last_cpl is not None and current_cpl != last_cpl:
-                final_data.append({
-                    "kriteria_kode": "NILAI PER CPL",
-                    "subcpmk": "",
-                    "cpmk": "",
-                    "cpl": "",
-                    "bobot": ""
-                })
-            final_data.append(row)
-            last_cpl = current_cpl
-
-        final_data.append({
-                    "kriteria_kode": "NILAI PER CPL",
-                    "subcpmk": "",
-                    "cpmk": "",
-                    "cpl": "",
-                    "bobot": ""
-                })
-        
-        # --- Step 7: Tulis ke worksheet ---
-        row_start = 14
-        col_start = 4  # Kolom E = index 4 kalau 0-based
-
-        # B15:D18
-        worksheet_porto.merge_range("B15:D15", "Threshold (%)", title_porto_format)
-        worksheet_porto.merge_range("B16:D16", "Rerata CPL", title_porto_format)
-        worksheet_porto.merge_range("B17:D17", "CPL-PRODI yang dibebankan pada MK", title_porto_format)
-        worksheet_porto.merge_range("B18:D18", "Ketercapaian Tiap CPL (%)", title_porto_format)
-
-        # B19:D19
-        worksheet_porto.merge_range("B19:B23", "NO", text_porto_format)
-        worksheet_porto.merge_range("C19:C23", "NIM", text_porto_format)
-        worksheet_porto.merge_range("D19:D23", "NAMA MAHASISWA", text_porto_format)
-
-        worksheet_porto.merge_range(f"{end_col_min_letter}15:{end_col_min_letter}18", "", title_porto_format)
-        worksheet_porto.merge_range(f"{end_col_letter}15:{end_col_letter}18", "", title_porto_format)
-
-        worksheet_porto.merge_range(f"{end_col_min_letter}19:{end_col_min_letter}23", "NILAI AKHIR", text_porto_format)
-        worksheet_porto.merge_range(f"{end_col_letter}19:{end_col_letter}23", "HURUF", text_porto_format)
-
-        # --- Header bagian final_data ---        
-        current_col = col_start  # mulai dari kolom E   
-        current_col_2 = col_start 
-        # --- Row 15, 16, 18 ---  
-        # Hitung jumlah CPL
-        cpl_counts = {}
-        for item in final_data:
-            cpl = item["cpl"]
-            if cpl:
-                cpl_counts[cpl] = cpl_counts.get(cpl, 0) + 1
-
-        row_threshold = row_start + 1  # 15
-        row_rerata    = row_start + 2  # 16
-        row_ketercap  = row_start + 4  # 18
-
-        # Row 15: Threshold
-        # print(bobot_per_cpl)        
-        # print(matkul_data["cpl_bobot"])
-        # print(cpl_cpmk_sub["cpl_kode"])
-        # print(total_per_cpl)
-
-        # Row 15: Threshold diganti total_per_cpl
-        current_col = col_start
-        for cpl, count in cpl_counts.items():
-            span = count * 3 + 1
-            start_col = xl_col_to_name(current_col)
-            end_col   = xl_col_to_name(current_col + span - 1)
-
-            # cari index cpl di cpl_cpmk_sub["cpl_kode"]
-            idx = cpl_cpmk_sub["cpl_kode"].index(cpl)
-            nilai_threshold = total_per_cpl[idx]
-
-            worksheet_porto.merge_range(
-                f"{start_col}{row_threshold}:{end_col}{row_threshold}",
-                nilai_threshold,
-                title_threshold_format
-            )
-
-            current_col += span
-
-        # Row 16: Rerata
-        current_col = col_start
-        for cpl, count in cpl_counts.items():
-            span = count * 3 + 1
-            start_col = xl_col_to_name(current_col)
-            end_col   = xl_col_to_name(current_col + span - 1)
-            worksheet_porto.merge_range(f"{start_col}{row_rerata}:{end_col}{row_rerata}", "[rata-rata NILAI PER CPL]", title_porto_format)
-            current_col += span
-
-        # Row 18: Ketercapaian
-        current_col = col_start
-        for cpl, count in cpl_counts.items():
-            span = count * 3 + 1
-            start_col = xl_col_to_name(current_col)
-            end_col_2   = xl_col_to_name(current_col + span - 1)
-            end_col   = xl_col_to_name(current_col + span - 2)
-            worksheet_porto.merge_range(f"{start_col}{row_ketercap}:{end_col}{row_ketercap}", "[=Rerata CPL/Treshold/100]", title_porto_format)
-            worksheet_porto.write(f"{end_col_2}{row_ketercap}", "", title_porto_format)
-            current_col += span
-
-        for item in final_data:
-            cpl = item["cpl"]
-            cpmk = item["cpmk"]
-            subcpmk = item["subcpmk"]
-            kriteria = item["kriteria_kode"]
-            bobot = item["bobot"]
-
-            # --- Row 17: CPL ---
-            if cpl and "NILAI PER CPL" not in kriteria:
-                worksheet_porto.merge_range(row_start+2, current_col_2, row_start+2, current_col_2+2, cpl, title_porto_format)
-                span = 3
-            else:
-                worksheet_porto.write(row_start+2, current_col_2, cpl or "", title_porto_format)
-                span = 1
-
-            # --- Row 19: CPMK ---
-            if cpmk and "NILAI PER CPL" not in kriteria:
-                worksheet_porto.merge_range(row_start+4, current_col_2, row_start+4, current_col_2+span-1, cpmk, text_porto_format)
-            else:
-                worksheet_porto.write(row_start+4, current_col_2, cpmk or "", text_porto_format)
-
-            # --- Row 20: SubCPMK ---
-            if subcpmk and "NILAI PER CPL" not in kriteria:
-                worksheet_porto.merge_range(row_start+5, current_col_2, row_start+5, current_col_2+span-1, subcpmk, text_porto_format)
-            else:
-                worksheet_porto.write(row_start+5, current_col_2, subcpmk or "", text_porto_format)
-
-            # --- Row 21: Kriteria kode ---
-            if kriteria == "NILAI PER CPL":
-                worksheet_porto.write(row_start+6, current_col_2, kriteria, text_porto_format)
-            else:
-                if span == 3:
-                    worksheet_porto.merge_range(row_start+6, current_col_2, row_start+6, current_col_2+span-1, kriteria, text_porto_format)
-                else:
-                    worksheet_porto.write(row_start+6, current_col_2, kriteria, text_porto_format)
-
-            # --- Row 22 & 23: NILAI, Tambahan, SUB BOBOT ---
-            if span == 3:
-                # Merge NILAI ke bawah
-                worksheet_porto.merge_range(
-                    row_start+7, current_col_2, row_start+8, current_col_2,
-                    "NILAI", text_porto_format
-                )
-                # Merge Tambahan ke bawah
-                worksheet_porto.merge_range(
-                    row_start+7, current_col_2+1, row_start+8, current_col_2+1,
-                    "Tambahan", text_porto_format
-                )
-                # SUB BOBOT hanya di row 22
-                worksheet_porto.write(row_start+7, current_col_2+2, "SUB BOBOT", text_porto_format)
 
-                # Bobot tetap di row 23 kolom SUB BOBOT
-                worksheet_porto.write(row_start+8, current_col_2+2, bobot, text_porto_format)
-            else:
-                worksheet_porto.write(row_start+7, current_col_2, "", text_porto_format)
-                worksheet_porto.write(row_start+8, current_col_2, bobot if bobot else "", text_porto_format)
+@bp.route("/admin/profiles/<profile_id>.<kind>")
+def download_profile(profile_id, kind):
+    require_admin(admin_token())
+    if kind not in ARTIFACT_KINDS:
+        abort(404, description=f"Jenis artefak tidak dikenal: {kind}")
+    return send_from_directory(
+        current_app.extensions["profiles"].folder, f"{secure_filename(profile_id)}.{kind}", as_attachment=True,
+    )
 
-            # Geser ke kolom berikutnya
-            current_col_2 += span
 
-            
+@bp.route("/admin/history")
+def list_history():
+    """Riwayat generate terbaru (JSON); filter: since, until, matkul, status, limit"""
+    require_admin(admin_token())
+    history = current_app.extensions["history"]
+    if history is None:
+        abort(404, description="Riwayat generate tidak aktif")
+    limit = request.args.get("limit", 100, type=int)
+    if limit < 1:
+        abort(400, description="limit minimal 1")
+    limit = min(limit, current_app.config["HISTORY_MAX_RESULTS"])
+    return jsonify(history.recent(limit=limit, **history_filters()))
+
+
+@bp.route("/admin/history/latency")
+def history_latency():
+    """p50/p95 latency per mata kuliah (``group=matkul``), per hari, atau per jam"""
+    require_admin(admin_token())
+    history = current_app.extensions["history"]
+    if history is None:
+        abort(404, description="Riwayat generate tidak aktif")
+    group = request.args.get("group", "matkul")
+    if group not in GROUPS:
+        abort(400, description=f"group harus salah satu dari: {', '.join(GROUPS)}")
+    # Default hanya request yang berhasil; status=all untuk semua
+    filters = history_filters(default_status=200)
+    return jsonify({"group": group, "rows": history.latency(group, **filters)})
+
+
+def history_filters(default_status=None):
+    status = request.args.get("status")
+    if status == "all":
+        status = None
+    elif status is None:
+        status = default_status
+    elif not status.isdigit():
+        abort(400, description=f"status tidak valid: {status}")
+    return {
+        "since": request.args.get("since"),
+        "until": request.args.get("until"),
+        "matkul": request.args.get("matkul"),
+        "status": int(status) if status is not None else None,
+    }
 
-        workbook.close()
-        output.seek(0)
 
-        return send_file(
-            output,
-            as_attachment=True,
-            download_name=f"RPS_RPM_RUB_KTR_PORTO_{matkul}_{tahun}.xlsx",
-            mimetype="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-        )
+def record_error(error):
+    # Pesan error ikut disimpan di riwayat generate kalau request-nya download
+    if "generation" in g:
+        g.generation.setdefault("error", error.description)
 
-    except Exception as e:
-        logger.error(f"Error generating Excel file: {e}")
-        abort(500, description=f"Terjadi kesalahan saat membuat file Excel: {str(e)}")
-
-@app.route("/download-template")
-def download_template():
-    return send_from_directory(
-        "data", 
-        "Template Rubrik.xlsx", 
-        as_attachment=True
-    )
 
 # Add error handlers
-@app.errorhandler(400)
+@bp.app_errorhandler(400)
 def bad_request(error):
+    record_error(error)
     return render_template('error.html', 
                         error_code=400, 
                         error_message=error.description), 400
 
-@app.errorhandler(404)
+@bp.app_errorhandler(403)
+def forbidden(error):
+    return render_template('error.html',
+                        error_code=403,
+                        error_message=error.description), 403
+
+@bp.app_errorhandler(404)
 def not_found(error):
+    record_error(error)
+    if is_api_request():
+        # Termasuk URL API yang tidak cocok dengan route mana pun
+        return api_error(error)
     return render_template('error.html',
                         error_code=404, 
                         error_message=error.description), 404
 
-@app.errorhandler(500)
+@bp.app_errorhandler(413)
+def too_large(error):
+    record_error(error)
+    return render_template('error.html',
+                        error_code=413,
+                        error_message=error.description), 413
+
+@bp.app_errorhandler(503)
+def unavailable(error):
+    record_error(error)
+    response = current_app.make_response((render_template('error.html',
+                        error_code=503,
+                        error_message=error.description), 503))
+    try:
+        retry_at = current_app.extensions["curricula"].store(selected_curriculum()).retry_at
+    except UnknownCurriculum:
+        retry_at = None
+    if retry_at is not None:
+        response.retry_after = max(1, round(retry_at - time.monotonic()))
+    return response
+
+@bp.app_errorhandler(500)
 def internal_error(error):
+    record_error(error)
     return render_template('error.html', 
                         error_code=500, 
                         error_message=error.description), 500
 
 if __name__ == "__main__":
-    app.run(debug=True)
\ No newline at end of file
+    create_app({"BACKGROUND_SERVICES": True}).run(debug=True)
\ No newline at end of file
@@ -0,0 +1,224 @@
+"""
+Microbenchmark tahap parse, derive, dan render generator RPS.
+
+Contoh:
+    python benchmarks/bench.py                          # jalankan semua ukuran
+    python benchmarks/bench.py --save-baseline          # simpan hasil sebagai baseline
+    python benchmarks/bench.py --threshold 0.15         # bandingkan dengan baseline
+
+Tiap tahap diukur terpisah untuk mata kuliah sintetis ukuran small, typical,
+dan oversized. Hasil (mean, p95, peak memory) ditulis ke JSON; kalau baseline
+ada, tahap yang lebih lambat dari ``threshold`` dianggap regresi dan exit
+code menjadi 1.
+"""
+import argparse
+import json
+import math
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import app as rps_app  # noqa: E402
+from curriculum import compile_curriculum  # noqa: E402
+from engine import CurriculumSlice, Engine, FileSink  # noqa: E402
+from layout import build_rps_context, render_workbook  # noqa: E402
+from synthetic import SIZES, course_name, make_dataset  # noqa: E402
+
+TAHUN = "2025"
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    index = max(0, math.ceil(pct / 100 * len(ordered)) - 1)
+    return ordered[index]
+
+
+def measure(func, repeat):
+    """Jalankan ``func`` sebanyak ``repeat`` kali; peak memory diukur di run terpisah"""
+    func()  # warm-up (import lazy, cache bytecode, dll.)
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append((time.perf_counter() - start) * 1000)
+
+    # tracemalloc memperlambat eksekusi, jadi tidak dicampur dengan timing
+    tracemalloc.start()
+    try:
+        func()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return {
+        "runs": repeat,
+        "mean_ms": round(statistics.mean(timings), 3),
+        "p95_ms": round(percentile(timings, 95), 3),
+        "peak_kib": round(peak / 1024, 1),
+    }
+
+
+def stages(flask_app, curriculum_file, matkul):
+    """Daftar (nama tahap, fungsi tanpa argumen) untuk satu mata kuliah"""
+    client = flask_app.test_client()
+    sheet_cache = flask_app.extensions["sheet_part_cache"]
+    with flask_app.app_context():
+        rps_data = rps_app.get_rps_data(matkul)
+        cpl_cpmk_sub = rps_app.get_cpl_cpmk_sub_list(matkul)
+        matkul_data = rps_app.get_matkul_data(matkul, TAHUN)
+    today = datetime(2025, 1, 1)
+
+    def in_context(func, *args):
+        def run():
+            with flask_app.app_context():
+                return func(*args)
+        return run
+
+    def derive():
+        return build_rps_context(matkul, TAHUN, rps_data, cpl_cpmk_sub, matkul_data, today=today)
+
+    def render():
+        # Tanpa SheetPartCache: mengukur biaya plan + render penuh
+        ctx = derive()
+        with tempfile.TemporaryFile() as output:
+            render_workbook(output, ctx)
+
+    def generate():
+        # Engine tanpa Flask dan tanpa SheetPartCache, di proses ini
+        curriculum = CurriculumSlice(rps_data, cpl_cpmk_sub, None)
+        with tempfile.TemporaryFile() as output:
+            Engine().generate(FileSink(output), matkul, TAHUN, matkul_data, curriculum, today=today, parallel=False)
+
+    def download():
+        # Request /download-rps lengkap; cache sheet dikosongkan supaya
+        # setiap iterasi benar-benar merender ulang
+        sheet_cache.clear()
+        response = client.post("/download-rps", data={"nama_matkul": matkul, "tahun": TAHUN})
+        if response.status_code != 200:
+            raise RuntimeError(f"/download-rps {matkul}: HTTP {response.status_code}")
+        response.close()
+
+    return [
+        ("compile_curriculum", lambda: compile_curriculum(curriculum_file)),
+        ("get_matkul_list", in_context(rps_app.get_matkul_list)),
+        ("get_rps_data", in_context(rps_app.get_rps_data, matkul)),
+        ("get_cpl_cpmk_sub_list", in_context(rps_app.get_cpl_cpmk_sub_list, matkul)),
+        ("get_matkul_data", in_context(rps_app.get_matkul_data, matkul, TAHUN)),
+        ("build_rps_context", derive),
+        ("render_workbook", render),
+        ("engine_generate", generate),
+        ("download_rps", download),
+    ]
+
+
+def run(sizes, repeat):
+    results = {}
+    with tempfile.TemporaryDirectory() as directory:
+        curriculum_file, upload_folder = make_dataset(
+            directory, TAHUN, {size: SIZES[size] for size in sizes}
+        )
+        flask_app = rps_app.create_app({
+            "CURRICULUM_FILE": curriculum_file,
+            "UPLOAD_FOLDER": upload_folder,
+            # Riwayat dan log produksi tidak boleh ikut terisi trafik sintetis
+            "HISTORY_DB": None,
+            "LOG_FILE": None,
+            # Output bisa dibandingkan byte per byte antar run
+            "DETERMINISTIC_OUTPUT": True,
+            "RENDER_PROCESSES": 1,
+        })
+        for size in sizes:
+            results[size] = {}
+            for name, func in stages(flask_app, curriculum_file, course_name(size)):
+                results[size][name] = measure(func, repeat)
+                print(f"{size:<10} {name:<22} {format_result(results[size][name])}")
+    return {
+        "meta": {
+            "created": datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "repeat": repeat,
+        },
+        "results": results,
+    }
+
+
+def format_result(result):
+    return f"mean {result['mean_ms']:9.3f} ms  p95 {result['p95_ms']:9.3f} ms  peak {result['peak_kib']:9.1f} KiB"
+
+
+def compare(current, baseline, threshold, min_delta_ms=0.0):
+    """Bandingkan mean dan peak memory dengan baseline; return daftar regresi.
+
+    Kenaikan waktu di bawah ``min_delta_ms`` diabaikan, karena tahap yang
+    hanya beberapa mikrodetik terlalu berisik untuk dibandingkan relatif.
+    """
+    regressions = []
+    for size, size_results in current["results"].items():
+        for name, result in size_results.items():
+            base = baseline["results"].get(size, {}).get(name)
+            if base is None:
+                continue
+            for metric in ("mean_ms", "peak_kib"):
+                if not base[metric]:
+                    continue
+                ratio = result[metric] / base[metric]
+                regressed = ratio > 1 + threshold
+                if metric == "mean_ms" and result[metric] - base[metric] < min_delta_ms:
+                    regressed = False
+                status = "REGRESI" if regressed else "ok"
+                print(f"{size:<10} {name:<22} {metric:<8} {base[metric]:10.3f} -> {result[metric]:10.3f} "
+                      f"({ratio - 1:+.1%}) {status}")
+                if status != "ok":
+                    regressions.append((size, name, metric, ratio))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", nargs="+", choices=list(SIZES), default=list(SIZES))
+    parser.add_argument("--repeat", type=int, default=10, help="jumlah run per tahap (default 10)")
+    parser.add_argument("--output", help="tulis hasil ke file JSON ini")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE, help="file JSON baseline")
+    parser.add_argument("--save-baseline", action="store_true", help="simpan hasil sebagai baseline")
+    parser.add_argument("--threshold", type=float, default=0.2,
+                        help="batas kenaikan relatif sebelum dianggap regresi (default 0.2 = 20%%)")
+    parser.add_argument("--min-delta-ms", type=float, default=1.0,
+                        help="kenaikan waktu absolut minimum untuk dianggap regresi (default 1 ms)")
+    args = parser.parse_args(argv)
+
+    current = run(args.sizes, args.repeat)
+
+    if args.output:
+        with open(args.output, "w") as fh:
+            json.dump(current, fh, indent=2)
+    if args.save_baseline:
+        with open(args.baseline, "w") as fh:
+            json.dump(current, fh, indent=2)
+        print(f"Baseline disimpan ke {args.baseline}")
+        return 0
+    if not os.path.exists(args.baseline):
+        print(f"Baseline {args.baseline} belum ada, jalankan dengan --save-baseline")
+        return 0
+
+    with open(args.baseline) as fh:
+        baseline = json.load(fh)
+    print()
+    regressions = compare(current, baseline, args.threshold, args.min_delta_ms)
+    if regressions:
+        print(f"\n{len(regressions)} regresi melebihi threshold {args.threshold:.0%}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,324 @@
+"""
+Load test konkuren untuk endpoint HTTP generator RPS.
+
+Harness ini membuat data sintetis, menjalankan aplikasi secara lokal (server
+werkzeug threaded di subprocess), lalu menembak ``GET /``, upload ``POST /``,
+dan ``POST /download-rps`` secara bersamaan. Hasilnya throughput, latency
+p50/p95/p99 per endpoint, error rate, dan RSS server (termasuk proses worker
+render) dari waktu ke waktu. Hanya butuh stdlib dan Linux (/proc).
+
+Contoh:
+    python benchmarks/loadtest.py --duration 30 --concurrency 8
+    python benchmarks/loadtest.py --mix index=1,upload=1,download=6 --output hasil.json
+"""
+import argparse
+import json
+import os
+import random
+import signal
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+import uuid
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from synthetic import generate  # noqa: E402
+
+TAHUN = "2025"
+# Upload ditulis ke tahun lain supaya tidak menimpa file yang sedang dibaca
+# request download (yang diukur adalah biaya upload, bukan race file)
+TAHUN_UPLOAD = "2026"
+ENDPOINTS = ["index", "upload", "download"]
+
+
+def percentile(values, pct):
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[max(0, -(-pct * len(ordered) // 100) - 1)]
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def process_rss(pid):
+    """RSS (byte) proses dan semua turunannya, dibaca dari /proc"""
+    total = 0
+    pending = [pid]
+    while pending:
+        current = pending.pop()
+        try:
+            with open(f"/proc/{current}/status") as fh:
+                for line in fh:
+                    if line.startswith("VmRSS:"):
+                        total += int(line.split()[1]) * 1024
+                        break
+            with open(f"/proc/{current}/task/{current}/children") as fh:
+                pending.extend(int(child) for child in fh.read().split())
+        except (FileNotFoundError, ProcessLookupError):
+            continue
+    return total
+
+
+def multipart(fields, files):
+    """Body multipart/form-data sederhana: fields = {nama: nilai}, files = {nama: (filename, bytes)}"""
+    boundary = uuid.uuid4().hex
+    parts = []
+    for name, value in fields.items():
+        parts.append(
+            f'--{boundary}\r\nContent-Disposition: form-data; name="{name}"\r\n\r\n{value}\r\n'.encode()
+        )
+    for name, (filename, data) in files.items():
+        parts.append(
+            f'--{boundary}\r\nContent-Disposition: form-data; name="{name}"; filename="{filename}"\r\n'
+            f"Content-Type: application/vnd.openxmlformats-officedocument.spreadsheetml.sheet\r\n\r\n".encode()
+            + data + b"\r\n"
+        )
+    parts.append(f"--{boundary}--\r\n".encode())
+    return b"".join(parts), f"multipart/form-data; boundary={boundary}"
+
+
+class Server:
+    """Aplikasi yang dijalankan di subprocess terpisah (``--serve``)"""
+
+    def __init__(self, curriculum_file, upload_folder, port, render_processes):
+        self.url = f"http://127.0.0.1:{port}"
+        self.process = subprocess.Popen([
+            sys.executable, os.path.abspath(__file__), "--serve",
+            "--port", str(port),
+            "--curriculum", curriculum_file,
+            "--uploads-dir", upload_folder,
+            "--render-processes", str(render_processes),
+        ], start_new_session=True)
+
+    def wait_ready(self, timeout=30):
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if self.process.poll() is not None:
+                raise RuntimeError("Server berhenti sebelum siap")
+            try:
+                with urllib.request.urlopen(self.url + "/", timeout=1):
+                    return
+            except (urllib.error.URLError, ConnectionError):
+                time.sleep(0.1)
+        raise RuntimeError("Server tidak siap dalam batas waktu")
+
+    def stop(self):
+        # Satu process group, supaya worker pool render ikut berhenti
+        os.killpg(self.process.pid, signal.SIGTERM)
+        try:
+            self.process.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            os.killpg(self.process.pid, signal.SIGKILL)
+
+
+def serve(args):
+    import logging
+
+    from werkzeug.serving import run_simple
+
+    import app as rps_app
+
+    # Log akses per request terlalu ramai dan ikut membebani server
+    logging.getLogger("werkzeug").setLevel(logging.WARNING)
+
+    flask_app = rps_app.create_app({
+        "CURRICULUM_FILE": args.curriculum,
+        "UPLOAD_FOLDER": args.uploads_dir,
+        # Riwayat dan log produksi tidak boleh ikut terisi trafik sintetis
+        "HISTORY_DB": None,
+        "LOG_FILE": None,
+        # Output bisa dibandingkan byte per byte antar run
+        "DETERMINISTIC_OUTPUT": True,
+        "RENDER_PROCESSES": args.render_processes,
+    })
+    run_simple("127.0.0.1", args.port, flask_app, threaded=True)
+
+
+class LoadTest:
+    def __init__(self, base_url, courses, upload_files, mix, download_format="xlsx", seed=0, timeout=60):
+        self.base_url = base_url
+        self.download_format = download_format
+        self.courses = courses
+        self.upload_files = upload_files
+        self.endpoints = list(mix)
+        self.weights = [mix[name] for name in self.endpoints]
+        self.seed = seed
+        self.timeout = timeout
+        self.samples = []  # (endpoint, detik sejak mulai, latency ms, ok)
+        self._lock = threading.Lock()
+
+    def request(self, endpoint, matkul):
+        if endpoint == "index":
+            req = urllib.request.Request(self.base_url + "/")
+        elif endpoint == "upload":
+            filename = os.path.basename(self.upload_files[matkul])
+            with open(self.upload_files[matkul], "rb") as fh:
+                body, content_type = multipart(
+                    {"nama_matkul": matkul, "tahun": TAHUN_UPLOAD}, {"rps_file": (filename, fh.read())}
+                )
+            req = urllib.request.Request(self.base_url + "/", data=body, headers={"Content-Type": content_type})
+        else:
+            body = urllib.parse.urlencode(
+                {"nama_matkul": matkul, "tahun": TAHUN, "format": self.download_format}
+            ).encode()
+            req = urllib.request.Request(self.base_url + "/download-rps", data=body)
+        with urllib.request.urlopen(req, timeout=self.timeout) as response:
+            response.read()
+            return response.status
+
+    def worker(self, index, started, deadline):
+        rnd = random.Random(f"{self.seed}:{index}")
+        while time.monotonic() < deadline:
+            endpoint = rnd.choices(self.endpoints, self.weights)[0]
+            matkul = rnd.choice(self.courses)
+            start = time.monotonic()
+            try:
+                ok = self.request(endpoint, matkul) == 200
+            except (urllib.error.URLError, ConnectionError, TimeoutError, OSError):
+                ok = False
+            latency = (time.monotonic() - start) * 1000
+            with self._lock:
+                self.samples.append((endpoint, start - started, latency, ok))
+
+    def run(self, concurrency, duration, server_pid, sample_interval=1.0):
+        started = time.monotonic()
+        deadline = started + duration
+        threads = [
+            threading.Thread(target=self.worker, args=(i, started, deadline), daemon=True)
+            for i in range(concurrency)
+        ]
+        for thread in threads:
+            thread.start()
+
+        rss = []
+        while any(thread.is_alive() for thread in threads):
+            rss.append((round(time.monotonic() - started, 1), process_rss(server_pid)))
+            time.sleep(sample_interval)
+        for thread in threads:
+            thread.join()
+        # Durasi sampai request terakhir selesai (tanpa sisa jeda sampling RSS)
+        elapsed = max((offset + latency / 1000 for _, offset, latency, _ in self.samples), default=duration)
+        return self.report(elapsed, rss)
+
+    def report(self, elapsed, rss):
+        def summary(samples):
+            latencies = [latency for _, _, latency, _ in samples]
+            errors = sum(1 for *_, ok in samples if not ok)
+            return {
+                "requests": len(samples),
+                "throughput_rps": round(len(samples) / elapsed, 2),
+                "error_rate": round(errors / len(samples), 4) if samples else 0.0,
+                "p50_ms": percentile(latencies, 50),
+                "p95_ms": percentile(latencies, 95),
+                "p99_ms": percentile(latencies, 99),
+            }
+
+        endpoints = {
+            name: summary([s for s in self.samples if s[0] == name])
+            for name in self.endpoints
+        }
+        return {
+            "elapsed_s": round(elapsed, 2),
+            "total": summary(self.samples),
+            "endpoints": endpoints,
+            "rss": [{"t": t, "rss_mib": round(value / 2**20, 1)} for t, value in rss],
+        }
+
+
+def print_report(report):
+    print(f"\nDurasi {report['elapsed_s']} s")
+    print(f"{'endpoint':<10} {'req':>6} {'req/s':>8} {'error':>7} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+    rows = list(report["endpoints"].items()) + [("total", report["total"])]
+    for name, stats in rows:
+        if not stats["requests"]:
+            continue
+        print(f"{name:<10} {stats['requests']:>6} {stats['throughput_rps']:>8.2f} "
+              f"{stats['error_rate']:>7.2%} {stats['p50_ms']:>9.1f} {stats['p95_ms']:>9.1f} {stats['p99_ms']:>9.1f}")
+    if report["rss"]:
+        values = [point["rss_mib"] for point in report["rss"]]
+        print(f"\nRSS server: awal {values[0]} MiB, puncak {max(values)} MiB, akhir {values[-1]} MiB")
+        print("  " + " ".join(f"{point['t']:g}s:{point['rss_mib']:g}" for point in report["rss"]))
+
+
+def parse_mix(text):
+    mix = {}
+    for part in text.split(","):
+        name, _, weight = part.partition("=")
+        if name not in ENDPOINTS:
+            raise ValueError(f"Endpoint tidak dikenal: {name} (pilihan: {', '.join(ENDPOINTS)})")
+        mix[name] = float(weight or 1)
+    return mix
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--duration", type=float, default=20, help="lama pengujian (detik)")
+    parser.add_argument("--concurrency", type=int, default=8, help="jumlah klien bersamaan")
+    parser.add_argument("--mix", default="index=2,upload=1,download=4",
+                        help="bobot endpoint, mis. index=2,upload=1,download=4")
+    parser.add_argument("--courses", type=int, default=10, help="jumlah mata kuliah sintetis")
+    parser.add_argument("--weeks", type=int, default=16)
+    parser.add_argument("--sub-cpmk", type=int, default=6)
+    parser.add_argument("--cpl", type=int, default=3)
+    parser.add_argument("--render-processes", type=int, default=1,
+                        help="RENDER_PROCESSES server (mode ZIP)")
+    parser.add_argument("--format", choices=["xlsx", "zip"], default="xlsx", help="format output download")
+    parser.add_argument("--sample-interval", type=float, default=1.0, help="interval sampling RSS (detik)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="tulis hasil ke file JSON ini")
+    # Mode internal: dipakai subprocess server
+    parser.add_argument("--serve", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--port", type=int, help=argparse.SUPPRESS)
+    parser.add_argument("--curriculum", help=argparse.SUPPRESS)
+    parser.add_argument("--uploads-dir", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.serve:
+        serve(args)
+        return 0
+
+    mix = parse_mix(args.mix)
+    with tempfile.TemporaryDirectory() as directory:
+        curriculum_file, upload_folder, names, warnings = generate(
+            directory, TAHUN, courses=args.courses, weeks=args.weeks, n_sub=args.sub_cpmk,
+            n_cpl=args.cpl, seed=args.seed,
+        )
+        for warning in warnings:
+            print(f"[WARNING] {warning}")
+        upload_files = {name: os.path.join(upload_folder, f"data_{name}_{TAHUN}.xlsx") for name in names}
+        # Kurikulum hanya membaca baris 3-69, mata kuliah sisanya tidak dipakai
+        names = names[:67]
+
+        server = Server(curriculum_file, upload_folder, free_port(), args.render_processes)
+        try:
+            server.wait_ready()
+            print(f"Server {server.url} (pid {server.process.pid}), {args.concurrency} klien, {args.duration:g} s")
+            report = LoadTest(server.url, names, upload_files, mix, args.format, seed=args.seed).run(
+                args.concurrency, args.duration, server.process.pid, args.sample_interval,
+            )
+        finally:
+            server.stop()
+
+    report["config"] = {key: value for key, value in vars(args).items()
+                        if key not in ("serve", "port", "curriculum", "uploads_dir", "output")}
+    print_report(report)
+    if args.output:
+        with open(args.output, "w") as fh:
+            json.dump(report, fh, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
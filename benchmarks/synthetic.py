@@ -0,0 +1,283 @@
+"""
+Generator data sintetis untuk benchmark dan load test.
+
+Membuat workbook kurikulum dengan tata letak seperti "Final Template
+Kurikulum 2025.xlsx" (sheet 2. CPL Prodi, 9. Susunan Mata Kuliah, 12.2. list
+CPMK, 15. Pemetaan MK-CPMK-Su) dan file upload data_[matkul]_[tahun].xlsx
+dengan kolom A..AE seperti yang dibaca ``get_matkul_data``. Semua isi acak
+diturunkan dari ``seed``, jadi seed yang sama selalu menghasilkan data yang sama.
+
+Contoh:
+    python benchmarks/synthetic.py /tmp/rps-data --courses 200 --weeks 32 --cpl-pool 20
+"""
+import argparse
+import os
+import random
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import openpyxl  # noqa: E402
+
+from curriculum import (  # noqa: E402
+    MATKUL_END_ROW, MATKUL_START_ROW, SHEET_CPL, SHEET_CPMK, SHEET_MATKUL, SHEET_SUBCPMK,
+    SUBCPMK_END_ROW, SUBCPMK_START_ROW,
+)
+from layout import RUBRIK_LIST  # noqa: E402
+
+# Ukuran mata kuliah yang dibenchmark
+SIZES = {
+    "small": {"weeks": 8, "n_sub": 3, "n_cpl": 2},
+    "typical": {"weeks": 16, "n_sub": 6, "n_cpl": 3},
+    # RPS hanya punya ruang kolom untuk 7 CPL (D:L), jadi ukuran besar
+    # ditekan di jumlah minggu dan Sub-CPMK
+    "oversized": {"weeks": 48, "n_sub": 24, "n_cpl": 7},
+}
+
+# Batas CPL per mata kuliah yang masih muat di sheet RPS
+MAX_RPS_CPL = 7
+
+RUBRIK_TAGS = [kode for kode, _, _ in RUBRIK_LIST]
+DEFAULT_RUBRIK_MIX = {"H1": 3, "SP1": 1, "A1": 1, "H2": 1}
+
+HARI = ["Senin", "Selasa", "Rabu", "Kamis", "Jumat"]
+KATA = (
+    "analisis desain implementasi sistem jaringan data algoritma arsitektur "
+    "protokol keamanan basis komputasi perangkat evaluasi model integrasi"
+).split()
+
+
+def course_name(size):
+    return f"Benchmark {size.capitalize()}"
+
+
+def _rnd(seed, *parts):
+    # Seed string di-hash dengan sha512 oleh random, jadi stabil antar proses
+    return random.Random(":".join(str(p) for p in (seed,) + parts))
+
+
+def _kalimat(rnd, min_words, max_words):
+    return " ".join(rnd.choice(KATA) for _ in range(rnd.randint(min_words, max_words)))
+
+
+def course_cpls(name, n_cpl, cpl_pool, seed=0):
+    """Kode CPL yang dibebankan ke satu mata kuliah, diambil dari CPL-01..CPL-{cpl_pool}"""
+    if n_cpl > cpl_pool:
+        raise ValueError(f"n_cpl ({n_cpl}) lebih besar dari cpl_pool ({cpl_pool})")
+    picked = sorted(_rnd(seed, "cpl", name).sample(range(1, cpl_pool + 1), n_cpl))
+    return [f"CPL-{i:02d}" for i in picked]
+
+
+def parse_rubrik_mix(text):
+    """"H1=3,SP1=1" -> {"H1": 3, "SP1": 1}"""
+    mix = {}
+    for part in text.split(","):
+        tag, _, weight = part.partition("=")
+        tag = tag.strip()
+        if tag not in RUBRIK_TAGS:
+            raise ValueError(f"Tag rubrik tidak dikenal: {tag} (pilihan: {', '.join(RUBRIK_TAGS)})")
+        mix[tag] = float(weight or 1)
+    return mix
+
+
+def make_curriculum(path, courses, cpl_pool=None, seed=0):
+    """Tulis workbook kurikulum; ``courses`` = list (nama, n_sub, n_cpl)"""
+    cpl_pool = cpl_pool or max(n_cpl for _, _, n_cpl in courses)
+    wb = openpyxl.Workbook()
+
+    ws = wb.active
+    ws.title = SHEET_CPL
+    for i in range(1, cpl_pool + 1):
+        ws[f"B{2 + i}"] = f"CPL-{i:02d}"
+        ws[f"C{2 + i}"] = f"Mampu {_kalimat(_rnd(seed, 'cpl-desc', i), 6, 14)}"
+
+    ws_matkul = wb.create_sheet(SHEET_MATKUL)
+    ws_cpmk = wb.create_sheet(SHEET_CPMK)
+    ws_map = wb.create_sheet(SHEET_SUBCPMK)
+    cpmk_row = map_row = 3
+    for i, (name, n_sub, n_cpl) in enumerate(courses):
+        rnd = _rnd(seed, "course", name)
+        row = MATKUL_START_ROW + i
+        ws_matkul[f"C{row}"] = 1000 + i
+        ws_matkul[f"D{row}"] = name
+        ws_matkul[f"E{row}"] = rnd.choice([2, 3, 3, 4])
+        ws_matkul[f"N{row}"] = str(1 + i % 8)
+        ws_matkul[f"O{row}"] = rnd.choice(["MKWP", "MKWU", "MKP"])
+
+        cpls = course_cpls(name, n_cpl, cpl_pool, seed)
+        cpmk_desc = {}
+        for s in range(n_sub):
+            cpl = cpls[s % n_cpl]
+            cpmk = s // 2 + 1
+            if cpmk not in cpmk_desc:
+                cpmk_desc[cpmk] = f"Mampu {_kalimat(rnd, 5, 12)} ({name})"
+                ws_cpmk[f"B{cpmk_row}"] = name
+                ws_cpmk[f"C{cpmk_row}"] = f"CPMK-{cpmk}"
+                ws_cpmk[f"D{cpmk_row}"] = cpmk_desc[cpmk]
+                cpmk_row += 1
+            ws_map[f"B{map_row}"] = name
+            ws_map[f"C{map_row}"] = f"CPMK-{cpmk}"
+            ws_map[f"D{map_row}"] = cpmk_desc[cpmk]
+            ws_map[f"E{map_row}"] = f"Sub-CPMK-{s + 1}"
+            ws_map[f"F{map_row}"] = f"Mampu {_kalimat(rnd, 5, 12)}"
+            ws_map[f"H{map_row}"] = cpl
+            ws_map[f"I{map_row}"] = f"Deskripsi {cpl}"
+            map_row += 1
+    wb.save(path)
+
+    warnings = []
+    if MATKUL_START_ROW + len(courses) - 1 > MATKUL_END_ROW:
+        warnings.append(
+            f"{len(courses)} mata kuliah melewati baris {MATKUL_END_ROW} yang dibaca curriculum.py"
+        )
+    if map_row - 1 > SUBCPMK_END_ROW:
+        warnings.append(
+            f"{map_row - SUBCPMK_START_ROW} baris pemetaan melewati baris {SUBCPMK_END_ROW} "
+            "yang dibaca curriculum.py"
+        )
+    return warnings
+
+
+def make_upload(path, name, weeks=16, n_sub=6, n_cpl=3, cpl_pool=None, rubrik_mix=None,
+                classes=1, pustaka=3, dosen=2, seed=0):
+    """Tulis file upload data_[matkul]_[tahun].xlsx untuk satu mata kuliah"""
+    # Kolom O:Q dan AA:AE hanya dibaca pada baris yang punya bobot minggu (L)
+    if n_sub > weeks or classes > weeks:
+        raise ValueError("n_sub dan classes tidak boleh lebih dari jumlah minggu")
+    # Blok dosen pengampu di semua sheet hanya 4 baris
+    if not 1 <= dosen <= 4:
+        raise ValueError("dosen harus antara 1 dan 4")
+
+    rnd = _rnd(seed, "upload", name)
+    mix = rubrik_mix or DEFAULT_RUBRIK_MIX
+    tags, weights = list(mix), list(mix.values())
+    cpls = course_cpls(name, n_cpl, cpl_pool or n_cpl, seed)
+
+    wb = openpyxl.Workbook()
+    ws = wb.active
+    ws.title = name.split()[0]
+    uts = weeks // 2 - 1
+    for w in range(max(weeks, pustaka)):
+        row = 2 + w
+        if w < pustaka:
+            ws[f"A{row}"] = f"Penulis {w + 1}. {_kalimat(rnd, 3, 8).title()}. Penerbit, {2010 + w % 15}"
+            ws[f"B{row}"] = f"Penulis {w + 1}. {_kalimat(rnd, 3, 8).title()}. Jurnal, {2015 + w % 10}"
+        if w < dosen:
+            ws[f"C{row}"] = f"Dosen {w + 1}, S.T., M.T."
+            ws[f"D{row}"] = f"NIK. {230000 + w}"
+        if w == 0:
+            ws[f"E{row}"] = "Kalkulus"
+        if w >= weeks:
+            continue
+
+        if w == uts:
+            kriteria = indikator = materi = "Evaluasi UTS"
+        elif w == weeks - 1:
+            kriteria = indikator = materi = "Evaluasi UAS"
+        else:
+            indikator = f"Mampu {_kalimat(rnd, 4, 10)}"
+            materi = _kalimat(rnd, 2, 5).capitalize()
+            kind = w % 3
+            if kind == 2:
+                kriteria = f"Latihan: {_kalimat(rnd, 3, 6)}"
+            else:
+                tag = rnd.choices(tags, weights)[0]
+                jenis = "Tugas" if kind == 0 else "Kuis"
+                kriteria = f"{jenis}: {_kalimat(rnd, 3, 8)} [{tag}]"
+
+        ws[f"G{row}"] = w + 1
+        ws[f"H{row}"] = f"Sub-CPMK-{w % n_sub + 1}"
+        ws[f"I{row}"] = indikator
+        ws[f"J{row}"] = kriteria
+        ws[f"K{row}"] = materi
+        ws[f"L{row}"] = 10 if "Evaluasi" in kriteria else 5
+        ws[f"M{row}"] = ", ".join(str(i + 1) for i in range(min(pustaka, 2)))
+        if w < n_sub:
+            ws[f"O{row}"] = cpls[w % n_cpl]
+            ws[f"P{row}"] = f"CPMK-{w // 2 + 1}"
+            ws[f"Q{row}"] = f"Sub-CPMK-{w + 1}"
+            ws[f"Y{row}"] = 100 // n_sub
+        if w < classes:
+            ws[f"AA{row}"] = chr(ord("A") + w % 26)
+            ws[f"AB{row}"] = rnd.randint(20, 45)
+            ws[f"AC{row}"] = HARI[w % len(HARI)]
+            ws[f"AD{row}"] = f"R.{101 + w}"
+            ws[f"AE{row}"] = "2025/2026"
+    wb.save(path)
+
+
+def make_dataset(directory, tahun, sizes=SIZES, seed=0):
+    """Buat kurikulum + satu file upload per ukuran; return (file kurikulum, folder upload)"""
+    upload_folder = os.path.join(directory, "uploads")
+    os.makedirs(upload_folder, exist_ok=True)
+    courses = [(course_name(size), spec["n_sub"], spec["n_cpl"]) for size, spec in sizes.items()]
+    cpl_pool = max(spec["n_cpl"] for spec in sizes.values())
+    curriculum_file = os.path.join(directory, "kurikulum.xlsx")
+    make_curriculum(curriculum_file, courses, cpl_pool, seed)
+    for size, spec in sizes.items():
+        name = course_name(size)
+        make_upload(
+            os.path.join(upload_folder, f"data_{name}_{tahun}.xlsx"), name,
+            cpl_pool=cpl_pool, seed=seed, **spec,
+        )
+    return curriculum_file, upload_folder
+
+
+def generate(directory, tahun="2025", courses=67, weeks=16, n_sub=6, n_cpl=3, cpl_pool=None,
+             rubrik_mix=None, classes=1, pustaka=3, dosen=2, uploads=None, seed=0):
+    """Buat kurikulum ``courses`` mata kuliah dan file upload untuk ``uploads`` di antaranya.
+
+    Return (file kurikulum, folder upload, daftar nama mata kuliah, peringatan).
+    """
+    cpl_pool = cpl_pool or n_cpl
+    upload_folder = os.path.join(directory, "uploads")
+    os.makedirs(upload_folder, exist_ok=True)
+    names = [f"Matkul Sintetis {i + 1:03d}" for i in range(courses)]
+    curriculum_file = os.path.join(directory, "kurikulum.xlsx")
+    warnings = make_curriculum(curriculum_file, [(name, n_sub, n_cpl) for name in names], cpl_pool, seed)
+    if n_cpl > MAX_RPS_CPL:
+        warnings.append(f"{n_cpl} CPL per mata kuliah melebihi {MAX_RPS_CPL} kolom CPL di sheet RPS")
+
+    for name in names[:courses if uploads is None else uploads]:
+        make_upload(
+            os.path.join(upload_folder, f"data_{name}_{tahun}.xlsx"), name,
+            weeks=weeks, n_sub=n_sub, n_cpl=n_cpl, cpl_pool=cpl_pool, rubrik_mix=rubrik_mix,
+            classes=classes, pustaka=pustaka, dosen=dosen, seed=seed,
+        )
+    return curriculum_file, upload_folder, names, warnings
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("directory", help="folder output (kurikulum.xlsx + uploads/)")
+    parser.add_argument("--tahun", default="2025")
+    parser.add_argument("--courses", type=int, default=67, help="jumlah mata kuliah")
+    parser.add_argument("--weeks", type=int, default=16, help="jumlah minggu per mata kuliah")
+    parser.add_argument("--sub-cpmk", type=int, default=6, help="Sub-CPMK per mata kuliah")
+    parser.add_argument("--cpl", type=int, default=3, help="CPL per mata kuliah")
+    parser.add_argument("--cpl-pool", type=int, help="total CPL prodi (default = --cpl)")
+    parser.add_argument("--rubrik", default="H1=3,SP1=1,A1=1,H2=1",
+                        help="bobot tag rubrik untuk Tugas/Kuis, mis. H1=3,SP1=1")
+    parser.add_argument("--classes", type=int, default=1, help="jumlah kelas per mata kuliah")
+    parser.add_argument("--pustaka", type=int, default=3, help="jumlah pustaka utama/pendukung")
+    parser.add_argument("--dosen", type=int, default=2, help="jumlah dosen pengampu (1-4)")
+    parser.add_argument("--uploads", type=int, help="jumlah file upload (default = semua mata kuliah)")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    curriculum_file, upload_folder, names, warnings = generate(
+        args.directory, args.tahun, courses=args.courses, weeks=args.weeks, n_sub=args.sub_cpmk,
+        n_cpl=args.cpl, cpl_pool=args.cpl_pool, rubrik_mix=parse_rubrik_mix(args.rubrik),
+        classes=args.classes, pustaka=args.pustaka, dosen=args.dosen, uploads=args.uploads,
+        seed=args.seed,
+    )
+    print(f"Kurikulum : {curriculum_file} ({len(names)} mata kuliah)")
+    print(f"Upload    : {upload_folder}")
+    for warning in warnings:
+        print(f"[WARNING] {warning}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
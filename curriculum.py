@@ -0,0 +1,502 @@
+"""
+Snapshot kurikulum terkompilasi.
+
+File "Final Template Kurikulum" cukup dibaca sekali lalu disimpan sebagai
+indeks per nama mata kuliah, sehingga request tidak perlu membuka workbook
+openpyxl lagi. ``CurriculumStore`` memuat ulang snapshot kalau file di disk
+berubah (mtime/ukuran).
+
+``CurriculumRegistry`` menampung beberapa kurikulum (mis. 2020 dan 2025, atau
+prodi lain) per id, masing-masing dengan nama sheet dan rentang barisnya
+sendiri. Kurikulum baru dibaca saat pertama dipakai dan snapshot yang paling
+lama tidak dipakai dilepas kalau total ukurannya melewati batas memori.
+
+Kalau file hilang atau rusak, kegagalan diingat selama jendela backoff
+(eksponensial) dan request dilayani dari snapshot terakhir yang valid, jadi
+file yang rusak tidak memicu pembacaan workbook ulang di setiap request.
+"""
+import functools
+import hashlib
+import json
+import logging
+import os
+import threading
+import sys
+import time
+from collections import OrderedDict
+from datetime import datetime
+from io import BytesIO
+
+import openpyxl
+
+from search import CourseIndex
+
+SHEET_MATKUL = "9. Susunan Mata Kuliah"
+SHEET_CPL = "2. CPL Prodi"
+SHEET_CPMK = "12.2. list CPMK"
+SHEET_SUBCPMK = "15. Pemetaan MK-CPMK-Su"
+
+MATKUL_START_ROW = 3
+MATKUL_END_ROW = 69
+MATKUL_COLUMN = "D"
+
+SUBCPMK_START_ROW = 3
+SUBCPMK_END_ROW = 272
+
+logger = logging.getLogger("RPSGenerator.curriculum")
+
+
+class CurriculumUnavailable(Exception):
+    """Kurikulum tidak bisa dimuat dan belum ada snapshot valid untuk dipakai"""
+
+
+class UnknownCurriculum(Exception):
+    """Id kurikulum tidak terdaftar di CurriculumRegistry"""
+
+
+class CurriculumLayout:
+    """Nama sheet dan rentang baris yang dibaca dari satu file kurikulum.
+
+    Kolom tetap (C:O di sheet susunan MK, B:I di sheet pemetaan); yang
+    berbeda antar template kurikulum hanya nama sheet dan barisnya.
+    """
+
+    def __init__(self, sheet_matkul=SHEET_MATKUL, sheet_subcpmk=SHEET_SUBCPMK,
+                 matkul_rows=(MATKUL_START_ROW, MATKUL_END_ROW),
+                 subcpmk_rows=(SUBCPMK_START_ROW, SUBCPMK_END_ROW)):
+        self.sheet_matkul = sheet_matkul
+        self.sheet_subcpmk = sheet_subcpmk
+        self.matkul_rows = tuple(matkul_rows)
+        self.subcpmk_rows = tuple(subcpmk_rows)
+
+
+DEFAULT_LAYOUT = CurriculumLayout()
+
+
+def _key(nama_matkul):
+    return str(nama_matkul).strip().lower()
+
+
+def _rows_size(rows):
+    return sum(sys.getsizeof(row) + sum(sys.getsizeof(value) for value in row) for row in rows)
+
+
+def _rows(sheet, min_row, max_row, min_col, max_col):
+    width = max_col - min_col + 1
+    for row in sheet.iter_rows(min_row=min_row, max_row=max_row, min_col=min_col,
+                               max_col=max_col, values_only=True):
+        # Mode read_only bisa memotong sel kosong di ujung baris
+        yield tuple(row) + (None,) * (width - len(row))
+
+
+class Curriculum:
+    """Isi kurikulum yang sudah diindeks per nama mata kuliah (read-only)"""
+
+    def __init__(self, path, stamp, matkul_rows, subcpmk_rows, version=None):
+        self.path = path
+        # Perkiraan memori isi snapshot, untuk batas CurriculumRegistry
+        self.size = _rows_size(matkul_rows) + _rows_size(subcpmk_rows)
+        self.stamp = stamp
+        # sha1 isi file (12 hex): sama di semua worker untuk file yang sama
+        self.version = version
+        self.loaded_at = datetime.now()
+        # (kode C, nama D, sks E, semester N, rumpun O) untuk baris 3-69
+        self._matkul_rows = matkul_rows
+        self._matkul_index = {}
+        for row in matkul_rows:
+            if row[1]:
+                self._matkul_index.setdefault(_key(row[1]), row)
+        # Baris B:I sheet pemetaan, dikelompokkan per nama mata kuliah
+        self._subcpmk_index = {}
+        for row in subcpmk_rows:
+            if row[0]:
+                self._subcpmk_index.setdefault(_key(row[0]), []).append(row)
+        self._course_fingerprints = None
+
+    def matkul_list(self):
+        return [row[1] for row in self._matkul_rows if row[1] is not None]
+
+    def has_matkul(self, nama_matkul):
+        return _key(nama_matkul) in self._matkul_index
+
+    def course_fingerprints(self):
+        """{nama mata kuliah (key): sha1 baris susunan MK + baris pemetaannya}"""
+        if self._course_fingerprints is None:
+            fingerprints = {}
+            for key in self._matkul_index.keys() | self._subcpmk_index.keys():
+                rows = [self._matkul_index.get(key), self._subcpmk_index.get(key, [])]
+                data = json.dumps(rows, default=str, ensure_ascii=False).encode("utf-8")
+                fingerprints[key] = hashlib.sha1(data).hexdigest()
+            self._course_fingerprints = fingerprints
+        return self._course_fingerprints
+
+    def cache_tag(self, nama_matkul):
+        """Dependensi output satu mata kuliah: (path kurikulum, key mata kuliah, sidik jari baris)"""
+        key = _key(nama_matkul)
+        return self.path, key, self.course_fingerprints().get(key)
+
+    def changed_courses(self, other):
+        """Key mata kuliah yang barisnya berbeda (atau hilang/baru) di snapshot ``other``"""
+        old, new = self.course_fingerprints(), other.course_fingerprints()
+        return {key for key in old.keys() | new.keys() if old.get(key) != new.get(key)}
+
+    @functools.cached_property
+    def search_index(self):
+        # Dibangun saat pencarian pertama, dipakai sampai snapshot diganti
+        return CourseIndex(self.matkul_list())
+
+    def rps_data(self, nama_matkul):
+        result = {
+            "kode_matkul": None,
+            "semester": None,
+            "rumpun": None,
+            "bobot_sks": None
+        }
+        row = self._matkul_index.get(_key(nama_matkul))
+        if row is not None:
+            kode, _, sks, semester, rumpun = row
+            result["kode_matkul"] = str(int(kode))
+            result["semester"] = semester
+            result["rumpun"] = rumpun
+            result["bobot_sks"] = sks
+        return result
+
+    def cpl_cpmk_sub(self, nama_matkul):
+        cpls_kode, cpls_desc = [], []
+        cpmks_kode, cpmks_desc = [], []
+        subcpmks_kode, subcpmks_desc = [], []
+
+        for row in self._subcpmk_index.get(_key(nama_matkul), []):
+            _, cpmk_kode, cpmk_desc, subcpmk_kode, subcpmk_desc, _, cpl_kode, cpl_desc = row
+            # ambil CPL
+            if cpl_kode: cpls_kode.append(str(cpl_kode))
+            if cpl_desc: cpls_desc.append(str(cpl_desc))
+
+            # ambil CPMK
+            if cpmk_kode: cpmks_kode.append(str(cpmk_kode))
+            if cpmk_desc: cpmks_desc.append(str(cpmk_desc))
+
+            # ambil SubCPMK
+            if subcpmk_kode: subcpmks_kode.append(str(subcpmk_kode))
+            if subcpmk_desc: subcpmks_desc.append(str(subcpmk_desc))
+
+        return {
+            "cpl_kode": cpls_kode,
+            "cpl_desc": cpls_desc,
+            "cpmk_kode": cpmks_kode,
+            "cpmk_desc": cpmks_desc,
+            "subcpmk_kode": subcpmks_kode,
+            "subcpmk_desc": subcpmks_desc,
+        }
+
+
+def file_stamp(path):
+    """(mtime_ns, size) file; berubah setiap kali file ditulis ulang"""
+    st = os.stat(path)
+    return st.st_mtime_ns, st.st_size
+
+
+def compile_curriculum(path, layout=DEFAULT_LAYOUT):
+    """Baca workbook kurikulum sekali dan bangun snapshot ``Curriculum``"""
+    stamp = file_stamp(path)
+    # Dibaca sekali ke memori: versi (hash) dan isi yang diparse pasti dari file yang sama
+    with open(path, "rb") as fh:
+        data = fh.read()
+    version = hashlib.sha1(data).hexdigest()[:12]
+    wb = openpyxl.load_workbook(BytesIO(data), read_only=True, data_only=True)
+    try:
+        # Kolom C:O sheet susunan MK
+        matkul_rows = [
+            (row[0], row[1], row[2], row[11], row[12])
+            for row in _rows(wb[layout.sheet_matkul], *layout.matkul_rows, 3, 15)
+        ]
+        # Kolom B:I sheet pemetaan MK-CPMK-SubCPMK
+        subcpmk_rows = list(_rows(wb[layout.sheet_subcpmk], *layout.subcpmk_rows, 2, 9))
+    finally:
+        wb.close()
+    return Curriculum(path, stamp, matkul_rows, subcpmk_rows, version)
+
+
+class CurriculumStore:
+    """Pemegang snapshot kurikulum aktif, dikompilasi ulang kalau file berubah.
+
+    Pemuatan yang gagal diingat (negative cache): selama ``retry_at`` belum
+    lewat dan file tidak berubah lagi, ``get`` tidak mencoba membaca ulang dan
+    langsung mengembalikan snapshot terakhir yang valid (mode degraded), atau
+    raise ``CurriculumUnavailable`` kalau belum pernah ada yang berhasil.
+
+    Kalau ``watched`` (ada ``CurriculumWatcher`` yang memanggil ``reload``),
+    ``get`` tidak memeriksa file sama sekali selama snapshot sudah ada:
+    kompilasi ulang terjadi di thread watcher dan snapshot baru ditukar
+    sekaligus, jadi request tidak pernah menunggu workbook dibaca.
+    """
+
+    def __init__(self, path, retry_min=5.0, retry_max=300.0, layout=DEFAULT_LAYOUT):
+        self.path = path
+        self.layout = layout
+        self.watched = False
+        # Dipanggil (snapshot lama, snapshot baru) setiap kali snapshot diganti
+        self.listeners = []
+        self.retry_min = retry_min
+        self.retry_max = retry_max
+        self._current = None
+        self._lock = threading.Lock()
+        # Satu kompilasi ulang dari watcher pada satu waktu, di luar _lock
+        self._reload_lock = threading.Lock()
+        # hits = snapshot dipakai ulang, compiles = workbook dibaca ulang,
+        # stale = snapshot lama dipakai karena file terbaru gagal dimuat
+        self.hits = 0
+        self.compiles = 0
+        self.stale = 0
+        self.load_failures = 0
+        # Kegagalan berturut-turut; 0 = tidak degraded
+        self.failures = 0
+        self.last_error = None
+        self.retry_at = None
+        self._failed_stamp = None
+
+    @property
+    def current(self):
+        """Snapshot terakhir yang berhasil dimuat (tanpa cek file), None kalau belum ada"""
+        return self._current
+
+    @property
+    def degraded(self):
+        return self.failures > 0
+
+    def get(self):
+        current = self._current
+        if self.watched and current is not None:
+            if self.failures:
+                self.stale += 1
+            else:
+                self.hits += 1
+            return current
+        try:
+            stamp, stat_error = file_stamp(self.path), None
+        except OSError as e:
+            stamp, stat_error = None, e
+        current = self._current
+        if current is not None and current.stamp == stamp and not self.failures:
+            self.hits += 1
+            return current
+        with self._lock:
+            current = self._current
+            if current is not None and current.stamp == stamp:
+                # File kembali ke versi snapshot yang valid
+                self._recovered()
+                self.hits += 1
+                return current
+            if self.failures and stamp == self._failed_stamp and time.monotonic() < self.retry_at:
+                return self._fallback()
+            try:
+                if stat_error is not None:
+                    raise stat_error
+                snapshot = compile_curriculum(self.path, self.layout)
+            except Exception as e:
+                self._failed(stamp, e)
+                return self._fallback()
+            previous = self._current
+            self._current = snapshot
+            self.compiles += 1
+            self._recovered()
+        self._notify(previous, snapshot)
+        return snapshot
+
+    def reload(self):
+        """Kompilasi ulang kalau file berubah lalu tukar snapshot; return True kalau ditukar.
+
+        Dipanggil dari thread watcher. Workbook dibaca tanpa memegang lock
+        ``get``, dan request yang sedang berjalan tetap memakai snapshot lama
+        yang sudah dipegangnya.
+        """
+        with self._reload_lock:
+            try:
+                stamp, stat_error = file_stamp(self.path), None
+            except OSError as e:
+                stamp, stat_error = None, e
+            current = self._current
+            if current is not None and current.stamp == stamp:
+                if self.failures:
+                    with self._lock:
+                        self._recovered()
+                return False
+            if self.failures and stamp == self._failed_stamp and time.monotonic() < self.retry_at:
+                return False
+            try:
+                if stat_error is not None:
+                    raise stat_error
+                snapshot = compile_curriculum(self.path, self.layout)
+            except Exception as e:
+                with self._lock:
+                    self._failed(stamp, e)
+                return False
+            with self._lock:
+                self._current = snapshot
+                self.compiles += 1
+                self._recovered()
+        logger.info("Kurikulum dimuat ulang", extra={
+            "path": self.path, "version": snapshot.version,
+            "previous_version": current.version if current is not None else None,
+        })
+        self._notify(current, snapshot)
+        return True
+
+    def _notify(self, previous, snapshot):
+        if previous is None:
+            # Muat pertama (atau setelah dilepas): tidak ada yang bisa dibandingkan
+            return
+        for listener in self.listeners:
+            try:
+                listener(previous, snapshot)
+            except Exception:
+                logger.exception("Listener pergantian kurikulum gagal", extra={"path": self.path})
+
+    def unload(self):
+        """Lepas snapshot (dibaca ulang dari file saat dipakai lagi); return ukurannya"""
+        with self._lock:
+            if self._current is None or self.failures:
+                # Snapshot terakhir yang valid tetap dipegang selama degraded
+                return 0
+            size = self._current.size
+            self._current = None
+            return size
+
+    def _failed(self, stamp, error):
+        self.failures += 1
+        self.load_failures += 1
+        self.last_error = f"{type(error).__name__}: {error}"
+        self._failed_stamp = stamp
+        delay = min(self.retry_max, self.retry_min * 2 ** (self.failures - 1))
+        self.retry_at = time.monotonic() + delay
+        logger.warning("Gagal memuat kurikulum", extra={
+            "path": self.path, "error": self.last_error, "failures": self.failures,
+            "retry_in_s": delay, "stale_snapshot": self._current is not None,
+        })
+
+    def _recovered(self):
+        if self.failures:
+            logger.warning("Kurikulum kembali normal", extra={"path": self.path, "failures": self.failures})
+        self.failures = 0
+        self.last_error = None
+        self.retry_at = None
+        self._failed_stamp = None
+
+    def _fallback(self):
+        if self._current is None:
+            raise CurriculumUnavailable(f"Kurikulum {self.path} tidak bisa dimuat: {self.last_error}")
+        self.stale += 1
+        return self._current
+
+
+class CurriculumRegistry:
+    """Beberapa ``CurriculumStore`` per id kurikulum, dimuat saat pertama dipakai.
+
+    ``entries`` = ``{id: {"file": path, "label": ..., "sheet_matkul": ...,
+    "sheet_subcpmk": ..., "matkul_rows": (awal, akhir), "subcpmk_rows": ...}}``;
+    key selain ``file`` opsional. Kalau total ukuran snapshot yang termuat
+    melewati ``max_bytes``, snapshot yang paling lama tidak dipakai dilepas.
+    Kurikulum default tidak pernah dilepas.
+    """
+
+    def __init__(self, entries, default=None, max_bytes=None, retry_min=5.0, retry_max=300.0):
+        if not entries:
+            raise ValueError("Minimal satu kurikulum harus didaftarkan")
+        self.entries = {str(key): dict(entry) for key, entry in entries.items()}
+        self.default = str(default) if default is not None else next(iter(self.entries))
+        if self.default not in self.entries:
+            raise ValueError(f"Kurikulum default '{self.default}' tidak terdaftar")
+        self.max_bytes = max_bytes
+        self.retry_min = retry_min
+        self.retry_max = retry_max
+        self._stores = {}
+        # Urutan pemakaian terakhir, paling lama di depan
+        self._lru = OrderedDict()
+        self._lock = threading.Lock()
+        self.evictions = 0
+        # True kalau CurriculumWatcher aktif (lihat CurriculumStore.watched)
+        self.watched = False
+        # Dibagikan ke semua store, lihat CurriculumStore.listeners
+        self.listeners = []
+
+    def ids(self):
+        return list(self.entries)
+
+    def label(self, curriculum_id):
+        return self.entries[curriculum_id].get("label", curriculum_id)
+
+    def store(self, curriculum_id=None):
+        """CurriculumStore untuk ``curriculum_id`` (None = default), belum dimuat"""
+        curriculum_id = self.default if curriculum_id is None else str(curriculum_id)
+        store = self._stores.get(curriculum_id)
+        if store is not None:
+            return store
+        if curriculum_id not in self.entries:
+            raise UnknownCurriculum(f"Kurikulum '{curriculum_id}' tidak terdaftar")
+        with self._lock:
+            store = self._stores.get(curriculum_id)
+            if store is None:
+                entry = self.entries[curriculum_id]
+                layout = CurriculumLayout(**{
+                    key: entry[key]
+                    for key in ("sheet_matkul", "sheet_subcpmk", "matkul_rows", "subcpmk_rows")
+                    if key in entry
+                })
+                store = self._stores[curriculum_id] = CurriculumStore(
+                    entry["file"], self.retry_min, self.retry_max, layout,
+                )
+                store.watched = self.watched
+                store.listeners = self.listeners
+            return store
+
+    def stores(self):
+        """Store yang sudah dibuat (kurikulum yang belum pernah dipakai tidak ada)"""
+        return list(self._stores.values())
+
+    def paths(self):
+        """Path file semua kurikulum terdaftar"""
+        return [entry["file"] for entry in self.entries.values()]
+
+    def set_watched(self, watched):
+        with self._lock:
+            self.watched = watched
+            for store in self._stores.values():
+                store.watched = watched
+
+    def get(self, curriculum_id=None):
+        """Snapshot kurikulum ``curriculum_id`` (None = default), lihat ``CurriculumStore.get``"""
+        curriculum_id = self.default if curriculum_id is None else str(curriculum_id)
+        snapshot = self.store(curriculum_id).get()
+        with self._lock:
+            self._lru[curriculum_id] = True
+            self._lru.move_to_end(curriculum_id)
+            if self.max_bytes is not None:
+                self._evict(keep=curriculum_id)
+        return snapshot
+
+    def loaded(self):
+        """{id: snapshot} untuk kurikulum yang sedang termuat"""
+        return {
+            curriculum_id: store.current
+            for curriculum_id, store in list(self._stores.items()) if store.current is not None
+        }
+
+    @property
+    def size(self):
+        return sum(snapshot.size for snapshot in self.loaded().values())
+
+    def _evict(self, keep):
+        total = self.size
+        for curriculum_id in list(self._lru):
+            if total <= self.max_bytes:
+                break
+            if curriculum_id in (keep, self.default):
+                continue
+            freed = self._stores[curriculum_id].unload()
+            if freed:
+                total -= freed
+                self.evictions += 1
+                del self._lru[curriculum_id]
+                logger.info("Kurikulum dilepas dari memori", extra={
+                    "curriculum": curriculum_id, "freed_bytes": freed, "loaded_bytes": total,
+                })
@@ -0,0 +1,481 @@
+"""
+Engine generate dokumen RPS tanpa Flask.
+
+Semua input eksplisit: model mata kuliah (hasil ``parse_course_file``),
+potongan kurikulum untuk mata kuliah itu (``CurriculumSlice``), tahun,
+tanggal dokumen, dan opsi (dokumen, format). Output ditulis ke *sink*:
+
+- ``SpooledSink``: SpooledTemporaryFile (di RAM sampai batas ukuran), dipakai view HTTP
+- ``FileSink``   : file object yang sudah dibuka pemanggil
+- ``PathSink``   : path di disk, ditulis ke file sementara lalu di-rename
+
+View ``/download-rps`` hanya menerjemahkan form ke pemanggilan ``Engine.generate``;
+batch job, CLI, dan benchmark memanggil engine langsung tanpa request context.
+
+Contoh CLI::
+
+    python engine.py --kurikulum "data/Final Template Kurikulum 2025.xlsx" \\
+        --upload "uploads/data_Basis Data_2025.xlsx" --matkul "Basis Data" --tahun 2025 \\
+        --format zip -o "Basis Data 2025.zip"
+"""
+import argparse
+import io
+import os
+import sys
+import tempfile
+from collections import defaultdict
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime
+
+import openpyxl
+
+from layout import DOCUMENT_FAMILIES, build_rps_context, render_workbook, render_zip
+from metrics import stage
+
+OUTPUT_FORMATS = ("xlsx", "zip")
+
+MIMETYPES = {
+    "xlsx": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+    "zip": "application/zip",
+}
+
+
+def resolve_dokumen(dokumen=None):
+    """Subset DOCUMENT_FAMILIES sesuai urutan baku; kosong/None = semua dokumen"""
+    dokumen = list(dokumen or DOCUMENT_FAMILIES)
+    unknown = [d for d in dokumen if d not in DOCUMENT_FAMILIES]
+    if unknown:
+        raise ValueError(f"Dokumen tidak dikenal: {', '.join(unknown)}")
+    return [d for d in DOCUMENT_FAMILIES if d in dokumen]
+
+
+def resolve_format(output_format):
+    # "xlsx" = satu workbook berisi semua sheet, "zip" = satu file per dokumen
+    if output_format not in OUTPUT_FORMATS:
+        raise ValueError(f"Format output tidak dikenal: {output_format}")
+    return output_format
+
+
+class CurriculumSlice:
+    """Data kurikulum yang dipakai satu mata kuliah"""
+
+    def __init__(self, rps_data, cpl_cpmk_sub, cache_tag=None):
+        self.rps_data = rps_data
+        self.cpl_cpmk_sub = cpl_cpmk_sub
+        # Lihat Curriculum.cache_tag dan SheetPartCache.invalidate
+        self.cache_tag = cache_tag
+
+    @classmethod
+    def from_curriculum(cls, curriculum, nama_matkul):
+        """Ambil dari snapshot ``Curriculum`` (semua bagian dari snapshot yang sama)"""
+        return cls(
+            curriculum.rps_data(nama_matkul), curriculum.cpl_cpmk_sub(nama_matkul),
+            curriculum.cache_tag(nama_matkul),
+        )
+
+
+class SpooledSink:
+    """Output ke SpooledTemporaryFile; hasilnya file yang sudah di-rewind (pemanggil yang menutup)"""
+
+    def __init__(self, max_size=512 * 1024):
+        self.max_size = max_size
+
+    def open(self):
+        return tempfile.SpooledTemporaryFile(max_size=self.max_size)
+
+    def finish(self, fh):
+        fh.seek(0)
+        return fh
+
+    def abort(self, fh):
+        fh.close()
+
+
+class FileSink:
+    """Output ke file object milik pemanggil (harus seekable); tidak ditutup engine"""
+
+    def __init__(self, fileobj):
+        self.fileobj = fileobj
+
+    def open(self):
+        return self.fileobj
+
+    def finish(self, fh):
+        return fh
+
+    def abort(self, fh):
+        pass
+
+
+class PathSink:
+    """Output ke ``path``; file lama baru diganti setelah render selesai tanpa error"""
+
+    def __init__(self, path):
+        self.path = path
+
+    def open(self):
+        folder = os.path.dirname(os.path.abspath(self.path))
+        os.makedirs(folder, exist_ok=True)
+        return tempfile.NamedTemporaryFile(dir=folder, prefix=".rps-", suffix=".tmp", delete=False)
+
+    def finish(self, fh):
+        fh.close()
+        os.replace(fh.name, self.path)
+        return self.path
+
+    def abort(self, fh):
+        fh.close()
+        try:
+            os.remove(fh.name)
+        except FileNotFoundError:
+            pass
+
+
+class GenerationResult:
+    """Hasil ``Engine.generate``: output dari sink plus metadata file"""
+
+    def __init__(self, output, size, output_format, dokumen, filename):
+        self.output = output
+        self.size = size
+        self.format = output_format
+        self.dokumen = dokumen
+        self.filename = filename
+        self.mimetype = MIMETYPES[output_format]
+
+
+class Engine:
+    """Generate workbook/ZIP RPS dari input eksplisit.
+
+    ``cache`` = SheetPartCache (opsional). ``executor`` = ProcessPoolExecutor
+    untuk mode ZIP, atau fungsi tanpa argumen yang mengembalikannya (dibuat
+    saat pertama dipakai); None = render berurutan di proses ini.
+    """
+
+    def __init__(self, cache=None, executor=None):
+        self.cache = cache
+        self._executor = executor
+
+    @property
+    def executor(self):
+        return self._executor() if callable(self._executor) else self._executor
+
+    def generate(self, sink, matkul, tahun, course, curriculum, today=None, dokumen=None,
+                 output_format="xlsx", deterministic=None, parallel=True, use_cache=True):
+        """Render dokumen ``dokumen`` untuk ``matkul`` ke ``sink``; return GenerationResult.
+
+        ``course`` = model mata kuliah (``parse_course_file``), ``curriculum`` =
+        CurriculumSlice. ``today`` = tanggal dokumen; kalau diisi (dan
+        ``deterministic`` tidak diset False) input yang sama menghasilkan byte
+        yang sama. ``parallel=False`` memaksa render di proses ini;
+        ``use_cache=False`` merender semua sheet tanpa SheetPartCache.
+        ValueError untuk input yang tidak valid.
+        """
+        dokumen = resolve_dokumen(dokumen)
+        output_format = resolve_format(output_format)
+        if deterministic is None:
+            deterministic = today is not None
+        cache = self.cache if use_cache else None
+
+        fh = sink.open()
+        try:
+            start = fh.tell()
+            if output_format == "zip":
+                args = (dokumen, matkul, tahun, curriculum.rps_data, curriculum.cpl_cpmk_sub, course)
+                options = {
+                    "today": today, "deterministic": deterministic,
+                    "cache": cache, "cache_tag": curriculum.cache_tag,
+                }
+                self._render_zip(fh, start, args, options, parallel)
+            else:
+                with stage("context"):
+                    ctx = build_rps_context(
+                        matkul, tahun, curriculum.rps_data, curriculum.cpl_cpmk_sub, course,
+                        today=today, families=dokumen, deterministic=deterministic,
+                    )
+                render_workbook(fh, ctx, cache=cache, cache_tag=curriculum.cache_tag)
+            size = fh.seek(0, io.SEEK_END) - start
+        except BaseException:
+            sink.abort(fh)
+            raise
+        return GenerationResult(
+            sink.finish(fh), size, output_format, dokumen,
+            f"{'_'.join(dokumen)}_{matkul}_{tahun}.{output_format}",
+        )
+
+    def _render_zip(self, fh, start, args, options, parallel):
+        # Worker yang mati (OOM killer, SIGKILL) membuat pool rusak permanen.
+        # Executor diminta ulang sekali (pemanggil membuat pool baru kalau
+        # yang lama rusak); kalau masih gagal, render di proses ini
+        for _ in range(2 if parallel else 0):
+            executor = self.executor
+            if executor is None:
+                break
+            try:
+                render_zip(fh, *args, executor=executor, **options)
+                return
+            except BrokenProcessPool:
+                fh.seek(start)
+                fh.truncate()
+        render_zip(fh, *args, executor=None, **options)
+
+
+def parse_course_file(filename, nama_matkul):
+    """Model mata kuliah dari file upload data_[matkul]_[tahun].xlsx (sheet = kata pertama nama matkul)"""
+    try:
+        wb = openpyxl.load_workbook(filename, data_only=True)
+    except FileNotFoundError:
+        raise ValueError(f"File '{filename}' tidak ditemukan")
+    except Exception as e:
+        raise ValueError(f"Error membuka file '{filename}': {str(e)}")
+    
+    sheet_name = nama_matkul.split()[0]
+    if sheet_name not in wb.sheetnames:
+        wb.close()
+        raise ValueError(f"Sheet '{nama_matkul}' tidak ditemukan dalam {filename}")
+
+    sheet = wb[sheet_name]
+
+    # pustaka, tim, syarat
+    pustaka_utama, pustaka_pendukung, team_teaching, nik, matkul_syarat = [], [], [], [], []
+
+    # Pertemuan
+    minggu_ke, subcpmk_weekly, indikator, kriteria, kriteria_numbered, materi, bobot, pustaka_weekly = [], [], [], [], [], [], [], []
+    materi_non_uts_uas, materi_non_uts_uas_numbered, materi_weekly_numbered = [], [], []
+
+    # Kelas
+    kelas, jml_mhs, hari, tempat, tahun_ajar = [], [], [], [], []
+
+    # CPL/CPMK/subCPMK bobot
+    cpl_bobot, cpmk_bobot, subcpmk_bobot, total_bobot = [], [], [], []
+
+    # iterasi baris mulai baris ke-2
+    for row in sheet.iter_rows(min_row=2, values_only=True):
+        # A:E
+        col_a, col_b, col_c, col_d, col_e = row[0:5]
+        # G:M (kolom 6-11, total 6 kolom)
+        col_g, col_h, col_i, col_j, col_k, col_l, col_m = row[6:13]
+        # O:Q (kolom 14-16, total 3 kolom)
+        col_o, col_p, col_q = row[14:17]
+        # Y
+        col_y = row[24]
+        # AA:AE
+        col_aa, col_ab, col_ac, col_ad, col_ae = row[26:31]
+
+        if col_a: pustaka_utama.append(str(col_a))
+        if col_b: pustaka_pendukung.append(str(col_b))
+        if col_c: team_teaching.append(str(col_c))
+        if col_d: nik.append(str(col_d))
+        if col_e: matkul_syarat.append(str(col_e))
+
+        if col_g: minggu_ke.append(str(col_g))
+        if col_h: subcpmk_weekly.append(str(col_h))
+        if col_i: indikator.append(str(col_i))
+        if col_j: kriteria.append(str(col_j))
+        if col_k: materi.append(str(col_k))
+        if col_l is None:
+            # skip (jangan append, supaya tidak bikin array kepanjangan)
+            continue
+        elif str(col_l).strip() == "-":
+            bobot.append("0")
+        else:
+            bobot.append(str(col_l))
+        if col_m: pustaka_weekly.append(str(col_m))
+
+        if col_o: cpl_bobot.append(str(col_o))
+        if col_p: cpmk_bobot.append(str(col_p))
+        if col_q: subcpmk_bobot.append(str(col_q))
+        if col_y: total_bobot.append(str(col_y))
+
+        if col_aa: kelas.append(str(col_aa))
+        if col_ab: jml_mhs.append(str(col_ab))
+        if col_ac: hari.append(str(col_ac))
+        if col_ad: tempat.append(str(col_ad))
+        if col_ae: tahun_ajar.append(str(col_ae))
+
+    wb.close()
+
+    # --- Olahan materi ---
+    exclude_keywords = ["Evaluasi UTS", "Evaluasi UAS", "Proyek Akhir"]
+
+    # Filter materi, buang yang mengandung kata di exclude_keywords
+    materi_non_uts_uas = [m for m in materi if not any(kw in str(m) for kw in exclude_keywords)]
+
+    # Tambahkan numbering untuk materi non-UTS/UAS
+    materi_non_uts_uas_numbered = [f"{i+1}. {m}" for i, m in enumerate(materi_non_uts_uas)]
+
+    # Numbering untuk semua materi, tapi jangan loncati index
+    materi_weekly_numbered = []
+    counter = 1
+    for m in materi:
+        if any(kw in str(m) for kw in exclude_keywords):
+            materi_weekly_numbered.append(m)  # tampilkan apa adanya, tanpa nomor
+        else:
+            materi_weekly_numbered.append(f"{counter}. {m}")
+            counter += 1  # hanya naik kalau materi bukan evaluasi
+
+    # --- Olahan kriteria (penomoran per jenis) ---
+    kriteria_numbered = []
+    counter_map = {}  # simpan hitungan per jenis
+    for k in kriteria:
+        if not k: 
+            continue
+        if "Evaluasi UTS" in k or "Evaluasi UAS" in k:
+            kriteria_numbered.append(k)
+            continue
+        if ":" in k:
+            jenis, isi = k.split(":", 1)
+            jenis = jenis.strip()
+            counter_map[jenis] = counter_map.get(jenis, 0) + 1
+            kriteria_numbered.append(f"{jenis} {counter_map[jenis]}:{isi.strip()}")
+        else:
+            kriteria_numbered.append(k)
+
+    # --- Rubrik ---
+    def extract_rubrik(tag):
+        """Cari subcpmk dari weekly jika kriteria mengandung [tag]"""
+        # dict.fromkeys: buang duplikat tapi urutan minggu tetap (set tidak stabil antar proses)
+        return list(dict.fromkeys(subcpmk_weekly[i] for i, k in enumerate(kriteria) if k and f"[{tag}]" in k))
+
+    rubrik_SP1_subcpmk = extract_rubrik("SP1")
+    rubrik_H1_subcpmk = extract_rubrik("H1")
+    rubrik_H2_subcpmk = extract_rubrik("H2")
+    rubrik_H3_subcpmk = extract_rubrik("H3")
+    rubrik_A1_subcpmk = extract_rubrik("A1")
+    rubrik_A2_subcpmk = extract_rubrik("A2")
+    rubrik_A3_subcpmk = extract_rubrik("A3")
+
+    # fungsi lookup subcpmk → CPL
+    def map_to_cpl(subcpmk_list):
+        mapped = []
+        for sc in subcpmk_list:
+            if sc in subcpmk_bobot:
+                idx = subcpmk_bobot.index(sc)
+                if idx < len(cpl_bobot):
+                    mapped.append(cpl_bobot[idx])
+        return mapped
+
+    rubrik_SP1_cpl = map_to_cpl(rubrik_SP1_subcpmk)
+    rubrik_H1_cpl = map_to_cpl(rubrik_H1_subcpmk)
+    rubrik_H2_cpl = map_to_cpl(rubrik_H2_subcpmk)
+    rubrik_H3_cpl = map_to_cpl(rubrik_H3_subcpmk)
+    rubrik_A1_cpl = map_to_cpl(rubrik_A1_subcpmk)
+    rubrik_A2_cpl = map_to_cpl(rubrik_A2_subcpmk)
+    rubrik_A3_cpl = map_to_cpl(rubrik_A3_subcpmk)
+
+    def nomor_indikator(subcpmk_weekly, subcpmk_bobot, indikator):
+        exclude_keywords = ["Evaluasi UTS", "Evaluasi UAS"]
+
+        # counter untuk setiap subcpmk
+        subcpmk_counter = {k: 0 for k in subcpmk_bobot}
+        indikator_numbered = []
+
+        for sub, ind in zip(subcpmk_weekly, indikator):
+            if not ind:
+                indikator_numbered.append("")
+            elif any(kw in str(ind) for kw in exclude_keywords):
+                indikator_numbered.append(ind)  # tampilkan apa adanya
+            else:
+                if sub in subcpmk_bobot:
+                    idx = subcpmk_bobot.index(sub) + 1  # index di subcpmk_bobot (mulai dari 1)
+                    subcpmk_counter[sub] += 1           # urutan keberapa dalam subcpmk
+                    nomor = f"{idx}.{subcpmk_counter[sub]}"
+                    indikator_numbered.append(f"{nomor} {ind}")
+                else:
+                    indikator_numbered.append(ind)  # fallback kalau sub tidak ada di bobot
+        return indikator_numbered
+    
+    # --- Olahan indikator dengan nomor per subcpmk ---
+    indikator_numbered = nomor_indikator(subcpmk_weekly, subcpmk_bobot, indikator)
+
+    bobot_dict = defaultdict(int)
+    for i_cpmk, i_bobot in zip(cpmk_bobot, total_bobot):
+        bobot_dict[i_cpmk] += int(float(i_bobot))
+
+    seen = []
+    bobot_per_cpmk = []
+    for cpmk in cpmk_bobot:
+        if cpmk not in seen:
+            seen.append(cpmk)
+            bobot_per_cpmk.append(bobot_dict[cpmk])
+
+    return {
+        "pustaka_utama": pustaka_utama,
+        "pustaka_pendukung": pustaka_pendukung,
+        "team_teaching": team_teaching,
+        "nik": nik,
+        "matkul_syarat": matkul_syarat,
+        "minggu_ke": minggu_ke,
+        "subcpmk_weekly": subcpmk_weekly,
+        "indikator": indikator,
+        "indikator_numbered": indikator_numbered,
+        "materi": materi,
+        "bobot": bobot,
+        "pustaka_weekly": pustaka_weekly,
+        "kelas": kelas,
+        "jml_mhs": jml_mhs,
+        "hari": hari,
+        "tempat": tempat,
+        "tahun_ajar": tahun_ajar,
+        "materi_non_uts_uas": materi_non_uts_uas,
+        "materi_non_uts_uas_numbered": materi_non_uts_uas_numbered,
+        "materi_weekly_numbered": materi_weekly_numbered,
+        "kriteria": kriteria,
+        "kriteria_numbered": kriteria_numbered,
+        "cpl_bobot": cpl_bobot,
+        "cpmk_bobot": cpmk_bobot,
+        "bobot_per_cpmk": bobot_per_cpmk,
+        "subcpmk_bobot": subcpmk_bobot,
+        "total_bobot": total_bobot,
+        "rubrik_SP1_subcpmk": rubrik_SP1_subcpmk,
+        "rubrik_SP1_cpl": rubrik_SP1_cpl,
+        "rubrik_H1_subcpmk": rubrik_H1_subcpmk,
+        "rubrik_H1_cpl": rubrik_H1_cpl,
+        "rubrik_H2_subcpmk": rubrik_H2_subcpmk,
+        "rubrik_H2_cpl": rubrik_H2_cpl,
+        "rubrik_H3_subcpmk": rubrik_H3_subcpmk,
+        "rubrik_H3_cpl": rubrik_H3_cpl,
+        "rubrik_A1_subcpmk": rubrik_A1_subcpmk,
+        "rubrik_A1_cpl": rubrik_A1_cpl,
+        "rubrik_A2_subcpmk": rubrik_A2_subcpmk,
+        "rubrik_A2_cpl": rubrik_A2_cpl,
+        "rubrik_A3_subcpmk": rubrik_A3_subcpmk,
+        "rubrik_A3_cpl": rubrik_A3_cpl,
+    }
+
+
+def main(argv=None):
+    """CLI: generate satu mata kuliah dari file kurikulum + file upload"""
+    from curriculum import compile_curriculum
+
+    parser = argparse.ArgumentParser(description="Generate dokumen RPS tanpa server web")
+    parser.add_argument("--kurikulum", required=True, help="file Final Template Kurikulum (.xlsx)")
+    parser.add_argument("--upload", required=True, help="file data mata kuliah (data_[matkul]_[tahun].xlsx)")
+    parser.add_argument("--matkul", required=True)
+    parser.add_argument("--tahun", required=True)
+    parser.add_argument("--dokumen", nargs="*", choices=DOCUMENT_FAMILIES, help="default: semua dokumen")
+    parser.add_argument("--format", choices=OUTPUT_FORMATS, default="xlsx")
+    parser.add_argument("--tanggal", help="tanggal dokumen YYYY-MM-DD (default: waktu ubah file upload)")
+    parser.add_argument("-o", "--output", help="default: nama file baku di folder saat ini")
+    args = parser.parse_args(argv)
+
+    curriculum = compile_curriculum(args.kurikulum)
+    if not curriculum.has_matkul(args.matkul):
+        parser.error(f"mata kuliah '{args.matkul}' tidak ada di {args.kurikulum}")
+    if args.tanggal:
+        today = datetime.strptime(args.tanggal, "%Y-%m-%d")
+    else:
+        today = datetime.fromtimestamp(os.path.getmtime(args.upload))
+
+    dokumen = resolve_dokumen(args.dokumen)
+    output = args.output or f"{'_'.join(dokumen)}_{args.matkul}_{args.tahun}.{args.format}"
+    result = Engine().generate(
+        PathSink(output), args.matkul, args.tahun, parse_course_file(args.upload, args.matkul),
+        CurriculumSlice.from_curriculum(curriculum, args.matkul),
+        today=today, dokumen=dokumen, output_format=args.format,
+    )
+    print(f"{result.output} ({result.size} byte)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,279 @@
+"""
+Riwayat generate dokumen di SQLite, untuk analisis latency dan kapasitas.
+
+Satu baris per request ``/download-rps``: mata kuliah, tahun, hash file
+upload, ukuran input (minggu, Sub-CPMK, CPL, jumlah sheet), durasi total dan
+per tahap, ukuran output, hit/miss cache, dan status. Penulisan dilakukan
+thread latar belakang (batch per transaksi), jadi request hanya memasukkan
+baris ke antrean; query admin membuka koneksi baca sendiri (mode WAL).
+"""
+import atexit
+import hashlib
+import json
+import logging
+import math
+import os
+import queue
+import sqlite3
+import threading
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS generations (
+    id INTEGER PRIMARY KEY,
+    ts TEXT NOT NULL,
+    request_id TEXT,
+    matkul TEXT,
+    tahun TEXT,
+    format TEXT,
+    dokumen TEXT,
+    upload_hash TEXT,
+    weeks INTEGER,
+    subcpmk INTEGER,
+    cpl INTEGER,
+    sheets INTEGER,
+    duration_ms REAL,
+    stages TEXT,
+    output_bytes INTEGER,
+    cache_hits INTEGER,
+    cache_misses INTEGER,
+    status INTEGER,
+    error TEXT
+);
+CREATE INDEX IF NOT EXISTS generations_ts ON generations (ts);
+CREATE INDEX IF NOT EXISTS generations_matkul_ts ON generations (matkul, ts);
+"""
+
+COLUMNS = (
+    "ts", "request_id", "matkul", "tahun", "format", "dokumen", "upload_hash", "weeks", "subcpmk", "cpl",
+    "sheets", "duration_ms", "stages", "output_bytes", "cache_hits", "cache_misses", "status", "error",
+)
+
+# Ekspresi pengelompokan untuk query latency; ts disimpan "YYYY-MM-DDTHH:MM:SS"
+GROUPS = {
+    "matkul": "matkul",
+    "day": "substr(ts, 1, 10)",
+    "hour": "substr(ts, 1, 13)",
+}
+
+_STOP = object()
+
+logger = logging.getLogger("RPSGenerator.history")
+
+
+def file_sha1(path):
+    """sha1 isi file (hex), None kalau file tidak bisa dibaca"""
+    try:
+        digest = hashlib.sha1()
+        with open(path, "rb") as fh:
+            for chunk in iter(lambda: fh.read(64 * 1024), b""):
+                digest.update(chunk)
+        return digest.hexdigest()
+    except OSError:
+        return None
+
+
+def file_signature(path):
+    """(mtime_ns, ukuran) file, None kalau file tidak ada"""
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+
+def percentile(values, pct):
+    """Persentil nearest-rank dari list yang sudah terurut"""
+    index = max(0, math.ceil(pct / 100 * len(values)) - 1)
+    return values[index]
+
+
+class HistoryStore:
+    """Tabel ``generations`` di satu file SQLite"""
+
+    def __init__(self, path):
+        self.path = path
+        self._queue = None
+        self._thread = None
+        self._pid = None
+        self._lock = threading.Lock()
+        # Batch yang gagal ditulis (baris di dalamnya dibuang)
+        self.failed_batches = 0
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=10)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.executescript(SCHEMA)
+        return conn
+
+    def record(self, row):
+        """Antrekan satu baris (dict dengan key di COLUMNS) untuk ditulis.
+
+        Kalau ``row`` membawa ``upload_path``, file itu di-hash oleh thread
+        penulis menjadi ``upload_hash``. mtime/ukurannya dicatat saat ini;
+        kalau file sudah diganti sebelum sempat di-hash, hash dikosongkan
+        daripada mencatat hash upload yang lain.
+        """
+        row = dict(row)
+        if row.get("upload_path"):
+            row["upload_signature"] = file_signature(row["upload_path"])
+        for key in ("dokumen", "stages"):
+            if row.get(key) is not None and not isinstance(row[key], str):
+                row[key] = json.dumps(row[key], ensure_ascii=False)
+        self._writer_queue().put(row)
+
+    @staticmethod
+    def _values(row):
+        upload_path = row.pop("upload_path", None)
+        signature = row.pop("upload_signature", None)
+        if upload_path and signature and not row.get("upload_hash"):
+            upload_hash = file_sha1(upload_path)
+            if file_signature(upload_path) == signature:
+                row["upload_hash"] = upload_hash
+        return tuple(row.get(column) for column in COLUMNS)
+
+    def _writer_queue(self):
+        # Thread penulis tidak ikut ter-fork, jadi dibuat ulang per proses; di
+        # proses yang sama dijalankan lagi kalau sempat berhenti, supaya antrean
+        # tidak terus bertambah tanpa ada yang mengosongkan
+        if self._pid != os.getpid() or not self._thread.is_alive():
+            with self._lock:
+                if self._pid != os.getpid():
+                    self._queue = queue.SimpleQueue()
+                    atexit.register(self.close)
+                if self._pid != os.getpid() or not self._thread.is_alive():
+                    self._thread = threading.Thread(
+                        target=self._run, args=(self._queue,), name="history-writer", daemon=True,
+                    )
+                    self._thread.start()
+                    self._pid = os.getpid()
+        return self._queue
+
+    def _run(self, rows):
+        conn = None
+        try:
+            while True:
+                batch = [rows.get()]
+                # Ambil semua yang sudah antre supaya satu transaksi menulis banyak baris
+                while True:
+                    try:
+                        batch.append(rows.get_nowait())
+                    except queue.Empty:
+                        break
+                stop = [item for item in batch if item is _STOP or isinstance(item, threading.Event)]
+                values = [item for item in batch if item not in stop]
+                if values:
+                    # Satu batch yang gagal (database terkunci, disk penuh, ...)
+                    # tidak boleh menghentikan thread penulis
+                    try:
+                        if conn is None:
+                            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+                            conn = self._connect()
+                        with conn:
+                            conn.executemany(
+                                f"INSERT INTO generations ({', '.join(COLUMNS)}) "
+                                f"VALUES ({', '.join('?' * len(COLUMNS))})",
+                                [self._values(item) for item in values],
+                            )
+                    except Exception:
+                        self.failed_batches += 1
+                        logger.exception("Gagal menulis riwayat generate", extra={"rows": len(values)})
+                        if conn is not None:
+                            conn.close()
+                            conn = None
+                for item in stop:
+                    if isinstance(item, threading.Event):
+                        item.set()
+                if _STOP in stop:
+                    return
+        finally:
+            if conn is not None:
+                conn.close()
+
+    def flush(self, timeout=5):
+        """Tunggu sampai semua baris yang sudah antre tertulis"""
+        if self._pid == os.getpid() and self._thread.is_alive():
+            done = threading.Event()
+            self._queue.put(done)
+            done.wait(timeout)
+
+    def close(self, timeout=5):
+        if self._pid == os.getpid() and self._thread.is_alive():
+            self._queue.put(_STOP)
+            self._thread.join(timeout)
+
+    def _query(self, sql, params=()):
+        if not os.path.exists(self.path):
+            return []
+        conn = self._connect()
+        try:
+            conn.row_factory = sqlite3.Row
+            return [dict(row) for row in conn.execute(sql, params)]
+        finally:
+            conn.close()
+
+    def _filters(self, since=None, until=None, matkul=None, status=None):
+        clauses, params = [], []
+        if since:
+            clauses.append("ts >= ?")
+            params.append(since)
+        if until:
+            clauses.append("ts < ?")
+            params.append(until)
+        if matkul:
+            clauses.append("matkul = ?")
+            params.append(matkul)
+        if status is not None:
+            clauses.append("status = ?")
+            params.append(status)
+        return (" WHERE " + " AND ".join(clauses)) if clauses else "", params
+
+    def recent(self, limit=100, **filters):
+        """Baris terbaru dulu; kolom ``dokumen``/``stages`` dikembalikan sebagai objek"""
+        where, params = self._filters(**filters)
+        rows = self._query(f"SELECT * FROM generations{where} ORDER BY id DESC LIMIT ?", params + [limit])
+        for row in rows:
+            for key in ("dokumen", "stages"):
+                if row[key]:
+                    row[key] = json.loads(row[key])
+        return rows
+
+    def latency(self, group="matkul", **filters):
+        """p50/p95/max durasi per kelompok (mata kuliah, hari, atau jam)
+
+        Rata-rata ukuran input ikut dikembalikan supaya bentuk data yang
+        membuat render lambat bisa dibandingkan langsung.
+        """
+        key = GROUPS[group]
+        where, params = self._filters(**filters)
+        rows = self._query(
+            f"SELECT {key} AS key, duration_ms, weeks, subcpmk, cpl, sheets, output_bytes "
+            f"FROM generations{where}{' AND' if where else ' WHERE'} duration_ms IS NOT NULL "
+            f"ORDER BY key, duration_ms",
+            params,
+        )
+        grouped = {}
+        for row in rows:
+            grouped.setdefault(row["key"], []).append(row)
+
+        def mean(items, column):
+            values = [item[column] for item in items if item[column] is not None]
+            return round(sum(values) / len(values), 1) if values else None
+
+        result = []
+        for group_key, items in grouped.items():
+            durations = [item["duration_ms"] for item in items]
+            result.append({
+                group: group_key,
+                "count": len(items),
+                "p50_ms": round(percentile(durations, 50), 1),
+                "p95_ms": round(percentile(durations, 95), 1),
+                "max_ms": round(durations[-1], 1),
+                "mean_weeks": mean(items, "weeks"),
+                "mean_subcpmk": mean(items, "subcpmk"),
+                "mean_cpl": mean(items, "cpl"),
+                "mean_sheets": mean(items, "sheets"),
+                "mean_output_bytes": mean(items, "output_bytes"),
+            })
+        if group == "matkul":
+            result.sort(key=lambda item: item["p95_ms"], reverse=True)
+        return result
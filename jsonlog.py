@@ -0,0 +1,179 @@
+"""
+Logging JSON non-blocking.
+
+Thread request hanya memasukkan record ke antrean (``QueueHandler``); satu
+thread ``QueueListener`` di latar belakang yang memformat record ke JSON dan
+menulisnya ke file dengan rotasi harian (``TimedRotatingFileHandler``).
+Jadi I/O disk, flush, dan rollover tidak pernah terjadi di jalur request.
+
+Satu baris per record, mis.::
+
+    {"ts": "2025-01-01T10:00:00.123+07:00", "level": "INFO", "logger": "RPSGenerator",
+     "pid": 1234, "message": "generated", "request_id": "...", "matkul": "...", ...}
+
+Field tambahan diberikan lewat ``extra=`` dan ikut ditulis apa adanya.
+"""
+import atexit
+import contextlib
+import copy
+import json
+import logging
+import os
+import queue
+import threading
+from datetime import datetime
+from logging.handlers import QueueHandler, QueueListener, TimedRotatingFileHandler
+
+# Atribut bawaan LogRecord; atribut lain berasal dari ``extra=``
+_RECORD_ATTRS = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime"}
+
+
+class JsonFormatter(logging.Formatter):
+    """Format record sebagai satu baris JSON"""
+
+    def format(self, record):
+        data = {
+            "ts": datetime.fromtimestamp(record.created).astimezone().isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "pid": record.process,
+            "message": record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRS and not key.startswith("_"):
+                data[key] = value
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            data["exc"] = record.exc_text
+        return json.dumps(data, ensure_ascii=False, default=str)
+
+
+class _EnqueueHandler(QueueHandler):
+    def prepare(self, record):
+        # Pesan dan traceback dirender di thread pemanggil (argumennya bisa
+        # berubah setelah ini), tapi traceback tetap di field terpisah
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+class LogPipeline:
+    """Antrean + listener untuk satu logger, dipasang ulang di proses hasil fork"""
+
+    def __init__(self, logger, filename, level="INFO", when="midnight", backup_count=14, filters=()):
+        self.logger = logger
+        self.filename = filename
+        self.when = when
+        self.backup_count = backup_count
+        self.queue = queue.SimpleQueue()
+        self.handler = _EnqueueHandler(self.queue)
+        for log_filter in filters:
+            self.handler.addFilter(log_filter)
+        self.listener = None
+        logger.setLevel(level)
+        logger.addHandler(self.handler)
+        # Record tidak diteruskan ke root logger (mis. handler stderr Flask)
+        logger.propagate = False
+
+    def start(self):
+        # ``{pid}`` di nama file memberi tiap worker pre-fork file sendiri,
+        # karena rollover TimedRotatingFileHandler tidak aman lintas proses
+        filename = self.filename.format(pid=os.getpid())
+        os.makedirs(os.path.dirname(os.path.abspath(filename)), exist_ok=True)
+        file_handler = TimedRotatingFileHandler(
+            filename, when=self.when, backupCount=self.backup_count, encoding="utf-8", delay=True,
+        )
+        file_handler.setFormatter(JsonFormatter())
+        self.listener = QueueListener(self.queue, file_handler, respect_handler_level=True)
+        self.listener.start()
+
+    def stop(self):
+        """Tulis semua record yang masih antre lalu tutup file"""
+        if self.listener is not None:
+            self.listener.stop()
+            for handler in self.listener.handlers:
+                handler.close()
+            self.listener = None
+
+    def _after_fork(self):
+        # Thread listener tidak ikut ter-fork; record milik induk yang masih
+        # antre dibuang supaya tidak ditulis dua kali
+        self.queue = queue.SimpleQueue()
+        self.handler.queue = self.queue
+        self.listener = None
+        self.start()
+
+    def _detach(self):
+        # Proses worker: tanpa listener dan tanpa handler antrean, record
+        # WARNING ke atas jatuh ke stderr lewat handler bawaan ``logging``
+        self.logger.removeHandler(self.handler)
+        self.listener = None
+
+    def close(self):
+        self.stop()
+        self.logger.removeHandler(self.handler)
+
+
+_pipeline = None
+_pipeline_lock = threading.Lock()
+_forking_workers = False
+
+
+def _stop_pipeline():
+    if _pipeline is not None:
+        _pipeline.stop()
+
+
+def _restart_pipeline_in_child():
+    global _pipeline
+    if _pipeline is None:
+        return
+    if _forking_workers:
+        _pipeline._detach()
+        _pipeline = None
+    else:
+        _pipeline._after_fork()
+
+
+@contextlib.contextmanager
+def forking_workers():
+    """Proses yang di-fork di dalam blok ini tidak memulai listener log sendiri.
+
+    Dipakai saat membuat pool proses render: worker tidak melayani request,
+    dan beberapa proses yang merotasi satu file log tidak aman.
+    """
+    global _forking_workers
+    _forking_workers = True
+    try:
+        yield
+    finally:
+        _forking_workers = False
+
+
+atexit.register(_stop_pipeline)
+os.register_at_fork(after_in_child=_restart_pipeline_in_child)
+
+
+def configure_logging(logger, filename, level="INFO", when="midnight", backup_count=14, filters=()):
+    """Pasang pipeline JSON ke ``logger``; pipeline lama (kalau ada) ditutup dulu.
+
+    Logging bersifat global per proses, jadi hanya ada satu pipeline aktif.
+    ``filename=None`` mematikan file log (record WARNING ke atas tetap muncul
+    di stderr lewat handler bawaan ``logging``).
+    """
+    global _pipeline
+    with _pipeline_lock:
+        if _pipeline is not None:
+            _pipeline.close()
+            _pipeline = None
+        if filename:
+            _pipeline = LogPipeline(logger, filename, level, when, backup_count, filters)
+            _pipeline.start()
+        else:
+            logger.setLevel(level)
+        return _pipeline
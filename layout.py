@@ -0,0 +1,1598 @@
+"""
+Layout planner dan renderer untuk workbook RPS/RPM/RUB/KTR/PORTO.
+
+Alurnya dua tahap:
+1. ``build_rps_context`` menghitung semua data turunan (CPL unik, total per
+   CPL, daftar sheet RPM/RUB, data portofolio, ...) dan ``plan_rps_layout``
+   menghitung rentang baris tiap section RPS sebelum ada sel yang ditulis.
+2. Fungsi ``plan_*`` merekam operasi tiap sheet ke ``SheetPlan``, lalu
+   ``render_sheet`` mengirim sel ke xlsxwriter urut per baris sehingga
+   workbook bisa dibuka dengan ``constant_memory``.
+
+Batas memorinya: data sel xlsxwriter langsung di-flush ke file per baris,
+tetapi plan satu sheet (semua selnya) tetap utuh di memori selama sheet itu
+dirender. Puncak memori jadi sebanding dengan sheet terbesar (biasanya PORTO
+atau RPS, yang barisnya bertambah dengan jumlah minggu), bukan dengan seluruh
+workbook; pada mata kuliah sintetis 16/48/128 minggu puncak render penuh
+sekitar 0.9/2.1/5.2 MiB. Harga ``constant_memory``: string ditulis inline,
+bukan lewat shared strings, jadi file sekitar 5-15% lebih besar.
+
+XML tiap worksheet bisa disimpan di ``SheetPartCache`` dengan key sidik jari
+dari input yang benar-benar dipakai sheet itu, sehingga sheet yang inputnya
+tidak berubah tidak perlu direncanakan maupun dirender ulang.
+
+``render_zip`` merender tiap keluarga dokumen (RPS, RPM, RUB, KTR, PORTO) ke
+workbook sendiri, bisa paralel lewat process pool, lalu mengemasnya ke ZIP.
+"""
+import hashlib
+import json
+import re
+import threading
+import tracemalloc
+import warnings
+import zipfile
+from collections import OrderedDict
+from datetime import datetime, time
+from io import BytesIO, StringIO
+
+import xlsxwriter
+from xlsxwriter.exceptions import OverlappingRange
+from xlsxwriter.utility import xl_cell_to_rowcol, xl_col_to_name, xl_range, xl_rowcol_to_cell
+from xlsxwriter.worksheet import Worksheet
+
+from metrics import (
+    begin_stages, check_memory_budget, count_event, current_memory_budget, end_stages, record_stages, stage,
+)
+from sheet_spec import HEADER_BLOCKS, INFO_BLOCKS, add_formats, apply_block
+
+RUBRIK_LIST = [
+    ("SP1", "Skala Persepsi", "Rubrik Penilaian Presentasi Lisan Mahasiswa"),
+    ("H1", "Holistik", "Rubrik Penilaian Penugasan Mahasiswa"),
+    ("H2", "Holistik", "Rubrik Penilaian UTS/UAS Mahasiswa"),
+    ("H3", "Holistik", "Rubrik Penilaian Rancangan Proposal Mahasiswa"),
+    ("A1", "Analitik", "Rubrik Penilaian Presentasi Makalah Mahasiswa"),
+    ("A2", "Analitik", "Rubrik Penilaian Project Based Learning Mahasiswa"),
+    ("A3", "Analitik", "Rubrik Penilaian Capstone Project Mahasiswa"),
+]
+
+KONTRAK_SECTIONS = [
+    "MANFAAT MATA KULIAH",
+    "DESKRIPSI SINGKAT MATA KULIAH",
+    "TUJUAN PEMBELAJARAN",
+    "MATERI / KAJIAN PERKULIAHAN",
+    "STRATEGI PEMBELAJARAN",
+    "REFRENSI",
+    "TUGAS - TUGAS",
+    "KRITERIA PENILAIAN",
+    "TATA TERTIB",
+    "JADWAL PERKULIAHAN",
+    "KETENTUAN REMEDIAL",
+    "PERNYATAAN",
+]
+
+KONTRAK_STRATEGI = """Metode pembelajaran dalam kelas ini adalah menggunakan metode small group discussion, Cooperative learning, dan Contextual learning. Sedangkan bentuk pembelajaran adalah berupa : 
+        1. Kuliah tatap muka (luring)
+        2. Diskusi antar mahasiswa sesuai kelompok serta bimbingan dengan dosen sebagai fasilitator;
+        3. Praktik sederhana berupa pembuatan tugas kelompok dan individu."""
+
+KONTRAK_TUGAS = """1. Tugas perkuliahan dapat berupa tugas individu maupun tugas kelompok (dilihat pada RTM)
+        2. Tugas diberikan oleh dosen pengampu mata kuliah berdasarkan materi yang sedang dibahas, dapat berupa gambar dan uraian
+        3. Format tugas maupun waktu pengumpulan tugas ditentukan pada saat tugas diberikan oleh dosen pengampu.
+        4. Keterlambatan pengumpulan tugas dari waktu yang telah ditentukan akan mendapat pengurangan nilai."""
+
+KONTRAK_KRITERIA = """Nilai akhir mata kuliah diperoleh dari beberapa komponen penilaian seperti Latihan soal, Tugas Mandiri, Quiz, UTS, dan UAS. Bobot penilaian secara umum dikelompokkan sebagai berikut :                                                                                                                                                                                                                                                                                                                               
+        1. Latihan soal 
+        2. Tugas Mandiri
+        3. Quiz
+        4. Ujian Tengah Semester 
+        5. Ujian Akhir Semester
+
+        Nilai akhir diatas dikonversikan kedalam huruf mutu menggunakan kriteria penilaian sbb:
+        RENTANGAN NILAI :
+        80.00 – 100     = A         Unggul
+        75.00 – 79.99  = AB        Baik Sekali
+        70.00 – 74.99  = B          Baik
+        60.00 – 69.99  = BC        Cukup Baik
+        55.00 – 59.99  = C          Cukup
+        50.00 – 54.99  = CD        Kurang
+        44.00 – 49.99  = D          Sangat Kurang
+        0.00 – 43.99    = E          Gagal
+        0.00 – 0.00      = T          Tidak Aktif"""
+
+KONTRAK_TATA_TERTIB = """1. Mahasiswa diwajibkan menggunakan pakaian yang pantas (kemeja/kaos tidak oblong) pada waktu mengikuti perkuliahan di kelas maupun online.
+        2. Mahasiswa wajib menaktifkan video kamera saat melakukan kuliah daring / zoom meeting.
+        3. Keterlambatan masuk di kelas hanya diijinkan maksimal 60 menit dari jadwal, kecuali ada hal-hal yang bersifat khusus.
+        4. Pada perkuliahan daring/online, mahasiswa tidak diperkenankan melakukan keributan di kelas dalam bentuk apapun selama perkuliahan berlangsung, kecuali pada saat diskusi (saat zoom meeting mode mute kecuali saat diijinkan berbicara).
+        5. Mahasiswa wajib hadir minimal 75 % dari tatap muka, jika dibawah 75% maka tidak diperkenankan mengikuti remidi
+        6. Tidak ada ujian susulan untuk UTS dan UAS, kecuali dengan alasan jelas.
+        7. Hasil evaluasi mahasiswa wajib dikembalikan pada mahasiswa 2 minggu setelah ujian berakhir.
+        8. Protes nilai dilayani paling lama 1 minggu setelah nilai keluar
+        9. Mahasiswa diperkenankan membawa makanan ringan dan minuman didalam kelas saat praktik di lab. dan diharapkan untuk menjaga kebersihan"""
+
+KONTRAK_PERNYATAAN = """Saya yang bertandatangan dibawah ini menyatakan bahwa :
+        (1) Telah memahami dan bersedia untuk menerima serta mentaati semua yang telah diuraikan dalam kontrak perkuliahan ini dengan penuh kesadaran dan tanggungjawab.
+        (2) Bersedia menerima sanksi atas pelanggaran yang dilakukan."""
+
+RANGE_NILAI_TEXT = "Nilai akhir diatas dikonversikan kedalam huruf mutu menggunakan kriteria penilaian sebagai berikut:\nRENTANGAN NILAI :\n85.00 - 100.00 : A (UNGGUL - LULUS)                \n75.00 - 84.99   : AB (BAIK SEKALI - LULUS)              \n70.00 - 74.99   : B (BAIK - LULUS)             \n60.00 - 69.99   : BC (CUKUP BAIK - TIDAK LULUS)\n55.00 - 59.99   : C (CUKUP - TIDAK LULUS)\n50.00 - 54.99   : CD (KURANG - TIDAK LULUS)\n44.00 - 49.99   : D (KURANG SEKALI - TIDAK LULUS)\n0.00 - 43.99     : E (GAGAL - TIDAK LULUS)"
+
+
+def _cell_args(args):
+    # Terima notasi "B2" atau (row, col) seperti API worksheet xlsxwriter
+    if isinstance(args[0], str):
+        row, col = xl_cell_to_rowcol(args[0])
+        return row, col, args[1:]
+    return args[0], args[1], args[2:]
+
+
+def _range_args(args):
+    # Terima notasi "B2:B5" atau (first_row, first_col, last_row, last_col)
+    if isinstance(args[0], str):
+        first, _, last = args[0].partition(":")
+        first_row, first_col = xl_cell_to_rowcol(first)
+        last_row, last_col = xl_cell_to_rowcol(last or first)
+        return first_row, first_col, last_row, last_col, args[1:]
+    return args[0], args[1], args[2], args[3], args[4:]
+
+
+class SheetPlan:
+    """Rekaman operasi satu worksheet, belum terikat ke workbook mana pun.
+
+    API-nya meniru worksheet xlsxwriter (``write``, ``merge_range``,
+    ``set_row``, ``set_column``, ``insert_image``) sehingga urutan penulisan
+    bebas; ``render_sheet`` yang mengurutkan sel per baris.
+    """
+
+    BLANK = object()
+
+    def __init__(self, name):
+        self.name = name
+        self.columns = []
+        self.rows = {}
+        self.images = []
+        self.cells = {}
+        self.merges = []
+        self.merged_cells = {}
+
+    def set_column(self, cols, width):
+        self.columns.append((cols, width))
+
+    def set_row(self, row, height):
+        self.rows[row] = height
+
+    def insert_image(self, cell, filename, options=None):
+        row, col, _ = _cell_args((cell,))
+        self.images.append((row, col, filename, dict(options or {})))
+
+    def write(self, *args):
+        row, col, rest = _cell_args(args)
+        value = rest[0] if rest else None
+        cell_format = rest[1] if len(rest) > 1 else None
+        self.cells[(row, col)] = (value, cell_format)
+
+    def merge_range(self, *args):
+        first_row, first_col, last_row, last_col, rest = _range_args(args)
+        data = rest[0] if rest else ""
+        cell_format = rest[1] if len(rest) > 1 else None
+
+        # Sama seperti xlsxwriter: satu sel tidak bisa di-merge
+        if first_row == last_row and first_col == last_col:
+            warnings.warn("Can't merge single cell")
+            return
+        if first_row > last_row:
+            first_row, last_row = last_row, first_row
+        if first_col > last_col:
+            first_col, last_col = last_col, first_col
+
+        cell_range = xl_range(first_row, first_col, last_row, last_col)
+        for row in range(first_row, last_row + 1):
+            for col in range(first_col, last_col + 1):
+                if (row, col) in self.merged_cells:
+                    raise OverlappingRange(
+                        f"Merge range '{cell_range}' overlaps previous merge range "
+                        f"'{self.merged_cells[(row, col)]}'."
+                    )
+                self.merged_cells[(row, col)] = cell_range
+
+        self.merges.append((first_row, first_col, last_row, last_col))
+        for row in range(first_row, last_row + 1):
+            for col in range(first_col, last_col + 1):
+                if row == first_row and col == first_col:
+                    self.cells[(row, col)] = (data, cell_format)
+                else:
+                    self.cells[(row, col)] = (self.BLANK, cell_format)
+
+
+class PartWorksheet(Worksheet):
+    """Worksheet yang XML-nya bisa diisi dari cache atau direkam ke cache.
+
+    Kalau ``part_xml`` sudah diisi, isi sel tidak ditulis sama sekali dan
+    XML tersebut langsung dipakai saat workbook di-package. XML hanya
+    ditampung ke string kalau ``on_assembled`` diset (sheet akan disimpan ke
+    cache); tanpa cache worksheet ditulis langsung ke file seperti biasa.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.part_xml = None
+        self.on_assembled = None
+
+    def _assemble_xml_file(self):
+        if self.part_xml is None and self.on_assembled is None:
+            super()._assemble_xml_file()
+            return
+        xml = self.part_xml
+        if xml is None:
+            fh, internal_fh = self.fh, self.internal_fh
+            self.fh, self.internal_fh = StringIO(), False
+            super()._assemble_xml_file()
+            xml = self.fh.getvalue()
+            self.fh, self.internal_fh = fh, internal_fh
+            self.on_assembled(xml)
+        # String tidak disimpan di worksheet; salinan cache (kalau ada) cukup satu
+        self.part_xml = None
+        self.fh.write(xml)
+        self._xml_close()
+
+
+class SheetPartCache:
+    """LRU cache XML worksheet, dibatasi total ukuran XML (byte).
+
+    Entri boleh membawa ``tag`` (mis. dependensi baris kurikulum yang dipakai
+    sheet itu) supaya bisa dibuang tepat sasaran lewat ``invalidate``.
+    """
+
+    def __init__(self, max_bytes=32 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def put(self, key, entry):
+        entry_size = len(entry["xml"])
+        if entry_size > self.max_bytes:
+            return
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self.size -= len(old["xml"])
+            self._entries[key] = entry
+            self.size += entry_size
+            while self.size > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self.size -= len(evicted["xml"])
+
+    def invalidate(self, predicate):
+        """Buang entri yang ``predicate(tag)``-nya True; return jumlah yang dibuang"""
+        with self._lock:
+            stale = [key for key, entry in self._entries.items() if predicate(entry.get("tag"))]
+            for key in stale:
+                self.size -= len(self._entries.pop(key)["xml"])
+            self.invalidations += len(stale)
+        return len(stale)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.size = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+
+def fingerprint(*parts):
+    """Sidik jari stabil (sha256) dari data input yang bisa di-serialize ke JSON"""
+    data = json.dumps(parts, sort_keys=True, default=str, ensure_ascii=False)
+    return hashlib.sha256(data.encode("utf-8")).hexdigest()
+
+
+# Isi file gambar yang sudah dibaca saat warm-up (path -> bytes)
+IMAGE_DATA = {}
+
+
+def preload_image(filename):
+    """Baca file gambar sekali; insert_image berikutnya memakai bytes ini lewat image_data"""
+    with open(filename, "rb") as fh:
+        IMAGE_DATA[filename] = fh.read()
+
+
+def _apply_sheet_setup(worksheet, columns, rows, images):
+    for cols, width in columns:
+        worksheet.set_column(cols, width)
+    # Tinggi baris harus diset sebelum baris tersebut di-flush (constant_memory)
+    for row in sorted(rows):
+        worksheet.set_row(row, rows[row])
+    for row, col, filename, options in images:
+        data = IMAGE_DATA.get(filename)
+        if data is not None:
+            options = dict(options, image_data=BytesIO(data))
+        worksheet.insert_image(row, col, filename, options)
+
+
+def _register_merges(worksheet, merges):
+    """Daftarkan range merge ke worksheet tanpa menulis sel apa pun.
+
+    merge_range() xlsxwriter langsung menulis blank ke semua sel range. Di mode
+    constant_memory, tulisan ke baris berikutnya dalam range mem-flush baris
+    pertamanya, sehingga sel lain di baris itu yang ditulis setelahnya (urut
+    baris) hilang tanpa error. Karena itu range dimasukkan langsung ke
+    ``worksheet.merge``, atribut internal xlsxwriter (versi di-pin di
+    requirements.txt), dan isi selnya ditulis bersama sel lain. Pengecekan
+    overlap xlsxwriter ikut terlewati, jadi dicek ulang di sini.
+    """
+    if not isinstance(getattr(worksheet, "merge", None), list):
+        raise RuntimeError("Versi xlsxwriter tidak didukung: Worksheet.merge tidak ditemukan")
+    covered = {}
+    for first_row, first_col, last_row, last_col in merges:
+        cell_range = xl_range(first_row, first_col, last_row, last_col)
+        for row in range(first_row, last_row + 1):
+            for col in range(first_col, last_col + 1):
+                if (row, col) in covered:
+                    raise OverlappingRange(
+                        f"Merge range '{cell_range}' overlaps previous merge range "
+                        f"'{covered[(row, col)]}'."
+                    )
+                covered[(row, col)] = cell_range
+        worksheet.merge.append([first_row, first_col, last_row, last_col])
+
+
+def render_sheet(workbook, plan, formats):
+    """Tulis SheetPlan ke worksheet baru, sel dikirim urut baris lalu kolom"""
+    worksheet = workbook.add_worksheet(plan.name, worksheet_class=PartWorksheet)
+    _apply_sheet_setup(worksheet, plan.columns, plan.rows, plan.images)
+
+    _register_merges(worksheet, plan.merges)
+
+    for index, (row, col) in enumerate(sorted(plan.cells)):
+        if not index % 1024:
+            check_memory_budget()
+        value, cell_format = plan.cells[(row, col)]
+        cell_format = formats[cell_format] if cell_format else None
+        if value is SheetPlan.BLANK:
+            worksheet.write_blank(row, col, None, cell_format)
+        else:
+            worksheet.write(row, col, value, cell_format)
+    return worksheet
+
+
+def colnum_to_excel_name(n):
+    """Convert column number (1=A, 2=B, ...) to Excel letter(s)."""
+    name = ""
+    while n > 0:
+        n, remainder = divmod(n - 1, 26)
+        name = chr(65 + remainder) + name
+    return name
+
+
+def to_number(value):
+    try:
+        return float(value)
+    except (ValueError, TypeError):
+        return 0
+
+
+DOCUMENT_FAMILIES = ["RPS", "RPM", "RUB", "KTR", "PORTO"]
+
+
+def document_code(family, kode_matkul, tahun):
+    """Kode dokumen, mis. FTP-TKOM-RPS-{kode}-{tahun}; juga dipakai sebagai nama file"""
+    return f"FTP-TKOM-{family}-{kode_matkul}-{tahun}"
+
+
+def build_rps_context(matkul, tahun, rps_data, cpl_cpmk_sub, matkul_data, today=None, families=None,
+                      deterministic=False):
+    """Hitung data turunan yang dipakai lintas sheet sebelum rendering.
+
+    ``families`` membatasi dokumen yang dibuat (subset DOCUMENT_FAMILIES);
+    data turunan yang hanya dipakai dokumen lain tidak dihitung sama sekali.
+    Dengan ``deterministic``, metadata workbook memakai tanggal dokumen
+    (``today``) sehingga input yang sama selalu menghasilkan byte yang sama.
+    """
+    families = [f for f in DOCUMENT_FAMILIES if families is None or f in families]
+
+    # Tanggal dokumen hanya ditampilkan sampai hari (dd-mm-yyyy); jam dibuang
+    # supaya sheet yang memakainya tetap bisa di-cache sepanjang hari itu
+    today = datetime.combine((today or datetime.now()).date(), time())
+
+    # Buat struktur baru tanpa duplikat
+    unique_cpmk = {}
+    unique_cpl = {}
+    for kode, desc in zip(cpl_cpmk_sub["cpmk_kode"], cpl_cpmk_sub["cpmk_desc"]):
+        if kode not in unique_cpmk:
+            unique_cpmk[kode] = desc  # simpan hanya sekali
+
+    for kode, desc in zip(cpl_cpmk_sub["cpl_kode"], cpl_cpmk_sub["cpl_desc"]):
+        if kode not in unique_cpl:
+            unique_cpl[kode] = desc  # simpan hanya sekali
+
+    cpl_cpmk_sub = dict(cpl_cpmk_sub)
+    cpl_cpmk_sub["cpl_kode"] = list(unique_cpl.keys())
+    cpl_cpmk_sub["cpl_desc"] = list(unique_cpl.values())
+    cpl_cpmk_sub["cpmk_kode"] = list(unique_cpmk.keys())
+    cpl_cpmk_sub["cpmk_desc"] = list(unique_cpmk.values())
+
+    ctx = {
+        "matkul": matkul,
+        "tahun": tahun,
+        "today": today,
+        "families": families,
+        "rps_data": rps_data,
+        "cpl_cpmk_sub": cpl_cpmk_sub,
+        "matkul_data": matkul_data,
+        "rpm_sheets": [],
+        "rub_sheets": [],
+        "porto": None,
+        # Waktu dibuat di docProps/core.xml; None = waktu render
+        "created": today if deterministic else None,
+    }
+
+    if "RPS" in families or "PORTO" in families:
+        ctx.update(build_korelasi(cpl_cpmk_sub, matkul_data))
+    if "RPS" in families or "KTR" in families:
+        materi_str = ", ".join(matkul_data["materi_non_uts_uas"])
+        ctx["description_matkul"] = (
+            f"Mata kuliah {matkul} membahas konsep teoritis, metode, "
+            f"dan implementasi mengenai materi seperti {materi_str}."
+        )
+    if "RPS" in families or "RPM" in families:
+        ctx["weekly_subcpmk_desc"] = build_weekly_subcpmk_desc(cpl_cpmk_sub, matkul_data)
+    if "RPS" in families:
+        ctx.update(build_blueprint(cpl_cpmk_sub, matkul_data))
+    if "RPM" in families:
+        ctx["rpm_sheets"] = build_rpm_sheets(matkul_data, ctx["weekly_subcpmk_desc"])
+    if "RUB" in families:
+        ctx["rub_sheets"] = build_rub_sheets(matkul_data)
+    if "PORTO" in families:
+        ctx["porto"] = build_porto_data(matkul_data)
+    return ctx
+
+
+def build_korelasi(cpl_cpmk_sub, matkul_data):
+    """Korelasi CPL terhadap Sub CPMK: posisi kolom tiap CPL, bobot, dan total per CPL"""
+    start_cpl_col = 3
+    end_cpl_col = start_cpl_col + len(cpl_cpmk_sub["cpl_kode"])
+    cpl_col_map = {kode: start_cpl_col + idx for idx, kode in enumerate(cpl_cpmk_sub["cpl_kode"])}
+    totals = {col: 0.0 for col in range(start_cpl_col, end_cpl_col)}
+
+    korelasi = []  # (index subcpmk, kolom, bobot fraction)
+    bobot_per_cpl = []
+    for i, sub in enumerate(cpl_cpmk_sub["subcpmk_kode"]):
+        kode = matkul_data["cpl_bobot"][i]
+        # bobot sebagai fraction (mis. 25 -> 0.25) untuk format persen
+        try:
+            bobot = float(matkul_data["total_bobot"][i]) / 100.0
+        except Exception:
+            bobot = 0.0
+
+        if kode in cpl_col_map:
+            col = cpl_col_map[kode]
+            korelasi.append((i, col, bobot))
+            bobot_per_cpl.append(bobot)
+            totals[col] += bobot
+
+    total_per_cpl = [totals.get(col, 0.0) for col in range(start_cpl_col, end_cpl_col)]
+
+    return {
+        "start_cpl_col": start_cpl_col,
+        "end_cpl_col": end_cpl_col,
+        "cpl_col_map": cpl_col_map,
+        "korelasi": korelasi,
+        "bobot_per_cpl": bobot_per_cpl,
+        "total_per_cpl": total_per_cpl,
+    }
+
+
+def build_weekly_subcpmk_desc(cpl_cpmk_sub, matkul_data):
+    """Deskripsi Sub-CPMK untuk tiap baris pertemuan mingguan"""
+    weekly_subcpmk_desc = []
+    for subcpmk_kode in matkul_data["subcpmk_weekly"][:len(matkul_data["minggu_ke"])]:
+        subcpmk_desc = ""
+        if subcpmk_kode in cpl_cpmk_sub["subcpmk_kode"]:
+            idx = cpl_cpmk_sub["subcpmk_kode"].index(subcpmk_kode)
+            subcpmk_desc = cpl_cpmk_sub["subcpmk_desc"][idx]
+        weekly_subcpmk_desc.append(subcpmk_desc)
+
+    return weekly_subcpmk_desc
+
+
+def build_blueprint(cpl_cpmk_sub, matkul_data):
+    """Teknik penilaian dan daftar rubrik per Sub-CPMK untuk blue print RPS"""
+    kriteria_per_subcpmk = []
+    rubrik_per_subcpmk = []
+    for kode in cpl_cpmk_sub["subcpmk_kode"]:
+        # cari semua kriteria untuk subcpmk ini
+        related_kriteria = [
+            matkul_data["kriteria"][i]
+            for i, wk in enumerate(matkul_data["subcpmk_weekly"])
+            if wk == kode
+        ]
+
+        # cek apakah ada "Tugas"
+        if any("Tugas" in k for k in related_kriteria):
+            kriteria_per_subcpmk.append("Ekspository dan diskusi (Oral Assessment), Multiple Choice Questions (MCQ) dan Short Answer Questions (SAQ)")
+        else:
+            kriteria_per_subcpmk.append("Kuis, diskusi, dan wawancara pemahaman (Oral Assessment)")
+
+        # kumpulkan semua teks di dalam [ ... ]
+        rubrik_items = []
+        for k in related_kriteria:
+            rubrik_items.extend(re.findall(r"\[(.*?)\]", k))
+        rubrik_per_subcpmk.append(", ".join(rubrik_items) if rubrik_items else "")
+
+    return {"kriteria_per_subcpmk": kriteria_per_subcpmk, "rubrik_per_subcpmk": rubrik_per_subcpmk}
+
+
+def build_rpm_sheets(matkul_data, weekly_subcpmk_desc):
+    """Daftar sheet RPM: Tugas/Kuis berurutan, lalu UTS & UAS"""
+    rpm_sheets = []
+    rpm_index = 1
+    tugas_count = 0
+    kuis_count = 0
+    uts = {"minggu": None, "bobot": 0, "indikator": None, "ada": False}
+    uas = {"minggu": None, "bobot": 0, "indikator": None, "ada": False}
+
+    for i, kriteria in enumerate(matkul_data["kriteria_numbered"]):
+        if "Tugas" in kriteria or "Kuis" in kriteria:
+            if "Tugas" in kriteria:
+                tugas_count += 1
+                sheet_name = f"RPM{rpm_index} (Tugas {tugas_count})"
+            else:
+                kuis_count += 1
+                sheet_name = f"RPM{rpm_index} (Kuis {kuis_count})"
+            rpm_sheets.append({
+                "sheet_name": sheet_name,
+                "judul_kriteria": kriteria,
+                "subcpmk": weekly_subcpmk_desc[i],
+                "indikator": matkul_data["indikator_numbered"][i],
+                "minggu": matkul_data["minggu_ke"][i],
+                "bobot": matkul_data["bobot"][i],
+            })
+            rpm_index += 1
+        else:
+            for label, agg in (("Evaluasi UTS", uts), ("Evaluasi UAS", uas)):
+                if label in kriteria:
+                    agg["ada"] = True
+                    agg["bobot"] += to_number(matkul_data["bobot"][i])
+                    if agg["minggu"] is None:
+                        agg["minggu"] = matkul_data["minggu_ke"][i]
+                    if agg["indikator"] is None:
+                        agg["indikator"] = matkul_data["indikator_numbered"][i]
+                    break
+
+    # --- Tambahkan sheet UTS/UAS kalau ada ---
+    for label, agg in (("Evaluasi UTS", uts), ("Evaluasi UAS", uas)):
+        if agg["ada"]:
+            rpm_sheets.append({
+                "sheet_name": f"RPM{rpm_index} ({label})",
+                "judul_kriteria": label,
+                "subcpmk": label,
+                "indikator": agg["indikator"],
+                "minggu": agg["minggu"],
+                "bobot": agg["bobot"],
+            })
+            rpm_index += 1
+
+    return rpm_sheets
+
+
+def build_rub_sheets(matkul_data):
+    """Daftar sheet rubrik yang punya data"""
+    rub_sheets = []
+    for kode_rubrik, type_rubrik, header_title in RUBRIK_LIST:
+        subcpmk_rub_data = matkul_data[f"rubrik_{kode_rubrik}_subcpmk"]
+        cpl_rub_data = matkul_data[f"rubrik_{kode_rubrik}_cpl"]
+        if not subcpmk_rub_data or not cpl_rub_data:
+            continue  # skip kalau kosong
+        rub_sheets.append({
+            "kode": kode_rubrik,
+            "tipe": type_rubrik,
+            "judul": header_title,
+            "subcpmk": subcpmk_rub_data,
+            "cpl": cpl_rub_data,
+            # --- Cari semua kriteria yang ada kode rubrik (misal "SP1") ---
+            "kriteria": [k for k in matkul_data["kriteria_numbered"] if kode_rubrik in k],
+        })
+
+    return rub_sheets
+
+
+def build_porto_data(matkul_data):
+    """Susun kolom portofolio: item per minggu diurutkan per CPL + kolom NILAI PER CPL"""
+    # --- Step 1: Siapkan kriteria_kode ---
+    kriteria_kode = []
+    for item in matkul_data["kriteria_numbered"]:
+        before_colon = item.split(":")[0].strip()
+        inside_bracket = re.search(r"\[(.*?)\]", item)
+        inside_bracket = inside_bracket.group(0) if inside_bracket else ""
+        kriteria_kode.append(f"{before_colon} {inside_bracket}")
+
+    # --- Step 2: Mapping subcpmk → cpl, cpmk ---
+    mapping = {
+        sub: (matkul_data["cpl_bobot"][i], matkul_data["cpmk_bobot"][i])
+        for i, sub in enumerate(matkul_data["subcpmk_bobot"])
+    }
+
+    # --- Step 3 & 4: Buat data_porto sebagai dict ---
+    data_porto = []
+    for i, sub in enumerate(matkul_data["subcpmk_weekly"]):
+        cpl, cpmk = mapping[sub]
+        data_porto.append({
+            "kriteria_kode": kriteria_kode[i],
+            "subcpmk": sub,
+            "cpmk": cpmk,
+            "cpl": cpl,
+            "bobot": matkul_data["bobot"][i]
+        })
+
+    # --- Step 5: Reorder by cpl ---
+    data_porto_reordered = sorted(data_porto, key=lambda x: x["cpl"])
+
+    # --- Step 6: Sisipkan "NILAI PER CPL" bila CPL berubah ---
+    nilai_per_cpl = {"kriteria_kode": "NILAI PER CPL", "subcpmk": "", "cpmk": "", "cpl": "", "bobot": ""}
+    final_data = []
+    last_cpl = None
+    for row in data_porto_reordered:
+        current_cpl = row["cpl"]
+        if last_cpl is not None and current_cpl != last_cpl:
+            final_data.append(dict(nilai_per_cpl))
+        final_data.append(row)
+        last_cpl = current_cpl
+    final_data.append(dict(nilai_per_cpl))
+
+    # Hitung jumlah item per CPL
+    cpl_counts = {}
+    for item in final_data:
+        cpl = item["cpl"]
+        if cpl:
+            cpl_counts[cpl] = cpl_counts.get(cpl, 0) + 1
+
+    return {"final_data": final_data, "cpl_counts": cpl_counts}
+
+
+def plan_rps_layout(ctx):
+    """Hitung baris awal/akhir (1-based) tiap section sheet RPS sebelum menulis"""
+    cpl_cpmk_sub = ctx["cpl_cpmk_sub"]
+    matkul_data = ctx["matkul_data"]
+    n_cpl = len(cpl_cpmk_sub["cpl_kode"])
+    n_cpmk = len(cpl_cpmk_sub["cpmk_kode"])
+    n_sub = len(cpl_cpmk_sub["subcpmk_kode"])
+
+    layout = {"cpl_start_row": 12}
+    layout["cpmk_start_row"] = layout["cpl_start_row"] + 1 + n_cpl
+    layout["subcpmk_start_row"] = layout["cpmk_start_row"] + 1 + n_cpmk
+    layout["korelasi_start_row"] = layout["subcpmk_start_row"] + 1 + n_sub
+    layout["total_row"] = layout["korelasi_start_row"] + n_sub + 2
+    layout["desc_start_row"] = layout["total_row"] + 1
+    layout["bahan_start_row"] = layout["desc_start_row"] + 1
+    layout["bahan_end_row"] = layout["bahan_start_row"] + len(matkul_data["materi_non_uts_uas_numbered"]) - 1
+    layout["pustaka_start_row"] = layout["bahan_end_row"] + 1
+    layout["pustaka_utama_end_row"] = layout["pustaka_start_row"] + len(matkul_data["pustaka_utama"])
+    layout["pustaka_pendukung_end_row"] = layout["pustaka_utama_end_row"] + len(matkul_data["pustaka_pendukung"]) + 1
+    layout["dosen_start_row"] = layout["pustaka_pendukung_end_row"] + 1
+    layout["dosen_end_row"] = layout["dosen_start_row"] + len(matkul_data["team_teaching"]) - 1
+    layout["syarat_start_row"] = layout["dosen_end_row"] + 1
+    layout["syarat_end_row"] = layout["syarat_start_row"] + len(matkul_data["matkul_syarat"]) - 1
+    layout["mingguan_start_row"] = layout["syarat_end_row"] + 1
+    layout["mingguan_body_start_row"] = layout["mingguan_start_row"] + 4
+    layout["blueprint_start_row"] = layout["mingguan_body_start_row"] + len(matkul_data["minggu_ke"]) + 2
+    layout["last_rps_start_row"] = layout["blueprint_start_row"] + n_sub + 4
+    return layout
+
+
+def plan_rps_sheet(ctx, layout=None):
+    """Sheet RPS: header, info MK, CPL/CPMK/Sub-CPMK, korelasi, mingguan, blue print"""
+    layout = layout or plan_rps_layout(ctx)
+    matkul = ctx["matkul"]
+    tahun = ctx["tahun"]
+    rps_data = ctx["rps_data"]
+    cpl_cpmk_sub = ctx["cpl_cpmk_sub"]
+    matkul_data = ctx["matkul_data"]
+    total_per_cpl = ctx["total_per_cpl"]
+    start_cpl_col = ctx["start_cpl_col"]
+    end_cpl_col = ctx["end_cpl_col"]
+    cpl_col_map = ctx["cpl_col_map"]
+
+    worksheet = SheetPlan("RPS")
+
+    # Atur ukuran kolom
+    worksheet.set_column("A:A", 5)        # Kolom A kecil
+    worksheet.set_column("B:B", 18)       # Kolom B - L agak besar (2x normal)
+    worksheet.set_column("C:C", 36)       # Kolom B - L agak besar (2x normal)
+    worksheet.set_column("D:L", 18)       # Kolom B - L agak besar (2x normal)
+
+    # Header
+    apply_block(worksheet, HEADER_BLOCKS["RPS"], kode_dokumen=document_code("RPS", rps_data["kode_matkul"], tahun))
+
+    # Matakuliah Info
+    apply_block(
+        worksheet, INFO_BLOCKS["RPS"],
+        matkul=matkul,
+        kode_matkul=rps_data["kode_matkul"],
+        rumpun=rps_data["rumpun"],
+        sks=str(int(rps_data["bobot_sks"])),
+        semester=rps_data["semester"],
+        tanggal=ctx["today"],
+    )
+
+    # Otorisasi
+    worksheet.merge_range("B10:C10", "OTORISASI / PENGESAHAN", "title_format")
+    worksheet.merge_range("D10:F10", "Dosen Pengembang RPS", "title_format")
+    worksheet.merge_range("G10:I10", "Koordinator Mata Kuliah", "title_format")
+    worksheet.merge_range("J10:L10", "Ketua Program Studi", "title_format")
+
+    worksheet.set_row(10, 110)  # baris 11
+
+    worksheet.merge_range("B11:C11", "OTORISASI / PENGESAHAN", "text_otorisasi_format")
+    worksheet.merge_range("D11:F11", matkul_data["team_teaching"][0], "text_otorisasi_format")
+    worksheet.merge_range("G11:I11", "I Made Adi Bhaskara, S.Kom., M.T.", "text_otorisasi_format")
+    worksheet.merge_range("J11:L11", "Ir. I Made Surya Kumara, S.T., M.Sc.", "text_otorisasi_format")
+
+    # CPL
+    cpl_start_row = layout["cpl_start_row"]
+    worksheet.merge_range(f'C{cpl_start_row}:L{cpl_start_row}', "CPL-PRODI yang dibebankan pada MK", "title_cpl_format")
+    for i in range(len(cpl_cpmk_sub["cpl_kode"])):
+        worksheet.write(f'C{cpl_start_row+1+i}', cpl_cpmk_sub["cpl_kode"][i], "text_cpl_format")
+        worksheet.merge_range(f'D{cpl_start_row+1+i}:L{cpl_start_row+1+i}', cpl_cpmk_sub["cpl_desc"][i], "text_cpl_format")
+
+    # CPMK
+    cpmk_start_row = layout["cpmk_start_row"]
+    worksheet.merge_range(f'C{cpmk_start_row}:K{cpmk_start_row}', "Capaian Pembelajaran Mata Kuliah (CPMK)", "title_cpl_format")
+    worksheet.write(f'L{cpmk_start_row}', "Bobot (%)", "title_cpl_format")
+    for i in range(len(cpl_cpmk_sub["cpmk_kode"])):
+        worksheet.write(f'C{cpmk_start_row+1+i}', cpl_cpmk_sub["cpmk_kode"][i], "text_cpl_format")
+        worksheet.merge_range(f'D{cpmk_start_row+1+i}:K{cpmk_start_row+1+i}', cpl_cpmk_sub["cpmk_desc"][i], "text_cpl_format")
+        worksheet.write(f'L{cpmk_start_row+1+i}', int(matkul_data["bobot_per_cpmk"][i]), "text_cpl_format")
+
+    # Sub-CPMK
+    subcpmk_start_row = layout["subcpmk_start_row"]
+    worksheet.merge_range(f'C{subcpmk_start_row}:L{subcpmk_start_row}', "Kemampuan akhir tiap tahapan belajar (Sub-CPMK)", "title_cpl_format")
+    for i in range(len(cpl_cpmk_sub["subcpmk_kode"])):
+        worksheet.write(f'C{subcpmk_start_row+1+i}', cpl_cpmk_sub["subcpmk_kode"][i], "text_cpl_format")
+        worksheet.merge_range(f'D{subcpmk_start_row+1+i}:L{subcpmk_start_row+1+i}', cpl_cpmk_sub["subcpmk_desc"][i], "text_cpl_format")
+
+    # Korelasi CPL terhadap Sub CPMK
+    korelasi_start_row = layout["korelasi_start_row"]
+    worksheet.merge_range(f'C{korelasi_start_row}:L{korelasi_start_row}', "Korelasi CPL terhadap Sub CPMK", "title_cpl_format")
+
+    for row in range(korelasi_start_row+1, korelasi_start_row + 2 + len(cpl_cpmk_sub["subcpmk_kode"]) + 1):
+        for col in range(2, 12):  # D=3, L=11 (0-based index)
+            worksheet.write(row-1, col, "", "text_cpl_format")
+
+    # baris terakhir untuk total
+    total_row = layout["total_row"]
+    worksheet.write(total_row - 1, 2, "Total", "title_korelasi_format")
+
+    for i in range(len(cpl_cpmk_sub["subcpmk_kode"])):
+        worksheet.write(f'C{korelasi_start_row+2+i}', cpl_cpmk_sub["subcpmk_kode"][i], "title_korelasi_format")
+
+    for col in range(start_cpl_col, end_cpl_col):
+        worksheet.write(korelasi_start_row, col, cpl_cpmk_sub["cpl_kode"][col-3], "title_korelasi_format")
+
+    # --- isi bobot sesuai CPL ---
+    for i, col, bobot in ctx["korelasi"]:
+        excel_row = korelasi_start_row + 1 + i               # Excel row number (1-based)
+        worksheet.write(excel_row, col, bobot, "percent_format")
+
+    # === tulis total (sebagai angka persen) di baris "Total" tanpa formula ===
+    for col in range(start_cpl_col, end_cpl_col):
+        worksheet.write(total_row - 1, col, total_per_cpl[col - start_cpl_col], "percent_format_bold")
+
+    worksheet.merge_range(f"B{cpl_start_row}:B{total_row}", "Capaian Pembelajaran", "title_korelasi_format")
+
+    # Deskripsi singkat
+    desc_start_row = layout["desc_start_row"]
+    worksheet.set_row(desc_start_row-1, 110)
+    worksheet.write(f"B{desc_start_row}", "Deskripsi Singkat MK", "title_korelasi_format")
+    worksheet.merge_range(f'C{desc_start_row}:L{desc_start_row}', ctx["description_matkul"], "text_cpl_format")
+
+    # Bahan kajian
+    bahan_start_row = layout["bahan_start_row"]
+    bahan_end_row = layout["bahan_end_row"]
+    worksheet.merge_range(f"B{bahan_start_row}:B{bahan_end_row}", "Bahan Kajian/Materi Pembelajaran", "title_korelasi_format")
+    for i in range(len(matkul_data["materi_non_uts_uas_numbered"])):
+        worksheet.merge_range(f'C{desc_start_row+1+i}:L{desc_start_row+1+i}', matkul_data["materi_non_uts_uas_numbered"][i], "text_cpl_format")
+
+    # Pustaka
+    pustaka_start_row = layout["pustaka_start_row"]
+    pustaka_utama_end_row = layout["pustaka_utama_end_row"]
+    pustaka_pendukung_end_row = layout["pustaka_pendukung_end_row"]
+    worksheet.merge_range(f"B{pustaka_start_row}:B{pustaka_pendukung_end_row}", "Pustaka", "title_korelasi_format")
+    worksheet.merge_range(f"C{pustaka_start_row}:L{pustaka_start_row}", "Utama:", "title_cpl_format")
+    worksheet.merge_range(f"C{pustaka_utama_end_row+1}:L{pustaka_utama_end_row+1}", "Pendukung:", "title_cpl_format")
+
+    for i in range(len(matkul_data["pustaka_utama"])):
+        worksheet.merge_range(f'C{pustaka_start_row+1+i}:L{pustaka_start_row+1+i}', matkul_data["pustaka_utama"][i], "text_cpl_format")
+
+    for i in range(len(matkul_data["pustaka_pendukung"])):
+        worksheet.merge_range(f'C{pustaka_utama_end_row+2+i}:L{pustaka_utama_end_row+2+i}', matkul_data["pustaka_pendukung"][i], "text_cpl_format")
+
+    # Dosen pengampu
+    dosen_start_row = layout["dosen_start_row"]
+    dosen_end_row = layout["dosen_end_row"]
+    worksheet.merge_range(f"B{dosen_start_row}:B{dosen_end_row}", "Dosen Pengampu", "title_korelasi_format")
+    for i in range(len(matkul_data["team_teaching"])):
+        worksheet.merge_range(f'C{dosen_start_row+i}:L{dosen_start_row+i}', matkul_data["team_teaching"][i], "text_cpl_format")
+
+    # Matakuliah syarat
+    syarat_start_row = layout["syarat_start_row"]
+    syarat_end_row = layout["syarat_end_row"]
+    if syarat_end_row == syarat_start_row:
+        worksheet.write(f"B{syarat_start_row}", "Matakuliah Syarat", "title_korelasi_format")
+    else:
+        worksheet.merge_range(f"B{syarat_start_row}:B{syarat_end_row}", "Matakuliah Syarat", "title_korelasi_format")
+    for i in range(len(matkul_data["matkul_syarat"])):
+        worksheet.merge_range(f'C{syarat_start_row+i}:L{syarat_start_row+i}', matkul_data["matkul_syarat"][i], "text_cpl_format")
+
+    # Pertemuan Mingguan
+    # Header
+    mingguan_start_row = layout["mingguan_start_row"]
+    worksheet.merge_range(f"B{mingguan_start_row}:B{mingguan_start_row+2}", "Mg Ke-", "title_format")
+    worksheet.write(f"B{mingguan_start_row+3}", "(1)", "title_format")
+
+    worksheet.merge_range(f"C{mingguan_start_row}:C{mingguan_start_row+2}", "Kemampuan akhir tiap tahapan belajar (Sub-CPMK)", "title_format")
+    worksheet.write(f"C{mingguan_start_row+3}", "(2)", "title_format")
+
+    worksheet.merge_range(f"D{mingguan_start_row}:G{mingguan_start_row}", "Penilaian", "title_format")
+    worksheet.merge_range(f"D{mingguan_start_row+1}:E{mingguan_start_row+2}", "Indikator", "title_format")
+    worksheet.merge_range(f"F{mingguan_start_row+1}:G{mingguan_start_row+2}", "Teknik dan Instrumen Penilaian", "title_format")
+    worksheet.merge_range(f"D{mingguan_start_row+3}:E{mingguan_start_row+3}", "(3)", "title_format")
+    worksheet.merge_range(f"F{mingguan_start_row+3}:G{mingguan_start_row+3}", "(4)", "title_format")
+
+    worksheet.merge_range(f"H{mingguan_start_row}:I{mingguan_start_row+1}", "Strategi Pembelajaran dan Metode Pembelajaran [Estimasi Waktu]", "title_format")
+    worksheet.write(f"H{mingguan_start_row+2}", "Luring (offline)", "title_format")
+    worksheet.write(f"I{mingguan_start_row+2}", "Daring (online)", "title_format")
+    worksheet.write(f"H{mingguan_start_row+3}", "(5)", "title_format")
+    worksheet.write(f"I{mingguan_start_row+3}", "(6)", "title_format")
+
+    worksheet.merge_range(f"J{mingguan_start_row}:K{mingguan_start_row+2}", "Materi Pembelajaran dan Daftar Referensi \n[Pustaka]", "title_format")
+    worksheet.merge_range(f"J{mingguan_start_row+3}:K{mingguan_start_row+3}", "(7)", "title_format")
+
+    worksheet.merge_range(f"L{mingguan_start_row}:L{mingguan_start_row+2}", "Bobot Penilaian (%)", "title_format")
+    worksheet.write(f"L{mingguan_start_row+3}", "(8)", "title_format")
+
+    # Body RPS
+    mingguan_body_start_row = layout["mingguan_body_start_row"]
+    for i in range(len(matkul_data["minggu_ke"])):
+        row = mingguan_body_start_row + i
+        worksheet.write(f'B{row}', int(float(matkul_data["minggu_ke"][i])), "text_cpl_format")
+
+        subcpmk_kode = matkul_data["subcpmk_weekly"][i]
+        worksheet.write(f'C{row}', f'{ctx["weekly_subcpmk_desc"][i]} ({subcpmk_kode}) ', "text_cpl_format")
+
+        indikator_text = matkul_data["indikator_numbered"][i]
+
+        # === Cek apakah ini baris evaluasi ===
+        if "Evaluasi UTS" in indikator_text or "Evaluasi UAS" in indikator_text:
+            # Merge dari D sampai K, isi dengan teks evaluasi
+            worksheet.merge_range(f'D{row}:K{row}', indikator_text, "title_format")
+            # Tetap isi bobot di L
+            worksheet.write(f'L{row}', int(float(matkul_data["bobot"][i])), "text_cpl_format")
+            continue
+
+        worksheet.merge_range(f'D{row}:E{row}', indikator_text, "text_cpl_format")
+        worksheet.merge_range(f'F{row}:G{row}', matkul_data["kriteria_numbered"][i], "text_cpl_format")
+
+        if "Tugas" in matkul_data["kriteria_numbered"][i]:
+            worksheet.write(f'H{row}', f"Ekspository dan diskusi [TM : {rps_data['bobot_sks']}x50'] Task Based Learning [TB : {rps_data['bobot_sks']}x50']", "text_cpl_format")
+        else:
+            worksheet.write(f'H{row}', f"Ekspository dan diskusi [TM : {rps_data['bobot_sks']}x50']", "text_cpl_format")
+
+        worksheet.write(f'I{row}', f"Link materi [BM : {rps_data['bobot_sks']}x50']", "text_cpl_format")
+
+        worksheet.merge_range(
+            f'J{row}:K{row}',
+            f'{matkul_data["materi_weekly_numbered"][i]} \n[{matkul_data["pustaka_weekly"][i]}]',
+            "text_cpl_format"
+        )
+
+        worksheet.write(f'L{row}', float(matkul_data["bobot"][i]), "text_cpl_format")
+
+    # Blue print penilaian
+    blueprint_start_row = layout["blueprint_start_row"]
+    worksheet.merge_range(f"B{blueprint_start_row}:L{blueprint_start_row}", "BLUE PRINT PENILAIAN ATAU RENCANA ASESMEN DAN EVALUASI (RAE)", "title_format")
+
+    start_col_green = 1  # B
+    end2_col_green = 11
+    end_col_green = 2 + len(cpl_cpmk_sub["cpl_kode"])  # geser ke kanan sesuai jumlah CPL
+
+    start_green_cell = xl_rowcol_to_cell(blueprint_start_row, start_col_green)
+    end_green_cell = xl_rowcol_to_cell(blueprint_start_row, end_col_green)
+    start2_green_cell = xl_rowcol_to_cell(blueprint_start_row, end_col_green+1)
+    end2_green_cell = xl_rowcol_to_cell(blueprint_start_row, end2_col_green)
+
+    worksheet.merge_range(f'{start_green_cell}:{end_green_cell}', "KRITERIA PENILAIAN", "title_format_green")
+    worksheet.merge_range(f'{start2_green_cell}:{end2_green_cell}', "RANGE NILAI", "title_format_green")
+
+    worksheet.merge_range(f'B{blueprint_start_row+2}:B{blueprint_start_row+3}', "Bobot", "title_format")
+    worksheet.merge_range(f'C{blueprint_start_row+2}:C{blueprint_start_row+3}', "Teknik dan Penilaian", "title_format")
+
+    for col in range(start_cpl_col, end_cpl_col):
+        worksheet.write(blueprint_start_row + 1, col, cpl_cpmk_sub["cpl_kode"][col-3], "title_format")
+        worksheet.write(blueprint_start_row + 2, col, total_per_cpl[col-3], "percent_format_bold_fill")
+
+    start_asm_cell = xl_rowcol_to_cell(blueprint_start_row+1, end_col_green+1)
+    end_asm_cell = xl_rowcol_to_cell(blueprint_start_row+2, end_col_green+1)
+    worksheet.merge_range(f'{start_asm_cell}:{end_asm_cell}', "Bobot Asesmen", "title_format")
+
+    start_range_cell = xl_rowcol_to_cell(blueprint_start_row+1, end_col_green+2)
+    end_range_cell = xl_rowcol_to_cell(blueprint_start_row+(len(matkul_data["subcpmk_bobot"]) + 5), 11)
+    worksheet.merge_range(f'{start_range_cell}:{end_range_cell}', RANGE_NILAI_TEXT, "text_cpl_format")
+
+    # isi semua cell di range dengan border
+    for row in range(blueprint_start_row + 3, blueprint_start_row + 7 + 1):
+        for col in range(3, end_col_green + 2):
+            worksheet.write(row, col, "", "text_format")
+
+    for i in range(len(cpl_cpmk_sub["subcpmk_kode"])):
+        worksheet.write(f'B{blueprint_start_row+4+i}', cpl_cpmk_sub["subcpmk_kode"][i], "text_format")
+        worksheet.write(f'C{blueprint_start_row+4+i}', ctx["kriteria_per_subcpmk"][i], "text_format")
+
+    for i, sub in enumerate(cpl_cpmk_sub["subcpmk_kode"]):
+        kode = matkul_data["cpl_bobot"][i]
+        try:
+            bobot = int(float(matkul_data["total_bobot"][i]))
+        except Exception:
+            bobot = 0
+
+        if kode in cpl_col_map:
+            worksheet.write(blueprint_start_row + 3 + i, cpl_col_map[kode], f'Nilai x {bobot}% \n({ctx["rubrik_per_subcpmk"][i]})', "percent_format")
+
+    for i in range(len(cpl_cpmk_sub["subcpmk_kode"])):
+        worksheet.write(blueprint_start_row+3+i, end_col_green+1, matkul_data["total_bobot"][i], "text_format")
+
+    last_rps_start_row = layout["last_rps_start_row"]
+    worksheet.merge_range(f'B{last_rps_start_row}:C{last_rps_start_row}', "JUMLAH", "title_korelasi_format")
+    worksheet.merge_range(f'B{last_rps_start_row+1}:C{last_rps_start_row+1}', "NILAI MATA KULIAH", "title_korelasi_format")
+    worksheet.merge_range(f'B{last_rps_start_row+2}:C{last_rps_start_row+2}', "NILAI CPL", "title_korelasi_format")
+
+    # buat label AA, BB, CC, ... sesuai jumlah CPL
+    labels = [chr(65 + i) * 2 for i in range(len(cpl_cpmk_sub["cpl_kode"]))]  # A=65 di ASCII
+
+    # tulis label di row last_rps_start_row
+    for idx, col in enumerate(range(start_cpl_col, end_cpl_col)):
+        worksheet.write(last_rps_start_row-1, col, labels[idx], "title_korelasi_format")
+        worksheet.write(last_rps_start_row + 1, col, f"{labels[idx]}/{total_per_cpl[idx]} x100", "title_korelasi_format")
+
+    # merge semua kolom di row last_rps_start_row untuk teks gabungan
+    merged_start = xl_col_to_name(start_cpl_col)
+    merged_end = xl_col_to_name(end_cpl_col - 1)
+    worksheet.merge_range(
+        f"{merged_start}{last_rps_start_row+1}:{merged_end}{last_rps_start_row+1}",
+        " + ".join(labels),
+        "title_korelasi_format",
+    )
+    return worksheet
+
+
+def _plan_dosen_rows(worksheet, team_teaching, first_row, last_col):
+    # Buat 4 baris kosong dulu, lalu isi nama dosen sesuai jumlah
+    for i in range(4):
+        worksheet.merge_range(f"D{first_row+i}:{last_col}{first_row+i}", "", "text_cpl_format")
+    if len(team_teaching) < 5:
+        for i in range(len(team_teaching)):
+            worksheet.write(f"D{first_row+i}", team_teaching[i], "text_cpl_format")
+    else:
+        worksheet.write(f"D{first_row}", team_teaching[0], "text_cpl_format")
+
+
+def plan_rpm_sheet(ctx, rpm):
+    """Satu sheet Rencana Penugasan Mahasiswa untuk satu Tugas/Kuis/UTS/UAS"""
+    matkul = ctx["matkul"]
+    rps_data = ctx["rps_data"]
+    matkul_data = ctx["matkul_data"]
+    minggu_rpm = rpm["minggu"]
+    indikator_numbered_rpm = rpm["indikator"]
+
+    worksheet_rpm = SheetPlan(rpm["sheet_name"])
+    # Atur ukuran kolom
+    worksheet_rpm.set_column("A:A", 5)        # Kolom A kecil
+    worksheet_rpm.set_column("B:B", 18)       # Kolom B - L agak besar (2x normal)
+    worksheet_rpm.set_column("C:J", 18)       # Kolom B - L agak besar (2x normal)
+    apply_block(
+        worksheet_rpm, HEADER_BLOCKS["RPM"],
+        kode_dokumen=document_code("RPM", rps_data["kode_matkul"], ctx["tahun"]),
+    )
+    apply_block(
+        worksheet_rpm, INFO_BLOCKS["RPM"],
+        matkul=matkul,
+        kode_matkul=rps_data["kode_matkul"],
+        sks=str(int(rps_data["bobot_sks"])),
+        semester=rps_data["semester"],
+    )
+
+    worksheet_rpm.merge_range("B8:C11", "DOSEN PENGAMPU", "title_cpl_format")
+    _plan_dosen_rows(worksheet_rpm, matkul_data["team_teaching"], 8, "J")
+
+    worksheet_rpm.merge_range("B12:F12", "BENTUK TUGAS", "title_cpl_format")
+    worksheet_rpm.merge_range("B13:F13", "Penugasan Individu", "text_cpl_format")
+    worksheet_rpm.merge_range("G12:J12", "WAKTU PENGERJAAN TUGAS", "title_cpl_format")
+    worksheet_rpm.merge_range("G13:J13", f'Minggu ke-{int(float(minggu_rpm))}', "text_cpl_format")
+
+    worksheet_rpm.merge_range("B14:J14", "JUDUL TUGAS", "title_cpl_format")
+    worksheet_rpm.merge_range("B15:J15", rpm["judul_kriteria"], "text_cpl_format")
+
+    worksheet_rpm.merge_range("B16:J16", "SUB CAPAIAN PEMBELAJARAN MATA KULIAH", "title_cpl_format")
+    worksheet_rpm.merge_range("B17:J17", rpm["subcpmk"], "text_cpl_format")
+
+    worksheet_rpm.merge_range("B18:J18", "DESKRIPSI TUGAS", "title_cpl_format")
+    worksheet_rpm.merge_range("B19:J19", indikator_numbered_rpm, "text_cpl_format")
+
+    worksheet_rpm.merge_range("B20:J20", "METODE PENGERJAAN TUGAS", "title_cpl_format")
+    worksheet_rpm.merge_range("B21:J21", "Mahasiswa menjawab soal yang diberikan pada saat perkuliahan", "text_cpl_format")
+    worksheet_rpm.merge_range("B22:J22", "BENTUK DAN FORMAT LUARAN", "title_cpl_format")
+    worksheet_rpm.write("B23", "a. Obyek Garapan", "title_korelasi_format")
+    worksheet_rpm.merge_range("C23:J23", "Daftar soal", "text_cpl_format")
+    worksheet_rpm.write("B24", "b. Bentuk Luaran", "title_korelasi_format")
+    worksheet_rpm.merge_range("C24:J24", "Penjelasan dan analisis", "text_cpl_format")
+
+    worksheet_rpm.merge_range("B25:J25", "INDIKATOR, KRITERIA, dan BOBOT PENILAIAN", "title_cpl_format")
+    worksheet_rpm.merge_range("B26:J26", f'Indikator: {indikator_numbered_rpm}', "text_cpl_format")
+    worksheet_rpm.merge_range("B27:J27", "", "text_cpl_format")
+    worksheet_rpm.merge_range("B28:J28", f'Bobot Penilaian : {rpm["bobot"]} % dari total 100% penilaian mata kuliah', "text_cpl_format")
+    worksheet_rpm.merge_range("B29:J29", "Kriteria Penilaian: Terlampir", "text_cpl_format")
+
+    worksheet_rpm.merge_range("B30:J30", "JADWAL PELAKSANAAN", "title_cpl_format")
+    worksheet_rpm.merge_range("B31:J31", f'Minggu ke-{int(float(minggu_rpm))}', "text_cpl_format")
+
+    worksheet_rpm.merge_range("B32:J32", "LAIN-LAIN", "title_cpl_format")
+    worksheet_rpm.merge_range("B33:J33", "-", "text_cpl_format")
+
+    worksheet_rpm.merge_range("B34:J34", "REFERENSI", "title_cpl_format")
+    pustaka = matkul_data["pustaka_utama"] + matkul_data["pustaka_pendukung"]
+    for i in range(len(pustaka)):
+        worksheet_rpm.merge_range(f'B{35+i}:J{35+i}', pustaka[i], "text_cpl_format")
+    return worksheet_rpm
+
+
+def plan_rub_sheet(ctx, rub):
+    """Satu sheet rubrik penilaian (SP1/H1/H2/H3/A1/A2/A3)"""
+    rps_data = ctx["rps_data"]
+    cpl_cpmk_sub = ctx["cpl_cpmk_sub"]
+    matkul_data = ctx["matkul_data"]
+
+    worksheet_rub = SheetPlan(f"RUB {rub['kode']}")
+
+    # Atur ukuran kolom
+    worksheet_rub.set_column("A:A", 5)        # Kolom A kecil
+    worksheet_rub.set_column("B:I", 25)       # Kolom B - L agak besar (2x normal)
+
+    # --- Header utama ---
+    apply_block(
+        worksheet_rub, HEADER_BLOCKS["RUB"],
+        judul=rub["judul"],
+        kode_dokumen=document_code("RUB", rps_data["kode_matkul"], ctx["tahun"]),
+    )
+
+    # --- Info MK ---
+    apply_block(worksheet_rub, INFO_BLOCKS["RUB"], matkul=ctx["matkul"], kode_matkul=rps_data["kode_matkul"])
+
+    worksheet_rub.merge_range("B8:C11", "DOSEN PENGAMPU", "title_cpl_format")
+    _plan_dosen_rows(worksheet_rub, matkul_data["team_teaching"], 8, "I")
+
+    worksheet_rub.merge_range("B12:C12", "SEMESTER", "title_cpl_format")
+    worksheet_rub.merge_range("D12:I12", rps_data["semester"], "text_cpl_format")
+
+    worksheet_rub.merge_range("B13:C13", "SKS", "title_cpl_format")
+    worksheet_rub.merge_range("D13:I13", rps_data["bobot_sks"], "text_cpl_format")
+
+    related_kriteria = rub["kriteria"]
+    worksheet_rub.set_row(13, 15*len(related_kriteria))  # baris 14
+
+    worksheet_rub.merge_range("B14:C14", "Tugas", "title_cpl_format")
+    worksheet_rub.merge_range("D14:I14", "\n ".join(related_kriteria), "text_cpl_format")
+
+    worksheet_rub.merge_range("B15:C15", "Tipe", "title_cpl_format")
+    worksheet_rub.merge_range("D15:I15", rub["tipe"], "text_cpl_format")
+
+    worksheet_rub.merge_range("B16:C16", "Sifat", "title_cpl_format")
+    worksheet_rub.merge_range("D16:I16", "Individu", "text_cpl_format")
+
+    # --- Capaian & deskripsi ---
+    worksheet_rub.merge_range("B17:C17", "Capaian", "title_cpl_format")
+
+    for i in range(len(rub["subcpmk"])):
+        worksheet_rub.merge_range(f"E{17+i}:I{17+i}", "", "text_cpl_format")
+
+    row = 16
+    for idx, (subcpmk, cpl) in enumerate(zip(rub["subcpmk"], rub["cpl"])):
+        try:
+            sub_desc = cpl_cpmk_sub["subcpmk_desc"][idx]  # ambil berdasarkan urutan
+        except (IndexError, TypeError):
+            sub_desc = ""
+        worksheet_rub.write(row, 3, subcpmk, "title_korelasi_format")
+        worksheet_rub.write(row, 4, sub_desc, "text_cpl_format")
+        row += 1
+    return worksheet_rub
+
+
+def plan_ktr_sheet(ctx):
+    """Sheet KONTRAK dengan header mirip RPS template"""
+    rps_data = ctx["rps_data"]
+    cpl_cpmk_sub = ctx["cpl_cpmk_sub"]
+    matkul_data = ctx["matkul_data"]
+
+    worksheet_kontrak = SheetPlan("KTR")
+
+    # Atur ukuran kolom
+    worksheet_kontrak.set_column("A:A", 5)        # Kolom A kecil
+    worksheet_kontrak.set_column("B:L", 18)       # Kolom B - L agak besar (2x normal)
+
+    # --- Header dengan logo ---
+    apply_block(
+        worksheet_kontrak, HEADER_BLOCKS["KTR"],
+        kode_dokumen=document_code("KTR", rps_data["kode_matkul"], ctx["tahun"]),
+    )
+
+    # --- Info Mata Kuliah ---
+    apply_block(
+        worksheet_kontrak, INFO_BLOCKS["KTR"],
+        matkul=ctx["matkul"],
+        kode_matkul=rps_data["kode_matkul"],
+        rumpun=rps_data["rumpun"],
+        sks=str(int(rps_data["bobot_sks"])),
+        semester=rps_data["semester"],
+    )
+
+    worksheet_kontrak.merge_range("B8:F8", "DOSEN PENGAMPU", "title_format")
+    worksheet_kontrak.write("G8", "KELAS", "title_format")
+    worksheet_kontrak.write("H8", "JUMLAH MAHASISWA", "title_format")
+    worksheet_kontrak.merge_range("I8:J8", "HARI PERTEMUAN", "title_format")
+    worksheet_kontrak.merge_range("K8:L8", "TEMPAT PERTEMUAN", "title_format")
+
+    # Buat 4 baris kosong dulu
+    for i in range(4):
+        worksheet_kontrak.merge_range(f"B{9+i}:F{9+i}", "", "text_cpl_format")
+
+    # Isi nama dosen sesuai jumlah
+    if len(matkul_data["team_teaching"]) < 5:
+        for i in range(len(matkul_data["team_teaching"])):
+            worksheet_kontrak.write(f"B{9+i}", matkul_data["team_teaching"][i], "text_cpl_format")
+    else:
+        worksheet_kontrak.write(f"B{9+i}", matkul_data["team_teaching"][0], "text_cpl_format")
+
+    worksheet_kontrak.merge_range("G9:G12", matkul_data["kelas"][0], "text_format")
+    worksheet_kontrak.merge_range("H9:H12", matkul_data["jml_mhs"][0], "text_format")
+    worksheet_kontrak.merge_range("I9:J12", matkul_data["hari"][0], "text_format")
+    worksheet_kontrak.merge_range("K9:L12", matkul_data["tempat"][0], "text_format")
+
+    # --- Isi Kontrak ---
+    worksheet_kontrak.merge_range("B13:L13", "KONTRAK PERKULIAHAN", "title_cpl_format")
+
+    kontrak_sections_2 = [
+        "\n".join(cpl_cpmk_sub["cpl_desc"]),  # manfaat = semua CPL
+        ctx["description_matkul"],            # deskripsi singkat MK
+        "\n".join(cpl_cpmk_sub["subcpmk_desc"]),  # tujuan pembelajaran
+        "\n".join(matkul_data["materi_non_uts_uas_numbered"]),  # materi perkuliahan
+        KONTRAK_STRATEGI,
+        "\n".join(matkul_data["pustaka_utama"] + matkul_data["pustaka_pendukung"]),  # referensi
+        KONTRAK_TUGAS,
+        KONTRAK_KRITERIA,
+        KONTRAK_TATA_TERTIB,
+        "Terlampir",  # jadwal
+        "Hal-hal lain yang belum dicantumkan disini akan diatur kemudian.",  # ketentuan remedial
+        KONTRAK_PERNYATAAN,
+    ]
+
+    # --- Tulis ke worksheet ---
+    worksheet_kontrak.set_row(13, 15*8)  # baris 14
+    worksheet_kontrak.set_row(14, 15*8)  # baris 15
+    worksheet_kontrak.set_row(15, 15*8)  # baris 16
+    worksheet_kontrak.set_row(16, 15*len(matkul_data["materi_non_uts_uas_numbered"]))  # baris 17
+    worksheet_kontrak.set_row(17, 15*8)  # baris 18
+    worksheet_kontrak.set_row(18, 15*(len(matkul_data["pustaka_utama"])+len(matkul_data["pustaka_pendukung"])))  # baris 19
+    worksheet_kontrak.set_row(19, 15*8)  # baris 20
+    worksheet_kontrak.set_row(20, 15*20)  # baris 21
+    worksheet_kontrak.set_row(21, 15*15)  # baris 22
+    worksheet_kontrak.set_row(24, 15*8)  # baris 25
+    for i, (judul, isi) in enumerate(zip(KONTRAK_SECTIONS, kontrak_sections_2)):
+        row = 14 + i
+        worksheet_kontrak.write(f"B{row}", i + 1, "text_format")
+        worksheet_kontrak.merge_range(f"C{row}:E{row}", judul, "title_kontrak_format")
+        worksheet_kontrak.merge_range(f"F{row}:L{row}", isi, "text_cpl_format")
+
+    worksheet_kontrak.merge_range("B28:L28", ctx["today"].strftime("%d-%m-%Y"), "text_ttd_format")
+    worksheet_kontrak.merge_range("B29:D29", "Perwakilan Mahasiswa", "text_ttd_format")
+    worksheet_kontrak.merge_range("B35:D35", "_______________________________", "text_ttd_format")
+    worksheet_kontrak.merge_range("B36:D36", "NIM.", "text_ttd_format")
+
+    worksheet_kontrak.merge_range("J29:L29", "Koordinator MK", "text_ttd_format")
+    worksheet_kontrak.merge_range("J35:L35", matkul_data["team_teaching"][0], "text_ttd_format")
+    worksheet_kontrak.merge_range("J36:L36", matkul_data["nik"][0], "text_ttd_format")
+
+    # Bagian Mengetahui
+    worksheet_kontrak.merge_range("F40:H40", "Mengetahui", "text_ttd_format")
+    worksheet_kontrak.merge_range("F41:H41", "Ketua Program Studi Teknik Komputer", "text_ttd_format")
+    worksheet_kontrak.merge_range("F42:H42", "Fakultas Teknik dan Perencanaan", "text_ttd_format")
+    worksheet_kontrak.merge_range("F43:H43", "Universitas Warmadewa", "text_ttd_format")
+
+    # Spasi tanda tangan (misalnya 2–3 baris kosong)
+    worksheet_kontrak.merge_range("F48:H48", "I Made Surya Kumara, S.T., M.Sc.", "text_ttd_format")
+    worksheet_kontrak.merge_range("F49:H49", "NIK. 230700584", "text_ttd_format")
+    return worksheet_kontrak
+
+
+def plan_porto_sheet(ctx):
+    """Sheet LEMBAR KERJA - PORTO (portofolio penilaian per CPL)"""
+    rps_data = ctx["rps_data"]
+    cpl_cpmk_sub = ctx["cpl_cpmk_sub"]
+    matkul_data = ctx["matkul_data"]
+    total_per_cpl = ctx["total_per_cpl"]
+    final_data = ctx["porto"]["final_data"]
+    cpl_counts = ctx["porto"]["cpl_counts"]
+
+    worksheet_porto = SheetPlan("LEMBAR KERJA - PORTO")
+
+    # Hitung total kolom untuk portofolio
+    total_cols = (len(matkul_data["subcpmk_weekly"]) * 3) + len(cpl_cpmk_sub["cpl_kode"]) + 2
+
+    # Mulai dari kolom E → index = 5
+    end_col_index = 5 + total_cols - 1
+    end_col_letter = colnum_to_excel_name(end_col_index)
+
+    end_col_min_letter = colnum_to_excel_name(end_col_index - 1)
+
+    end_col_header = end_col_index - 6
+    end_col_header_letter = colnum_to_excel_name(end_col_header)
+
+    startkode_col_header_letter = colnum_to_excel_name(end_col_header + 1)
+
+    # Atur ukuran kolom sama dengan rubrik
+    worksheet_porto.set_column("A:A", 2)
+    worksheet_porto.set_column("B:B", 5)
+    worksheet_porto.set_column("C:C", 15)
+    worksheet_porto.set_column("D:D", 30)
+    worksheet_porto.set_column(f"E:{end_col_letter}", 5)
+
+    # --- Header utama (kolom ikut lebar portofolio) ---
+    columns = {
+        "title_last_col": end_col_header_letter,
+        "kode_first_col": startkode_col_header_letter,
+        "last_col": end_col_letter,
+    }
+    apply_block(
+        worksheet_porto, HEADER_BLOCKS["PORTO"], **columns,
+        kode_dokumen=document_code("PORTO", rps_data["kode_matkul"], ctx["tahun"]),
+    )
+
+    # --- Info MK ---
+    apply_block(
+        worksheet_porto, INFO_BLOCKS["PORTO"], **columns,
+        matkul=ctx["matkul"],
+        kode_matkul=rps_data["kode_matkul"],
+        kelas=matkul_data["kelas"][0],
+        semester=rps_data["semester"][0],
+        tahun_ajar=matkul_data["tahun_ajar"][0],
+    )
+
+    # Dosen pengampu
+    worksheet_porto.merge_range("B11:D14", "Dosen Pengampu", "title_cpl_format")
+    for i, dosen in enumerate(matkul_data["team_teaching"]):
+        worksheet_porto.merge_range(f"E{11+i}:{end_col_letter}{11+i}", dosen, "text_cpl_format")
+
+    row_start = 14
+    col_start = 4  # Kolom E = index 4 kalau 0-based
+
+    # B15:D18
+    worksheet_porto.merge_range("B15:D15", "Threshold (%)", "title_porto_format")
+    worksheet_porto.merge_range("B16:D16", "Rerata CPL", "title_porto_format")
+    worksheet_porto.merge_range("B17:D17", "CPL-PRODI yang dibebankan pada MK", "title_porto_format")
+    worksheet_porto.merge_range("B18:D18", "Ketercapaian Tiap CPL (%)", "title_porto_format")
+
+    # B19:D19
+    worksheet_porto.merge_range("B19:B23", "NO", "text_porto_format")
+    worksheet_porto.merge_range("C19:C23", "NIM", "text_porto_format")
+    worksheet_porto.merge_range("D19:D23", "NAMA MAHASISWA", "text_porto_format")
+
+    worksheet_porto.merge_range(f"{end_col_min_letter}15:{end_col_min_letter}18", "", "title_porto_format")
+    worksheet_porto.merge_range(f"{end_col_letter}15:{end_col_letter}18", "", "title_porto_format")
+
+    worksheet_porto.merge_range(f"{end_col_min_letter}19:{end_col_min_letter}23", "NILAI AKHIR", "text_porto_format")
+    worksheet_porto.merge_range(f"{end_col_letter}19:{end_col_letter}23", "HURUF", "text_porto_format")
+
+    row_threshold = row_start + 1  # 15
+    row_rerata = row_start + 2     # 16
+    row_ketercap = row_start + 4   # 18
+
+    current_col = col_start
+    for cpl, count in cpl_counts.items():
+        span = count * 3 + 1
+        start_col = xl_col_to_name(current_col)
+        end_col = xl_col_to_name(current_col + span - 1)
+
+        # Row 15: Threshold diganti total_per_cpl
+        nilai_threshold = total_per_cpl[cpl_cpmk_sub["cpl_kode"].index(cpl)]
+        worksheet_porto.merge_range(f"{start_col}{row_threshold}:{end_col}{row_threshold}", nilai_threshold, "title_threshold_format")
+
+        # Row 16: Rerata
+        worksheet_porto.merge_range(f"{start_col}{row_rerata}:{end_col}{row_rerata}", "[rata-rata NILAI PER CPL]", "title_porto_format")
+
+        # Row 18: Ketercapaian
+        end_col_ketercap = xl_col_to_name(current_col + span - 2)
+        worksheet_porto.merge_range(f"{start_col}{row_ketercap}:{end_col_ketercap}{row_ketercap}", "[=Rerata CPL/Treshold/100]", "title_porto_format")
+        worksheet_porto.write(f"{end_col}{row_ketercap}", "", "title_porto_format")
+        current_col += span
+
+    current_col_2 = col_start
+    for item in final_data:
+        cpl = item["cpl"]
+        cpmk = item["cpmk"]
+        subcpmk = item["subcpmk"]
+        kriteria = item["kriteria_kode"]
+        bobot = item["bobot"]
+
+        # --- Row 17: CPL ---
+        if cpl and "NILAI PER CPL" not in kriteria:
+            worksheet_porto.merge_range(row_start+2, current_col_2, row_start+2, current_col_2+2, cpl, "title_porto_format")
+            span = 3
+        else:
+            worksheet_porto.write(row_start+2, current_col_2, cpl or "", "title_porto_format")
+            span = 1
+
+        # --- Row 19: CPMK ---
+        if cpmk and "NILAI PER CPL" not in kriteria:
+            worksheet_porto.merge_range(row_start+4, current_col_2, row_start+4, current_col_2+span-1, cpmk, "text_porto_format")
+        else:
+            worksheet_porto.write(row_start+4, current_col_2, cpmk or "", "text_porto_format")
+
+        # --- Row 20: SubCPMK ---
+        if subcpmk and "NILAI PER CPL" not in kriteria:
+            worksheet_porto.merge_range(row_start+5, current_col_2, row_start+5, current_col_2+span-1, subcpmk, "text_porto_format")
+        else:
+            worksheet_porto.write(row_start+5, current_col_2, subcpmk or "", "text_porto_format")
+
+        # --- Row 21: Kriteria kode ---
+        if kriteria != "NILAI PER CPL" and span == 3:
+            worksheet_porto.merge_range(row_start+6, current_col_2, row_start+6, current_col_2+span-1, kriteria, "text_porto_format")
+        else:
+            worksheet_porto.write(row_start+6, current_col_2, kriteria, "text_porto_format")
+
+        # --- Row 22 & 23: NILAI, Tambahan, SUB BOBOT ---
+        if span == 3:
+            # Merge NILAI dan Tambahan ke bawah
+            worksheet_porto.merge_range(row_start+7, current_col_2, row_start+8, current_col_2, "NILAI", "text_porto_format")
+            worksheet_porto.merge_range(row_start+7, current_col_2+1, row_start+8, current_col_2+1, "Tambahan", "text_porto_format")
+            # SUB BOBOT di row 22, bobot di row 23
+            worksheet_porto.write(row_start+7, current_col_2+2, "SUB BOBOT", "text_porto_format")
+            worksheet_porto.write(row_start+8, current_col_2+2, bobot, "text_porto_format")
+        else:
+            worksheet_porto.write(row_start+7, current_col_2, "", "text_porto_format")
+            worksheet_porto.write(row_start+8, current_col_2, bobot if bobot else "", "text_porto_format")
+
+        # Geser ke kolom berikutnya
+        current_col_2 += span
+    return worksheet_porto
+
+
+RPS_MATKUL_KEYS = [
+    "team_teaching", "bobot_per_cpmk", "materi_non_uts_uas", "materi_non_uts_uas_numbered",
+    "pustaka_utama", "pustaka_pendukung", "matkul_syarat", "minggu_ke", "subcpmk_weekly",
+    "indikator_numbered", "bobot", "kriteria", "kriteria_numbered", "materi_weekly_numbered",
+    "pustaka_weekly", "subcpmk_bobot", "cpl_bobot", "total_bobot",
+]
+
+
+def _pick(data, keys):
+    return {key: data[key] for key in keys}
+
+
+def sheet_jobs(ctx):
+    """Daftar sheet sesuai urutan di workbook: (keluarga dokumen, nama, input yang dipakai, planner).
+
+    Input di sini adalah semua data yang dibaca planner sheet tersebut dan
+    menjadi dasar key cache, jadi harus ikut diubah kalau planner berubah.
+    """
+    matkul_data = ctx["matkul_data"]
+    cpl_cpmk_sub = ctx["cpl_cpmk_sub"]
+    families = ctx["families"]
+    common = (ctx["matkul"], ctx["tahun"], ctx["rps_data"], matkul_data["team_teaching"])
+
+    jobs = []
+    if "RPS" in families:
+        jobs.append((
+            "RPS",
+            "RPS",
+            (common, ctx["today"], cpl_cpmk_sub, _pick(matkul_data, RPS_MATKUL_KEYS)),
+            lambda: plan_rps_sheet(ctx, plan_rps_layout(ctx)),
+        ))
+    for rpm in ctx["rpm_sheets"]:
+        jobs.append((
+            "RPM",
+            rpm["sheet_name"],
+            (common, rpm, matkul_data["pustaka_utama"], matkul_data["pustaka_pendukung"]),
+            lambda rpm=rpm: plan_rpm_sheet(ctx, rpm),
+        ))
+    for rub in ctx["rub_sheets"]:
+        jobs.append((
+            "RUB",
+            f"RUB {rub['kode']}",
+            (common, rub, cpl_cpmk_sub["subcpmk_desc"]),
+            lambda rub=rub: plan_rub_sheet(ctx, rub),
+        ))
+    if "KTR" in families:
+        jobs.append((
+            "KTR",
+            "KTR",
+            (
+                common, ctx["today"].date(), ctx["description_matkul"],
+                cpl_cpmk_sub["cpl_desc"], cpl_cpmk_sub["subcpmk_desc"],
+                _pick(matkul_data, [
+                    "materi_non_uts_uas_numbered", "pustaka_utama", "pustaka_pendukung",
+                    "nik", "kelas", "jml_mhs", "hari", "tempat",
+                ]),
+            ),
+            lambda: plan_ktr_sheet(ctx),
+        ))
+    if "PORTO" in families:
+        jobs.append((
+            "PORTO",
+            "LEMBAR KERJA - PORTO",
+            (
+                common, ctx["porto"], ctx["total_per_cpl"], cpl_cpmk_sub["cpl_kode"],
+                len(matkul_data["subcpmk_weekly"]), matkul_data["kelas"], matkul_data["tahun_ajar"],
+            ),
+            lambda: plan_porto_sheet(ctx),
+        ))
+    return jobs
+
+
+def plan_workbook(ctx):
+    """Yield SheetPlan satu per satu sesuai urutan sheet di workbook"""
+    for _, _, _, planner in sheet_jobs(ctx):
+        yield planner()
+
+
+def render_workbook(output, ctx, cache=None, cache_tag=None):
+    """Render seluruh workbook ke output (path atau file object) mode constant_memory.
+
+    Kalau ``cache`` (SheetPartCache) diberikan, sheet yang inputnya sudah
+    pernah dirender diambil dari cache dan hanya sheet baru yang dirender;
+    ``cache_tag`` ikut disimpan di entri baru (lihat ``SheetPartCache.invalidate``).
+    Durasi dicatat per keluarga dokumen (``render.RPS``, ...) dan ``close``.
+    """
+    jobs = sheet_jobs(ctx)
+    if not jobs:
+        raise ValueError("Tidak ada sheet yang bisa dibuat untuk dokumen yang dipilih")
+
+    workbook = xlsxwriter.Workbook(output, {"constant_memory": True})
+    if ctx.get("created") is not None:
+        workbook.set_properties({"created": ctx["created"]})
+    formats = add_formats(workbook)
+
+    for index, (family, name, inputs, planner) in enumerate(jobs):
+        with stage(f"render.{family}"):
+            count_event("sheets")
+            # Sheet pertama ditandai tabSelected di XML-nya, jadi ikut di key
+            key = fingerprint(index == 0, inputs) if cache is not None else None
+            entry = cache.get(key) if cache is not None else None
+            if cache is not None:
+                count_event("sheet_cache_hits" if entry is not None else "sheet_cache_misses")
+            if entry is not None:
+                worksheet = workbook.add_worksheet(name, worksheet_class=PartWorksheet)
+                # Lebar kolom/tinggi baris tetap diset untuk posisi gambar logo
+                _apply_sheet_setup(worksheet, entry["columns"], entry["rows"], entry["images"])
+                worksheet.part_xml = entry["xml"]
+                continue
+
+            # Plan dibuat per sheet lalu langsung dibuang setelah dirender,
+            # jadi yang hidup di memori hanya satu sheet pada satu waktu
+            plan = planner()
+            worksheet = render_sheet(workbook, plan, formats)
+            if cache is not None:
+                setup = {"columns": plan.columns, "rows": plan.rows, "images": plan.images, "tag": cache_tag}
+                worksheet.on_assembled = (
+                    lambda xml, key=key, setup=setup: cache.put(key, dict(setup, xml=xml))
+                )
+            # Sel plan sudah ada di file baris worksheet; jangan ikut hidup sampai close()
+            plan = None
+
+    # XML tiap sheet dirakit dan di-zip di sini
+    with stage("close"):
+        workbook.close()
+
+
+# Cache milik proses worker render_zip, diisi oleh init_render_worker
+_worker_cache = None
+
+
+def init_render_worker(cache_max_bytes=0):
+    """Initializer ProcessPoolExecutor: tiap proses worker punya SheetPartCache sendiri"""
+    global _worker_cache
+    _worker_cache = SheetPartCache(cache_max_bytes) if cache_max_bytes else None
+
+
+def render_document(family, matkul, tahun, rps_data, cpl_cpmk_sub, matkul_data, today=None,
+                    deterministic=False, cache=None, cache_tag=None):
+    """Render satu keluarga dokumen ke workbook tersendiri dan kembalikan bytes-nya.
+
+    Return None kalau dokumen tersebut tidak punya sheet (mis. tidak ada tag rubrik).
+    """
+    with stage("context"):
+        ctx = build_rps_context(
+            matkul, tahun, rps_data, cpl_cpmk_sub, matkul_data, today=today, families=[family],
+            deterministic=deterministic,
+        )
+    if not sheet_jobs(ctx):
+        return None
+    output = BytesIO()
+    render_workbook(output, ctx, cache=cache, cache_tag=cache_tag)
+    return output.getvalue()
+
+
+def _render_document_in_worker(*args, cache_tag=None, memory_budget=None):
+    # Durasi tahap diukur di proses worker lalu dikirim balik bersama hasilnya.
+    # Batas memori request ikut dicek di sini, karena alokasi render ZIP
+    # terjadi di proses worker, bukan di proses web
+    if memory_budget and not tracemalloc.is_tracing():
+        tracemalloc.start()
+    timings, token = begin_stages(memory_budget)
+    try:
+        data = render_document(*args, cache=_worker_cache, cache_tag=cache_tag)
+    finally:
+        end_stages(token)
+    return data, timings.export()
+
+
+def render_zip(output, families, matkul, tahun, rps_data, cpl_cpmk_sub, matkul_data,
+               today=None, deterministic=False, executor=None, cache=None, cache_tag=None):
+    """Render tiap keluarga dokumen ke workbook sendiri lalu kemas jadi satu ZIP.
+
+    Kalau ``executor`` (ProcessPoolExecutor) diberikan, workbook dirender
+    paralel di proses worker; urutan file di ZIP tetap mengikuti DOCUMENT_FAMILIES.
+    Durasi tahap dari worker dijumlahkan, jadi totalnya bisa melebihi waktu nyata.
+    Batas memori request (``MEMORY_BUDGET_BYTES``) berlaku per dokumen di tiap worker.
+    Nama file mengikuti kode dokumen, mis. ``FTP-TKOM-RPM-{kode}-{tahun}.xlsx``.
+    """
+    families = [f for f in DOCUMENT_FAMILIES if f in families]
+    # Tanggal dikunci di sini supaya semua dokumen memakai tanggal yang sama
+    today = today or datetime.now()
+    args = (matkul, tahun, rps_data, cpl_cpmk_sub, matkul_data, today, deterministic)
+    # Timestamp entri ZIP = tanggal dokumen, bukan waktu render
+    date_time = today.timetuple()[:3] + (0, 0, 0)
+
+    if executor is not None:
+        memory_budget = current_memory_budget()
+        futures = [
+            executor.submit(
+                _render_document_in_worker, family, *args, cache_tag=cache_tag, memory_budget=memory_budget,
+            )
+            for family in families
+        ]
+
+        def collect():
+            for future in futures:
+                data, exported = future.result()
+                record_stages(exported)
+                yield data
+        results = collect()
+    else:
+        futures = []
+        results = (render_document(family, *args, cache=cache, cache_tag=cache_tag) for family in families)
+
+    written = 0
+    try:
+        # File xlsx sudah terkompresi, jadi disimpan tanpa kompresi ulang
+        with zipfile.ZipFile(output, "w", zipfile.ZIP_STORED) as archive:
+            for family, data in zip(families, results):
+                if data is None:
+                    continue
+                name = document_code(family, rps_data["kode_matkul"], tahun)
+                archive.writestr(zipfile.ZipInfo(f"{name}.xlsx", date_time), data)
+                written += 1
+    finally:
+        for future in futures:
+            future.cancel()
+
+    if not written:
+        raise ValueError("Tidak ada sheet yang bisa dibuat untuk dokumen yang dipilih")
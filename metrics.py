@@ -0,0 +1,327 @@
+"""
+Metrik aplikasi dalam format teks Prometheus dan pencatat durasi per tahap.
+
+``Registry`` menyimpan counter dan histogram milik satu proses; gauge yang
+nilainya dibaca saat scrape (ukuran cache, hit ratio, ...) didaftarkan lewat
+``Registry.collector``. Dengan server pre-fork, tiap worker punya registry
+sendiri sehingga Prometheus perlu men-scrape per worker atau menjumlahkan.
+
+``stage(name)`` mengukur satu tahap (baca kurikulum, parse upload, render per
+keluarga dokumen, ``workbook.close``) dan mencatatnya ke ``StageTimings`` milik
+request yang sedang berjalan. Di luar request (benchmark, skrip) tidak ada
+yang dicatat, jadi modul layout tetap bisa dipakai tanpa Flask.
+
+Kalau ``tracemalloc`` aktif, tiap tahap juga mencatat puncak alokasi Python
+di atas pemakaian saat tahap dimulai, dan ``check_memory_budget`` menghentikan
+request yang alokasinya melewati batas. tracemalloc bersifat global per
+proses, jadi angkanya hanya tepat kalau satu proses melayani satu request
+pada satu waktu (worker sync); dengan server threaded, alokasi request lain
+yang berjalan bersamaan ikut terhitung.
+"""
+import contextvars
+import math
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Detik; request download normal puluhan sampai ratusan milidetik
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, math.inf)
+
+# Byte; file xlsx/zip hasil generate
+SIZE_BUCKETS = (16 * 1024, 64 * 1024, 256 * 1024, 1024 ** 2, 4 * 1024 ** 2, 16 * 1024 ** 2, math.inf)
+
+# Byte; puncak alokasi per tahap
+MEMORY_BUCKETS = tuple(mib * 1024 ** 2 for mib in (1, 4, 16, 64, 256, 1024)) + (math.inf,)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(labels):
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in labels) + "}"
+
+
+def _format_value(value):
+    if value == math.inf:
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class Counter:
+    """Counter monotonik dengan label"""
+
+    type = "counter"
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+        if not self.labelnames and self.type in ("counter", "gauge"):
+            # Metrik tanpa label langsung muncul dengan nilai 0
+            self._values[()] = 0
+
+    def _key(self, labels):
+        return tuple((name, str(labels[name])) for name in self.labelnames)
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def samples(self):
+        with self._lock:
+            return [(self.name, key, value) for key, value in sorted(self._values.items())]
+
+
+class Gauge(Counter):
+    """Nilai yang bisa naik turun (mis. jumlah request yang sedang berjalan)"""
+
+    type = "gauge"
+
+    def dec(self, amount=1, **labels):
+        self.inc(-amount, **labels)
+
+    def value(self, **labels):
+        with self._lock:
+            return self._values.get(self._key(labels), 0)
+
+
+class Histogram(Counter):
+    """Histogram kumulatif (``_bucket``, ``_sum``, ``_count``) dengan label"""
+
+    type = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [[0] * len(self.buckets), 0.0, 0]
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state[0][index] += 1
+                    break
+            state[1] += value
+            state[2] += 1
+
+    def samples(self):
+        result = []
+        with self._lock:
+            for key, (counts, total, count) in sorted(self._values.items()):
+                cumulative = 0
+                for bound, bucket_count in zip(self.buckets, counts):
+                    cumulative += bucket_count
+                    result.append((f"{self.name}_bucket", key + (("le", _format_value(bound)),), cumulative))
+                result.append((f"{self.name}_sum", key, total))
+                result.append((f"{self.name}_count", key, count))
+        return result
+
+
+class Registry:
+    """Kumpulan metrik satu proses, dirender ke format teks Prometheus"""
+
+    def __init__(self):
+        self._metrics = {}
+        self._collectors = []
+
+    def counter(self, name, documentation, labelnames=()):
+        self._metrics[name] = Counter(name, documentation, labelnames)
+        return self._metrics[name]
+
+    def gauge(self, name, documentation, labelnames=()):
+        self._metrics[name] = Gauge(name, documentation, labelnames)
+        return self._metrics[name]
+
+    def histogram(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+        self._metrics[name] = Histogram(name, documentation, labelnames, buckets)
+        return self._metrics[name]
+
+    def collector(self, func):
+        """Daftarkan fungsi yang saat scrape mengembalikan
+        ``[(name, type, documentation, [(labels_dict, value), ...]), ...]``"""
+        self._collectors.append(func)
+        return func
+
+    def __getitem__(self, name):
+        return self._metrics[name]
+
+    def render(self):
+        lines = []
+        for metric in self._metrics.values():
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.type}")
+            for name, labels, value in metric.samples():
+                lines.append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+        for func in self._collectors:
+            for name, metric_type, documentation, samples in func():
+                lines.append(f"# HELP {name} {documentation}")
+                lines.append(f"# TYPE {name} {metric_type}")
+                for labels, value in samples:
+                    lines.append(f"{name}{_format_labels(sorted(labels.items()))} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+
+class MemoryBudgetExceeded(Exception):
+    """Alokasi satu request melewati batas memori yang dikonfigurasi"""
+
+    def __init__(self, used, budget):
+        super().__init__(
+            f"Pemakaian memori {used / 1024 ** 2:.1f} MiB melewati batas "
+            f"{budget / 1024 ** 2:.1f} MiB per request"
+        )
+        self.used = used
+        self.budget = budget
+
+    def __reduce__(self):
+        # Bisa dikirim balik dari proses worker render
+        return type(self), (self.used, self.budget)
+
+
+class StageTimings:
+    """Durasi per tahap (detik) satu request; tahap bernama sama dijumlahkan.
+
+    ``peaks`` berisi puncak alokasi per tahap (byte, maksimum antar kemunculan)
+    kalau tracemalloc aktif; ``memory_budget`` membatasi total alokasi request
+    terhadap pemakaian saat request dimulai. ``counts`` mencatat kejadian per
+    request (jumlah sheet, hit/miss cache, ...) lewat ``count_event``.
+    """
+
+    def __init__(self, memory_budget=None):
+        self._durations = {}
+        self.peaks = {}
+        self.counts = {}
+        self.memory_budget = memory_budget
+        self._memory_base = 0
+        if tracemalloc.is_tracing():
+            # Puncak lama (request sebelumnya) tidak boleh ikut terhitung
+            tracemalloc.reset_peak()
+            self._memory_base = tracemalloc.get_traced_memory()[0]
+        # [pemakaian saat tahap mulai, puncak sejauh ini] untuk tahap bersarang
+        self._memory_stack = []
+
+    def add(self, name, seconds):
+        self._durations[name] = self._durations.get(name, 0.0) + seconds
+
+    def count(self, name, amount=1):
+        self.counts[name] = self.counts.get(name, 0) + amount
+
+    def update(self, exported):
+        """Gabungkan hasil ``export()`` dari StageTimings lain"""
+        for name, seconds in exported["durations"].items():
+            self.add(name, seconds)
+        for name, peak in exported["peaks"].items():
+            self.peaks[name] = max(self.peaks.get(name, 0), peak)
+        for name, amount in exported["counts"].items():
+            self.count(name, amount)
+
+    def items(self):
+        return list(self._durations.items())
+
+    def export(self):
+        """Salinan data yang bisa di-pickle (dikirim balik dari proses worker)"""
+        return {"durations": dict(self._durations), "peaks": dict(self.peaks), "counts": dict(self.counts)}
+
+    def _enter_memory(self):
+        current, peak = tracemalloc.get_traced_memory()
+        if self._memory_stack:
+            # reset_peak di bawah menghapus puncak milik tahap luar, jadi disimpan dulu
+            self._memory_stack[-1][1] = max(self._memory_stack[-1][1], peak)
+        tracemalloc.reset_peak()
+        self._memory_stack.append([current, current])
+
+    def _exit_memory(self, name):
+        start, running = self._memory_stack.pop()
+        peak = max(running, tracemalloc.get_traced_memory()[1])
+        self.peaks[name] = max(self.peaks.get(name, 0), peak - start)
+        if self._memory_stack:
+            self._memory_stack[-1][1] = max(self._memory_stack[-1][1], peak)
+
+    def check_budget(self):
+        if self.memory_budget and tracemalloc.is_tracing():
+            used = tracemalloc.get_traced_memory()[1] - self._memory_base
+            if used > self.memory_budget:
+                raise MemoryBudgetExceeded(used, self.memory_budget)
+
+
+_current_timings = contextvars.ContextVar("stage_timings", default=None)
+
+
+def begin_stages(memory_budget=None):
+    """Mulai pencatatan tahap di konteks ini; return (StageTimings, token)"""
+    timings = StageTimings(memory_budget)
+    return timings, _current_timings.set(timings)
+
+
+def end_stages(token):
+    _current_timings.reset(token)
+
+
+@contextmanager
+def stage(name):
+    """Ukur blok ini sebagai tahap ``name`` kalau pencatatan sedang aktif"""
+    timings = _current_timings.get()
+    if timings is None:
+        yield
+        return
+    tracing = tracemalloc.is_tracing()
+    if tracing:
+        timings.check_budget()
+        timings._enter_memory()
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings.add(name, time.perf_counter() - start)
+        if tracing:
+            timings._exit_memory(name)
+    if tracing:
+        timings.check_budget()
+
+
+def check_memory_budget():
+    """Checkpoint di dalam loop panjang; raise MemoryBudgetExceeded kalau lewat batas"""
+    timings = _current_timings.get()
+    if timings is not None:
+        timings.check_budget()
+
+
+def current_memory_budget():
+    """Batas memori request yang sedang berjalan (None kalau tidak ada)"""
+    timings = _current_timings.get()
+    return timings.memory_budget if timings is not None else None
+
+
+def count_event(name, amount=1):
+    """Hitung kejadian ``name`` di request yang sedang berjalan"""
+    timings = _current_timings.get()
+    if timings is not None:
+        timings.count(name, amount)
+
+
+def record_stages(exported):
+    """Gabungkan tahap yang diukur di tempat lain (mis. proses worker render)"""
+    timings = _current_timings.get()
+    if timings is not None:
+        timings.update(exported)
+
+
+def server_timing(timings, total=None):
+    """Nilai header ``Server-Timing`` (milidetik) dari StageTimings"""
+    entries = [f"{name};dur={seconds * 1000:.1f}" for name, seconds in timings.items()]
+    if total is not None:
+        entries.append(f"total;dur={total * 1000:.1f}")
+    return ", ".join(entries)
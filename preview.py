@@ -0,0 +1,114 @@
+"""
+Preview HTML RPS tanpa membangun workbook.
+
+``build_preview`` memakai data turunan yang sama dengan renderer xlsx
+(``build_rps_context``): baris pertemuan mingguan, korelasi CPL terhadap
+Sub-CPMK beserta ``total_per_cpl``, ``bobot_per_cpmk``, blue print
+penilaian, daftar RPM, dan rubrik. Hasilnya dirender template
+``preview.html``; xlsxwriter tidak disentuh sama sekali.
+
+``PreviewCache`` menyimpan HTML hasil render per sidik jari input (hash file
+upload + baris kurikulum mata kuliah), jadi preview berulang untuk file yang
+sama tidak perlu mem-parse upload lagi.
+"""
+import threading
+from collections import OrderedDict
+
+from layout import build_rps_context
+
+# Keluarga dokumen yang data turunannya ditampilkan di preview
+PREVIEW_FAMILIES = ["RPS", "RPM", "RUB"]
+
+
+def build_preview(matkul, tahun, rps_data, cpl_cpmk_sub, matkul_data):
+    """Model data untuk template preview.html"""
+    ctx = build_rps_context(matkul, tahun, rps_data, cpl_cpmk_sub, matkul_data, families=PREVIEW_FAMILIES)
+    cpl_cpmk_sub = ctx["cpl_cpmk_sub"]
+
+    weeks = []
+    for i, minggu in enumerate(matkul_data["minggu_ke"]):
+        weeks.append({
+            "minggu": minggu,
+            "subcpmk": matkul_data["subcpmk_weekly"][i],
+            "subcpmk_desc": ctx["weekly_subcpmk_desc"][i],
+            "indikator": matkul_data["indikator_numbered"][i],
+            "kriteria": matkul_data["kriteria_numbered"][i],
+            "materi": matkul_data["materi"][i],
+            "bobot": matkul_data["bobot"][i],
+        })
+
+    # Matriks Sub-CPMK x CPL, sel = bobot (fraction) seperti di sheet RPS
+    n_cpl = len(cpl_cpmk_sub["cpl_kode"])
+    korelasi = [[None] * n_cpl for _ in cpl_cpmk_sub["subcpmk_kode"]]
+    for index, col, bobot in ctx["korelasi"]:
+        korelasi[index][col - ctx["start_cpl_col"]] = bobot
+
+    # Dipasangkan per posisi, sama seperti kolom Bobot (%) di tabel CPMK RPS
+    bobot_per_cpmk = matkul_data["bobot_per_cpmk"]
+    cpmk = [
+        (kode, desc, bobot_per_cpmk[i] if i < len(bobot_per_cpmk) else None)
+        for i, (kode, desc) in enumerate(zip(cpl_cpmk_sub["cpmk_kode"], cpl_cpmk_sub["cpmk_desc"]))
+    ]
+
+    return {
+        "matkul": matkul,
+        "tahun": tahun,
+        "rps_data": rps_data,
+        "cpl": list(zip(cpl_cpmk_sub["cpl_kode"], cpl_cpmk_sub["cpl_desc"])),
+        "cpmk": cpmk,
+        "subcpmk": list(zip(cpl_cpmk_sub["subcpmk_kode"], cpl_cpmk_sub["subcpmk_desc"])),
+        "weeks": weeks,
+        "total_bobot": sum(_number(week["bobot"]) for week in weeks),
+        "korelasi": list(zip(cpl_cpmk_sub["subcpmk_kode"], korelasi)),
+        "total_per_cpl": ctx["total_per_cpl"],
+        "blueprint": list(zip(
+            cpl_cpmk_sub["subcpmk_kode"], ctx["kriteria_per_subcpmk"], ctx["rubrik_per_subcpmk"],
+        )),
+        "rpm_sheets": ctx["rpm_sheets"],
+        "rub_sheets": ctx["rub_sheets"],
+    }
+
+
+def _number(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return 0.0
+
+
+class PreviewCache:
+    """LRU HTML preview (bytes), dibatasi total ukuran"""
+
+    def __init__(self, max_bytes=8 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            html = self._entries.get(key)
+            if html is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return html
+
+    def put(self, key, html):
+        if len(html) > self.max_bytes:
+            return
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self.size -= len(old)
+            self._entries[key] = html
+            self.size += len(html)
+            while self.size > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self.size -= len(evicted)
+
+    def __len__(self):
+        return len(self._entries)
@@ -0,0 +1,123 @@
+"""
+Profil per request dengan cProfile, disimpan sebagai artefak di disk.
+
+Tiap profil menghasilkan tiga file dengan id yang sama:
+
+- ``{id}.pstats``    : dump ``pstats`` (``python -m pstats``, snakeviz, ...)
+- ``{id}.collapsed`` : stack "a;b;c <mikrodetik>" per baris, siap untuk
+  ``flamegraph.pl`` atau speedscope
+- ``{id}.json``      : metadata (mata kuliah, tahun, durasi, status, ...)
+
+cProfile hanya merekam pasangan pemanggil -> fungsi, bukan stack penuh, jadi
+stack di file collapsed direkonstruksi dari graf panggilan dengan membagi
+waktu tiap fungsi secara proporsional ke pemanggilnya.
+"""
+import json
+import os
+import pstats
+import threading
+from datetime import datetime
+
+ARTIFACT_KINDS = ("pstats", "collapsed")
+
+# Rantai panggilan lebih dalam dari ini dipotong di file collapsed
+MAX_STACK_DEPTH = 64
+
+
+def _label(func):
+    filename, lineno, name = func
+    if filename == "~":
+        # Fungsi builtin, mis. "<method 'append' of 'list' objects>"
+        return name
+    return f"{os.path.basename(filename)}:{lineno}({name})"
+
+
+def collapsed_stacks(stats):
+    """Yield baris "frame;frame;... mikrodetik" dari ``pstats.Stats``"""
+    callees = {}
+    for func, (_, _, _, _, callers) in stats.stats.items():
+        for caller, edge in callers.items():
+            callees.setdefault(caller, []).append((func, edge[3]))
+    totals = {}
+
+    def walk(func, share, stack):
+        # Cabang di bawah 1 mikrodetik tidak terlihat di flamegraph; dipotong
+        # supaya jumlah jalur di graf panggilan yang lebar tetap terbatas
+        if share < 1e-6:
+            return
+        _, _, own, cumulative, _ = stats.stats[func]
+        ratio = share / cumulative if cumulative else 0
+        stack = stack + [_label(func)]
+        if own * ratio > 0:
+            totals[";".join(stack)] = totals.get(";".join(stack), 0) + own * ratio
+        if len(stack) >= MAX_STACK_DEPTH:
+            return
+        for callee, edge_cumulative in callees.get(func, ()):
+            # Rekursi tidak diikuti lagi supaya graf bersiklus tetap berhenti
+            if _label(callee) not in stack:
+                walk(callee, edge_cumulative * ratio, stack)
+
+    for func, (_, _, _, cumulative, callers) in stats.stats.items():
+        if not callers:
+            walk(func, cumulative, [])
+
+    for stack, seconds in totals.items():
+        micros = round(seconds * 1_000_000)
+        if micros:
+            yield f"{stack} {micros}"
+
+
+class ProfileStore:
+    """Folder artefak profil, hanya menyimpan ``keep`` profil terbaru"""
+
+    def __init__(self, folder, keep=50):
+        self.folder = folder
+        self.keep = keep
+        self._lock = threading.Lock()
+
+    def path(self, profile_id, kind):
+        return os.path.join(self.folder, f"{profile_id}.{kind}")
+
+    def save(self, profiler, request_id, meta):
+        """Tulis artefak dari ``cProfile.Profile`` yang sudah selesai; return id profil"""
+        created = datetime.now()
+        profile_id = f"{created:%Y%m%d-%H%M%S%f}-{request_id[:16]}"
+        os.makedirs(self.folder, exist_ok=True)
+
+        stats = pstats.Stats(profiler)
+        stats.dump_stats(self.path(profile_id, "pstats"))
+        with open(self.path(profile_id, "collapsed"), "w", encoding="utf-8") as fh:
+            for line in collapsed_stacks(stats):
+                fh.write(line + "\n")
+
+        meta = dict(meta, id=profile_id, request_id=request_id,
+                    created=created.isoformat(timespec="seconds"), total_calls=stats.total_calls)
+        with open(self.path(profile_id, "json"), "w", encoding="utf-8") as fh:
+            json.dump(meta, fh, ensure_ascii=False)
+        self._prune()
+        return profile_id
+
+    def list(self):
+        """Metadata semua profil, terbaru dulu"""
+        profiles = []
+        if not os.path.isdir(self.folder):
+            return profiles
+        for filename in sorted(os.listdir(self.folder), reverse=True):
+            if not filename.endswith(".json"):
+                continue
+            try:
+                with open(os.path.join(self.folder, filename), encoding="utf-8") as fh:
+                    profiles.append(json.load(fh))
+            except (OSError, ValueError):
+                continue
+        return profiles
+
+    def _prune(self):
+        with self._lock:
+            ids = sorted(f[:-5] for f in os.listdir(self.folder) if f.endswith(".json"))
+            for profile_id in ids[:-self.keep] if self.keep else ():
+                for kind in ARTIFACT_KINDS + ("json",):
+                    try:
+                        os.remove(self.path(profile_id, kind))
+                    except FileNotFoundError:
+                        pass
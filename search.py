@@ -0,0 +1,140 @@
+"""
+Indeks pencarian nama mata kuliah untuk type-ahead.
+
+Dibangun sekali per snapshot kurikulum:
+
+- trie prefix atas setiap kata nama mata kuliah; tiap simpul menyimpan id
+  mata kuliah yang punya kata berawalan itu, jadi lookup prefix hanya
+  sepanjang kata yang diketik
+- indeks trigram atas kosakata untuk kata yang salah ketik atau berbeda
+  sedikit ("sistim" -> "sistem"); kata yang cocok lewat prefix tidak perlu
+  dicari fuzzy
+
+Skor per mata kuliah = jumlah bobot kata query yang cocok (sama persis >
+prefix > fuzzy), ditambah bonus kalau seluruh nama diawali query dan proporsi
+kata nama yang tercakup query, sehingga "Sistem Digital" di atas
+"Sistem Digital I" untuk query "sistem digital".
+"""
+import re
+import unicodedata
+
+EXACT_WEIGHT = 3.0
+PREFIX_WEIGHT = 2.0
+FUZZY_WEIGHT = 1.0
+NAME_PREFIX_BONUS = 2.0
+EXACT_NAME_BONUS = 4.0
+
+# Kemiripan trigram (koefisien Dice) minimum untuk kecocokan fuzzy
+FUZZY_MIN_SIMILARITY = 0.5
+
+
+def normalize(text):
+    """Huruf kecil tanpa diakritik, spasi tunggal"""
+    text = unicodedata.normalize("NFKD", str(text))
+    text = "".join(ch for ch in text if not unicodedata.combining(ch))
+    return " ".join(tokenize(text))
+
+
+def tokenize(text):
+    return re.findall(r"\w+", str(text).lower())
+
+
+def _trigrams(token):
+    padded = f" {token} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class CourseIndex:
+    """Trie prefix + indeks trigram atas nama mata kuliah"""
+
+    def __init__(self, names):
+        self.names = []
+        self._normalized = []
+        self._token_counts = []
+        # Simpul trie: {"ids": set(id), "next": {huruf: simpul}}
+        self._trie = {"ids": set(), "next": {}}
+        self._token_ids = {}
+        self._trigram_tokens = {}
+        seen = set()
+        for name in names:
+            normalized = normalize(name)
+            if not normalized or normalized in seen:
+                continue
+            seen.add(normalized)
+            course_id = len(self.names)
+            self.names.append(name)
+            self._normalized.append(normalized)
+            tokens = normalized.split()
+            self._token_counts.append(len(tokens))
+            for token in tokens:
+                self._add_token(token, course_id)
+
+    def _add_token(self, token, course_id):
+        node = self._trie
+        for ch in token:
+            node = node["next"].setdefault(ch, {"ids": set(), "next": {}})
+            node["ids"].add(course_id)
+        if token not in self._token_ids:
+            for trigram in _trigrams(token):
+                self._trigram_tokens.setdefault(trigram, set()).add(token)
+        self._token_ids.setdefault(token, set()).add(course_id)
+
+    def _prefix_ids(self, prefix):
+        node = self._trie
+        for ch in prefix:
+            node = node["next"].get(ch)
+            if node is None:
+                return set()
+        return node["ids"]
+
+    def _fuzzy_tokens(self, token):
+        """Kata di kosakata yang mirip ``token``: [(kata, kemiripan)]"""
+        grams = _trigrams(token)
+        shared = {}
+        for trigram in grams:
+            for candidate in self._trigram_tokens.get(trigram, ()):
+                shared[candidate] = shared.get(candidate, 0) + 1
+        result = []
+        for candidate, count in shared.items():
+            similarity = 2 * count / (len(grams) + len(_trigrams(candidate)))
+            if similarity >= FUZZY_MIN_SIMILARITY:
+                result.append((candidate, similarity))
+        return result
+
+    def search(self, query, limit=10):
+        """Nama mata kuliah yang cocok dengan ``query``, skor tertinggi dulu"""
+        normalized = normalize(query)
+        tokens = normalized.split()
+        if not tokens:
+            return []
+        scores = {}
+        matched = {}
+        for token in tokens:
+            weights = {}
+            for course_id in self._token_ids.get(token, ()):
+                weights[course_id] = EXACT_WEIGHT
+            for course_id in self._prefix_ids(token):
+                weights.setdefault(course_id, PREFIX_WEIGHT)
+            if not weights:
+                for candidate, similarity in self._fuzzy_tokens(token):
+                    for course_id in self._token_ids[candidate]:
+                        weights[course_id] = max(weights.get(course_id, 0), FUZZY_WEIGHT * similarity)
+            for course_id, weight in weights.items():
+                scores[course_id] = scores.get(course_id, 0) + weight
+                matched[course_id] = matched.get(course_id, 0) + 1
+
+        ranked = []
+        for course_id, score in scores.items():
+            name = self._normalized[course_id]
+            if name == normalized:
+                score += EXACT_NAME_BONUS
+            elif name.startswith(normalized):
+                score += NAME_PREFIX_BONUS
+            # Nama yang katanya banyak tidak tercakup query turun sedikit
+            score += matched[course_id] / self._token_counts[course_id]
+            ranked.append((-score, len(name), name, course_id))
+        ranked.sort()
+        return [
+            {"nama": self.names[course_id], "score": round(-neg_score, 3)}
+            for neg_score, _, _, course_id in ranked[:limit]
+        ]
@@ -0,0 +1,411 @@
+"""
+Spesifikasi deklaratif untuk blok yang berulang di semua sheet: header institusi
+(logo, UNIVERSITAS / FAKULTAS / PROGRAM STUDI, blok "Kode Dokumen") dan blok info
+mata kuliah, plus tabel style.
+
+Spesifikasi dikompilasi sekali saat modul di-import: alamat A1 diubah ke
+koordinat (row, col) dan style dibuat jadi template Format. Saat render, planner
+cukup memutar ulang operasi hasil kompilasi dengan nilai per mata kuliah.
+"""
+import copy
+import os
+import re
+
+from xlsxwriter.format import Format
+from xlsxwriter.utility import xl_cell_to_rowcol
+
+LOGO_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "logo.png")
+LOGO_OPTIONS = {
+    "x_scale": 1.5,  # perkecil jika perlu
+    "y_scale": 1.5,
+    "x_offset": 10,  # sedikit geser biar rapi
+    "y_offset": 2,
+}
+
+FORMATS = {
+    # Format header dengan background hitam, font putih, center
+    "header_small": {
+        "align": "center",
+        "valign": "vcenter",
+        "font_name": "Tahoma",
+        "font_size": 12,
+        "border": 1,
+        "bold": True,
+        "font_color": "white",
+        "bg_color": "black",
+        "text_wrap": True
+    },
+    "header_big": {
+        "font_name": "Tahoma",
+        "font_size": 28,
+        "border": 1,
+        "bold": True,
+        "align": "center",
+        "font_color": "white",
+        "bg_color": "black",
+        "valign": "vcenter"
+    },
+    "header_medium": {
+        "font_name": "Tahoma",
+        "font_size": 18,
+        "border": 1,
+        "bold": True,
+        "align": "center",
+        "font_color": "white",
+        "bg_color": "black",
+        "valign": "vcenter"
+    },
+    # Format judul: bg abu + font hitam
+    "title_format": {
+        "font_name": "Tahoma",
+        "font_size": 12,
+        "border": 1,
+        "align": "center",
+        "valign": "vcenter",
+        "bold": True,
+        "font_color": "black",
+        "text_wrap": True,
+        "bg_color": "#C0C0C0"  # abu-abu
+    },
+    "title_format_green": {
+        "font_name": "Tahoma",
+        "font_size": 12,
+        "border": 1,
+        "align": "center",
+        "valign": "vcenter",
+        "bold": True,
+        "font_color": "black",
+        "text_wrap": True,
+        "bg_color": "green"
+    },
+    "title_cpl_format": {
+        "font_name": "Tahoma",
+        "font_size": 12,
+        "border": 1,
+        "align": "left",
+        "valign": "vcenter",
+        "bold": True,
+        "font_color": "black",
+        "bg_color": "#C0C0C0"  # abu-abu
+    },
+    "title_porto_format": {
+        "font_name": "Tahoma",
+        "font_size": 9,
+        "border": 1,
+        "align": "center",
+        "valign": "vcenter",
+        "bold": True,
+        "font_color": "black",
+        "text_wrap": True,
+        "bg_color": "yellow"
+    },
+    "title_threshold_format": {
+        "font_name": "Tahoma",
+        "font_size": 9,
+        "border": 1,
+        "align": "center",
+        "valign": "vcenter",
+        "bold": True,
+        "font_color": "black",
+        "text_wrap": True,
+        "bg_color": "yellow",
+        "num_format": "0%"
+    },
+    "text_porto_format": {
+        "font_name": "Tahoma",
+        "font_size": 8,
+        "border": 1,
+        "align": "center",
+        "valign": "vcenter",
+        "text_wrap": True,
+        "font_color": "black"
+    },
+    "title_korelasi_format": {
+        "font_name": "Tahoma",
+        "font_size": 12,
+        "border": 1,
+        "align": "center",
+        "valign": "vcenter",
+        "bold": True,
+        "font_color": "black",
+        "text_wrap": True
+    },
+    "title_kontrak_format": {
+        "font_name": "Tahoma",
+        "font_size": 12,
+        "border": 1,
+        "align": "left",
+        "valign": "vcenter",
+        "bold": True,
+        "font_color": "black",
+        "text_wrap": True
+    },
+    # Format text
+    "text_format": {
+        "font_name": "Tahoma",
+        "font_size": 12,
+        "border": 1,
+        "align": "center",
+        "valign": "vcenter",
+        "text_wrap": True,
+        "font_color": "black"
+    },
+    "text_ttd_format": {
+        "font_name": "Tahoma",
+        "font_size": 12,
+        "align": "center",
+        "valign": "vcenter",
+        "text_wrap": True,
+        "font_color": "black"
+    },
+    "text_cpl_format": {
+        "font_name": "Tahoma",
+        "font_size": 12,
+        "border": 1,
+        "align": "left",
+        "valign": "vcenter",
+        "font_color": "black",
+        "text_wrap": True
+    },
+    "text_otorisasi_format": {
+        "font_name": "Tahoma",
+        "font_size": 12,
+        "border": 1,
+        "align": "center",
+        "valign": "bottom",
+        "font_color": "black"
+    },
+    "date_format": {
+        "font_name": "Tahoma",
+        "font_size": 12,
+        "align": "center",
+        "valign": "vcenter",
+        "border": 1,
+        "num_format": "dd-mm-yyyy"
+    },
+    "percent_format_bold": {
+        "font_name": "Tahoma",
+        "font_size": 12,
+        "border": 1,
+        "align": "center",
+        "valign": "vcenter",
+        "bold": True,
+        "font_color": "black",
+        "text_wrap": True,
+        "num_format": "0%"
+    },
+    "percent_format_bold_fill": {
+        "font_name": "Tahoma",
+        "font_size": 12,
+        "border": 1,
+        "align": "center",
+        "valign": "vcenter",
+        "bold": True,
+        "font_color": "black",
+        "text_wrap": True,
+        "num_format": "0%",
+        "bg_color": "#C0C0C0"
+    },
+    "percent_format": {
+        "font_name": "Tahoma",
+        "font_size": 12,
+        "border": 1,
+        "align": "center",
+        "valign": "vcenter",
+        "font_color": "black",
+        "text_wrap": True,
+        "num_format": "0%"
+    },
+}
+
+
+class Field:
+    """Nilai per mata kuliah di dalam spesifikasi, diisi saat ``apply_block``"""
+
+    __slots__ = ("name",)
+
+    def __init__(self, name):
+        self.name = name
+
+    def __repr__(self):
+        return f"Field({self.name!r})"
+
+
+_PLACEHOLDER = re.compile(r"\{\w+\}")
+
+
+def _compile_ref(ref):
+    # Alamat dengan placeholder (mis. "E6:{last_col}6") baru bisa diisi saat
+    # render, sisanya langsung diubah ke koordinat numerik
+    if _PLACEHOLDER.search(ref):
+        return None, ref
+    coords = []
+    for cell in ref.split(":"):
+        coords.extend(xl_cell_to_rowcol(cell))
+    return tuple(coords), None
+
+
+def compile_block(spec):
+    """Kompilasi daftar operasi spesifikasi ke tuple operasi siap pakai.
+
+    Operasi yang dikenal:
+    ``("row", nomor_baris, tinggi)``, ``("merge", "B2:B5", nilai, format)``,
+    ``("write", "F6", nilai, format)``, ``("image", "B2", file, opsi)``.
+    Nomor baris 1-based seperti di Excel; ``nilai`` boleh berupa ``Field``.
+    """
+    compiled = []
+    for op, *args in spec:
+        if op == "row":
+            row, height = args
+            compiled.append(("set_row", (row - 1, height), None, None, None))
+        elif op in ("merge", "write"):
+            ref, value, cell_format = args
+            coords, template = _compile_ref(ref)
+            method = "merge_range" if op == "merge" else "write"
+            compiled.append((method, coords, template, value, cell_format))
+        elif op == "image":
+            ref, filename, options = args
+            compiled.append(("insert_image", (ref,), None, filename, options))
+        else:
+            raise ValueError(f"Operasi spesifikasi tidak dikenal: {op}")
+    return tuple(compiled)
+
+
+def apply_block(plan, block, **values):
+    """Putar ulang blok hasil ``compile_block`` ke SheetPlan dengan nilai per mata kuliah.
+
+    ``values`` mengisi ``Field`` di nilai sel dan placeholder ``{nama}`` di alamat.
+    """
+    for method, coords, template, value, cell_format in block:
+        if method == "set_row":
+            plan.set_row(*coords)
+            continue
+        if method == "insert_image":
+            plan.insert_image(coords[0], value, cell_format)
+            continue
+        if isinstance(value, Field):
+            value = values[value.name]
+        if template is not None:
+            getattr(plan, method)(template.format(**values), value, cell_format)
+        else:
+            getattr(plan, method)(*coords, value, cell_format)
+
+
+HEADER_LINES = [
+    "UNIVERSITAS WARMADEWA",
+    "FAKULTAS TEKNIK DAN PERENCANAAN",
+    "PROGRAM STUDI TEKNIK KOMPUTER",
+]
+
+
+def header_spec(logo, title_cols, kode_cols, title=Field("judul"), title_format="header_big",
+                last_row_height=26):
+    """Spesifikasi header institusi: logo, tiga baris institusi, judul dokumen, kode dokumen.
+
+    ``logo``, ``title_cols`` dan ``kode_cols`` dalam notasi kolom "B:B", "C:J", "K:L".
+    """
+    logo_first, logo_last = logo.split(":")
+    title_first, title_last = title_cols.split(":")
+    kode_first, kode_last = kode_cols.split(":")
+
+    spec = [("row", 2, 22), ("row", 3, 22), ("row", 4, 22), ("row", 5, last_row_height)]
+    spec.append(("merge", f"{logo_first}2:{logo_last}5", "", "header_medium"))
+    spec.append(("image", "B2", LOGO_FILE, LOGO_OPTIONS))
+    for row, line in enumerate(HEADER_LINES, start=2):
+        spec.append(("merge", f"{title_first}{row}:{title_last}{row}", line, "header_medium"))
+    spec.append(("merge", f"{title_first}5:{title_last}5", title, title_format))
+    spec.append(("merge", f"{kode_first}2:{kode_last}3", "Kode Dokumen", "header_small"))
+    spec.append(("merge", f"{kode_first}4:{kode_last}5", Field("kode_dokumen"), "header_small"))
+    return spec
+
+
+HEADER_BLOCKS = {
+    "RPS": compile_block(header_spec("B:B", "C:J", "K:L", "RENCANA PEMBELAJARAN SEMESTER")),
+    "RPM": compile_block(header_spec("B:B", "C:H", "I:J", "RENCANA PENUGASAN MAHASISWA")),
+    # Judul RUB tergantung jenis rubrik, jadi tetap Field
+    "RUB": compile_block(header_spec("B:B", "C:G", "H:I", title_format="header_small", last_row_height=22)),
+    "KTR": compile_block(header_spec("B:B", "C:J", "K:L", "KONTRAK PERKULIAHAN")),
+    # Lebar PORTO tergantung jumlah minggu dan CPL, kolomnya diisi saat render
+    "PORTO": compile_block(header_spec(
+        "B:C", "D:{title_last_col}", "{kode_first_col}:{last_col}", "PORTOFOLIO PENILAIAN",
+        last_row_height=28,
+    )),
+}
+
+INFO_BLOCKS = {
+    "RPS": compile_block([
+        ("merge", "B6:C6", "MATA KULIAH (MK)", "title_format"),
+        ("merge", "D6:E6", "KODE", "title_format"),
+        ("write", "F6", "RUMPUN MK", "title_format"),
+        ("merge", "G6:I6", "BOBOT (SKS)", "title_format"),
+        ("write", "J6", "SEMESTER", "title_format"),
+        ("merge", "K6:L6", "Tgl. PENETAPAN", "title_format"),
+        ("merge", "B7:C9", Field("matkul"), "text_format"),
+        ("merge", "D7:E9", Field("kode_matkul"), "text_format"),
+        ("merge", "F7:F9", Field("rumpun"), "text_format"),
+        ("merge", "G7:I9", Field("sks"), "text_format"),
+        ("merge", "J7:J9", Field("semester"), "text_format"),
+        ("merge", "K7:L9", Field("tanggal"), "date_format"),
+    ]),
+    "RPM": compile_block([
+        ("merge", "B6:C6", "MATA KULIAH (MK)", "title_cpl_format"),
+        ("merge", "D6:J6", Field("matkul"), "text_cpl_format"),
+        ("merge", "B7:C7", "KODE", "title_cpl_format"),
+        ("merge", "D7:E7", Field("kode_matkul"), "text_cpl_format"),
+        ("write", "F7", "SKS", "title_cpl_format"),
+        ("write", "G7", Field("sks"), "text_cpl_format"),
+        ("write", "H7", "SEMESTER", "title_cpl_format"),
+        ("merge", "I7:J7", Field("semester"), "text_cpl_format"),
+    ]),
+    "RUB": compile_block([
+        ("merge", "B6:C6", "MATA KULIAH", "title_cpl_format"),
+        ("merge", "D6:I6", Field("matkul"), "text_cpl_format"),
+        ("merge", "B7:C7", "KODE", "title_cpl_format"),
+        ("merge", "D7:I7", Field("kode_matkul"), "text_cpl_format"),
+    ]),
+    "KTR": compile_block([
+        ("merge", "B6:D6", "MATA KULIAH (MK)", "title_format"),
+        ("merge", "E6:F6", "KODE", "title_format"),
+        ("merge", "G6:H6", "RUMPUN MK", "title_format"),
+        ("merge", "I6:J6", "BOBOT (SKS)", "title_format"),
+        ("merge", "K6:L6", "SEMESTER", "title_format"),
+        ("merge", "B7:D7", Field("matkul"), "text_format"),
+        ("merge", "E7:F7", Field("kode_matkul"), "text_format"),
+        ("merge", "G7:H7", Field("rumpun"), "text_format"),
+        ("merge", "I7:J7", Field("sks"), "text_format"),
+        ("merge", "K7:L7", Field("semester"), "text_format"),
+    ]),
+    "PORTO": compile_block([
+        ("merge", "B6:D6", "Mata Kuliah", "title_cpl_format"),
+        ("merge", "E6:{last_col}6", Field("matkul"), "text_cpl_format"),
+        ("merge", "B7:D7", "Kode Mata Kuliah", "title_cpl_format"),
+        ("merge", "E7:{last_col}7", Field("kode_matkul"), "text_cpl_format"),
+        ("merge", "B8:D8", "Kelas", "title_cpl_format"),
+        ("merge", "E8:{last_col}8", Field("kelas"), "text_cpl_format"),
+        ("merge", "B9:D9", "Semester", "title_cpl_format"),
+        ("merge", "E9:{last_col}9", Field("semester"), "text_cpl_format"),
+        ("merge", "B10:D10", "Tahun Ajaran", "title_cpl_format"),
+        ("merge", "E10:{last_col}10", Field("tahun_ajar"), "text_cpl_format"),
+    ]),
+}
+
+
+# Template Format dibuat sekali; tiap workbook cukup menyalinnya (lebih murah
+# daripada workbook.add_format yang mem-parse ulang dict properti)
+STYLE_TABLE = tuple((name, Format(props)) for name, props in FORMATS.items())
+
+
+def add_formats(workbook):
+    """Pasang semua style dari STYLE_TABLE ke satu workbook, hasilnya dict nama -> Format"""
+    formats = {}
+    for name, template in STYLE_TABLE:
+        cell_format = copy.copy(template)
+        cell_format.xf_format_indices = workbook.xf_format_indices
+        cell_format.dxf_format_indices = workbook.dxf_format_indices
+        workbook.formats.append(cell_format)
+        formats[name] = cell_format
+    # Index XF ditetapkan di awal dengan urutan tetap, supaya atribut s="N"
+    # di XML worksheet sama di semua workbook dan XML hasil cache tetap valid
+    for cell_format in formats.values():
+        cell_format._get_xf_index()
+    return formats
@@ -0,0 +1,44 @@
+"""
+Fixture bersama: data sintetis (benchmarks/synthetic.py) dan aplikasi Flask
+yang tidak menulis log, riwayat, maupun memulai thread/proses latar belakang.
+"""
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, "benchmarks"))
+
+import app as rps_app  # noqa: E402
+from synthetic import course_name, make_dataset  # noqa: E402
+
+TAHUN = "2025"
+SIZES = {"small": {"weeks": 8, "n_sub": 3, "n_cpl": 2}}
+MATKUL = course_name("small")
+
+
+@pytest.fixture(scope="session")
+def dataset(tmp_path_factory):
+    """(file kurikulum, folder upload) berisi satu mata kuliah sintetis kecil"""
+    return make_dataset(str(tmp_path_factory.mktemp("data")), TAHUN, SIZES)
+
+
+@pytest.fixture
+def make_app(dataset):
+    """Factory ``make_app(**config)``"""
+    curriculum_file, upload_folder = dataset
+
+    def make(**config):
+        return rps_app.create_app(dict({
+            "CURRICULUM_FILE": curriculum_file,
+            "UPLOAD_FOLDER": upload_folder,
+            "LOG_FILE": None,
+            "HISTORY_DB": None,
+            "CURRICULUM_WATCH": None,
+            "RENDER_PROCESSES": 0,
+            "DETERMINISTIC_OUTPUT": True,
+        }, **config))
+
+    return make
@@ -0,0 +1,29 @@
+from conftest import MATKUL
+
+
+def test_courses_etag_revalidates_with_304(make_app):
+    client = make_app().test_client()
+    response = client.get("/api/v1/courses")
+    assert response.status_code == 200
+    etag = response.headers["ETag"]
+    assert MATKUL in [course["nama"] for course in response.get_json()["courses"]]
+
+    response = client.get("/api/v1/courses", headers={"If-None-Match": etag})
+    assert response.status_code == 304
+    assert response.data == b""
+
+
+def test_stale_etag_gets_full_response(make_app):
+    client = make_app().test_client()
+    etag = client.get("/api/v1/courses").headers["ETag"]
+    response = client.get("/api/v1/courses", headers={"If-None-Match": '"api1-lama"'})
+    assert response.status_code == 200
+    assert response.headers["ETag"] == etag
+
+
+def test_versioned_url_is_immutable(make_app):
+    client = make_app().test_client()
+    version = client.get("/api/v1/courses").get_json()["version"]
+    response = client.get(f"/api/v1/courses/{MATKUL}?v={version}")
+    assert response.status_code == 200
+    assert "immutable" in response.headers["Cache-Control"]
@@ -0,0 +1,45 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+from conftest import MATKUL, ROOT, TAHUN
+
+# Dijalankan di proses terpisah supaya PYTHONHASHSEED (urutan set/dict
+# hash string) benar-benar berbeda antar render
+SCRIPT = """
+import sys
+sys.path.insert(0, {root!r})
+import app as rps_app
+flask_app = rps_app.create_app({{
+    "CURRICULUM_FILE": {curriculum_file!r}, "UPLOAD_FOLDER": {upload_folder!r},
+    "LOG_FILE": None, "HISTORY_DB": None, "CURRICULUM_WATCH": None,
+    "RENDER_PROCESSES": 0, "DETERMINISTIC_OUTPUT": True,
+}})
+response = flask_app.test_client().post("/download-rps", data={{
+    "nama_matkul": {matkul!r}, "tahun": {tahun!r}, "format": {output_format!r},
+}})
+assert response.status_code == 200, response.status_code
+sys.stdout.buffer.write(response.data)
+"""
+
+
+def render_with_hash_seed(dataset, output_format, seed):
+    curriculum_file, upload_folder = dataset
+    script = SCRIPT.format(
+        root=ROOT, curriculum_file=curriculum_file, upload_folder=upload_folder,
+        matkul=MATKUL, tahun=TAHUN, output_format=output_format,
+    )
+    result = subprocess.run(
+        [sys.executable, "-c", script], capture_output=True, check=True, cwd=ROOT,
+        env=dict(os.environ, PYTHONHASHSEED=str(seed)),
+    )
+    return result.stdout
+
+
+@pytest.mark.parametrize("output_format", ["xlsx", "zip"])
+def test_same_bytes_across_hash_seeds(dataset, output_format):
+    outputs = [render_with_hash_seed(dataset, output_format, seed) for seed in (0, 1, 12345)]
+    assert outputs[0]
+    assert outputs[0] == outputs[1] == outputs[2]
@@ -0,0 +1,82 @@
+import sqlite3
+
+import pytest
+
+from conftest import MATKUL, TAHUN
+import history
+from history import HistoryStore
+
+
+@pytest.fixture
+def store(tmp_path):
+    history = HistoryStore(str(tmp_path / "history.sqlite3"))
+    yield history
+    history.close()
+
+
+def test_writer_survives_database_error(store):
+    conn = sqlite3.connect(store.path)
+    conn.execute("CREATE TABLE generations (id INTEGER PRIMARY KEY, lain TEXT)")
+    conn.commit()
+    conn.close()
+
+    store.record({"ts": "2025-01-01T00:00:00", "matkul": "A"})
+    store.flush()
+    assert store.failed_batches == 1
+    assert store._thread.is_alive()
+
+    conn = sqlite3.connect(store.path)
+    conn.execute("DROP TABLE generations")
+    conn.commit()
+    conn.close()
+
+    store.record({"ts": "2025-01-01T00:00:01", "matkul": "B"})
+    store.flush()
+    assert [row["matkul"] for row in store.recent()] == ["B"]
+
+
+def test_writer_restarts_after_thread_stopped(store):
+    store.record({"ts": "2025-01-01T00:00:00", "matkul": "A"})
+    store.close()
+    assert not store._thread.is_alive()
+
+    store.record({"ts": "2025-01-01T00:00:01", "matkul": "B"})
+    store.flush()
+    assert [row["matkul"] for row in store.recent()] == ["B", "A"]
+
+
+def test_upload_replaced_before_hashing_records_no_hash(store, tmp_path, monkeypatch):
+    upload = tmp_path / "upload.xlsx"
+    upload.write_bytes(b"versi lama")
+    file_sha1 = history.file_sha1
+
+    def replaced_then_hashed(path):
+        # Upload ulang yang masuk setelah baris diantrekan, sebelum di-hash
+        upload.write_bytes(b"versi baru yang lebih panjang")
+        return file_sha1(path)
+
+    monkeypatch.setattr(history, "file_sha1", replaced_then_hashed)
+    store.record({"ts": "2025-01-01T00:00:00", "matkul": "A", "upload_path": str(upload)})
+    store.flush()
+    monkeypatch.setattr(history, "file_sha1", file_sha1)
+    store.record({"ts": "2025-01-01T00:00:01", "matkul": "A", "upload_path": str(upload)})
+    store.flush()
+
+    newest, oldest = store.recent()
+    assert oldest["upload_hash"] is None
+    assert newest["upload_hash"] == file_sha1(str(upload))
+
+
+@pytest.mark.parametrize("limit, status", [("-1", 400), ("0", 400), ("5", 200)])
+def test_history_limit_is_bounded(make_app, tmp_path, limit, status):
+    flask_app = make_app(HISTORY_DB=str(tmp_path / "history.sqlite3"), ADMIN_TOKEN="rahasia")
+    client = flask_app.test_client()
+    for _ in range(3):
+        client.post("/download-rps", data={"nama_matkul": MATKUL, "tahun": TAHUN}).close()
+    flask_app.extensions["history"].flush()
+    flask_app.config["HISTORY_MAX_RESULTS"] = 2
+
+    response = client.get(f"/admin/history?limit={limit}", headers={"X-Admin-Token": "rahasia"})
+    assert response.status_code == status
+    if status == 200:
+        assert len(response.get_json()) == 2
@@ -0,0 +1,56 @@
+import os
+import signal
+import time
+
+import pytest
+
+import app as rps_app
+from conftest import MATKUL, TAHUN
+
+pytestmark = pytest.mark.skipif(not hasattr(signal, "SIGKILL"), reason="butuh SIGKILL")
+
+FORM = {"nama_matkul": MATKUL, "tahun": TAHUN, "format": "zip"}
+
+
+@pytest.fixture
+def flask_app(make_app):
+    yield make_app(RENDER_PROCESSES=2)
+    if rps_app._render_pool is not None:
+        rps_app._render_pool.shutdown(cancel_futures=True)
+        rps_app._render_pool = None
+
+
+def kill_worker(pool):
+    os.kill(next(iter(pool._processes)), signal.SIGKILL)
+    # Pool baru ditandai rusak setelah thread manajernya melihat worker mati
+    deadline = time.monotonic() + 10
+    while not pool._broken and time.monotonic() < deadline:
+        time.sleep(0.05)
+    assert pool._broken
+
+
+def test_pool_recreated_after_worker_dies(flask_app):
+    client = flask_app.test_client()
+    first = client.post("/download-rps", data=FORM)
+    assert first.status_code == 200
+    pool = rps_app.get_render_pool(flask_app)
+
+    kill_worker(pool)
+
+    response = client.post("/download-rps", data=FORM)
+    assert response.status_code == 200
+    assert response.data == first.data
+    assert rps_app.get_render_pool(flask_app) is not pool
+
+
+def test_engine_falls_back_when_pool_stays_broken(flask_app, monkeypatch):
+    client = flask_app.test_client()
+    expected = client.post("/download-rps", data=FORM).data
+    pool = rps_app.get_render_pool(flask_app)
+    kill_worker(pool)
+    # Pool pengganti tidak pernah dibuat: engine harus render di proses ini
+    monkeypatch.setattr(flask_app.extensions["engine"], "_executor", pool)
+
+    response = client.post("/download-rps", data=FORM)
+    assert response.status_code == 200
+    assert response.data == expected
@@ -0,0 +1,63 @@
+import io
+from datetime import datetime
+
+import pytest
+
+import app as rps_app
+from conftest import MATKUL, TAHUN
+from layout import SheetPartCache, build_rps_context, render_workbook
+
+TODAY = datetime(2025, 1, 6)
+
+
+@pytest.fixture
+def context(make_app):
+    """Fungsi ``context(matkul_data=None)`` -> context render RPS mata kuliah sintetis"""
+    with make_app().app_context():
+        rps_data = rps_app.get_rps_data(MATKUL)
+        cpl_cpmk_sub = rps_app.get_cpl_cpmk_sub_list(MATKUL)
+        course = rps_app.get_matkul_data(MATKUL, TAHUN)
+
+    def build(matkul_data=None):
+        return build_rps_context(
+            MATKUL, TAHUN, rps_data, cpl_cpmk_sub, matkul_data or course, today=TODAY, deterministic=True,
+        )
+
+    build.course = course
+    return build
+
+
+def render(ctx, cache=None):
+    output = io.BytesIO()
+    render_workbook(output, ctx, cache=cache)
+    return output.getvalue()
+
+
+def test_cached_render_matches_uncached(context):
+    ctx = context()
+    cache = SheetPartCache()
+    first = render(ctx, cache)
+    misses = cache.misses
+    assert cache.hits == 0 and misses > 0
+
+    second = render(ctx, cache)
+    assert cache.hits == misses
+    assert cache.misses == misses
+    assert first == second == render(ctx)
+
+
+def test_changed_input_misses_only_affected_sheets(context):
+    cache = SheetPartCache()
+    render(context(), cache)
+    sheets = cache.misses
+
+    course = dict(context.course)
+    course["indikator_numbered"] = list(course["indikator_numbered"])
+    course["indikator_numbered"][0] = "1.1 Indikator diubah"
+    changed = context(course)
+    hits, misses = cache.hits, cache.misses
+    output = render(changed, cache)
+
+    assert 0 < cache.misses - misses < sheets
+    assert cache.hits - hits == sheets - (cache.misses - misses)
+    assert output == render(changed)
@@ -0,0 +1,220 @@
+"""
+Watcher file kurikulum: muat ulang snapshot di latar belakang tanpa restart.
+
+Folder tiap file kurikulum terdaftar (biasanya ``data/``) dipantau lewat
+inotify (Linux, lewat ``ctypes`` tanpa dependensi tambahan); di platform lain
+atau kalau inotify gagal dipasang, watcher memeriksa mtime/ukuran file secara
+berkala. Saat file berubah, ``CurriculumStore.reload`` mengompilasi workbook
+di thread watcher lalu menukar snapshot sekaligus. Request tidak ikut membaca
+file dan yang sedang berjalan tetap memakai snapshot lama sampai selesai.
+
+Hanya kurikulum yang sedang termuat (atau sedang degraded) yang dimuat ulang;
+kurikulum lain tetap dibaca saat pertama dipakai.
+"""
+import atexit
+import ctypes
+import ctypes.util
+import logging
+import os
+import select
+import struct
+import sys
+import threading
+import weakref
+
+logger = logging.getLogger("RPSGenerator.watcher")
+
+# Flag inotify (linux/inotify.h)
+IN_ATTRIB = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_Q_OVERFLOW = 0x00004000
+WATCH_MASK = IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE | IN_DELETE
+
+_EVENT = struct.Struct("iIII")
+
+# Event yang datang berurutan (copy file besar, editor yang menulis ulang)
+# ditunggu sampai tenang selama ini sebelum file dibaca
+SETTLE_SECONDS = 0.25
+
+
+class _Inotify:
+    """Deskriptor inotify atas beberapa folder"""
+
+    def __init__(self, folders):
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        self.fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 gagal")
+        self.folders = {}
+        try:
+            for folder in folders:
+                wd = libc.inotify_add_watch(self.fd, os.fsencode(folder), WATCH_MASK)
+                if wd < 0:
+                    raise OSError(ctypes.get_errno(), f"inotify_add_watch gagal untuk {folder}")
+                self.folders[wd] = folder
+        except OSError:
+            os.close(self.fd)
+            raise
+
+    def wait(self, timeout):
+        """Path yang berubah dalam ``timeout`` detik; None = antrean event meluap"""
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+        if not ready:
+            return set()
+        changed = set()
+        while True:
+            try:
+                data = os.read(self.fd, 64 * 1024)
+            except BlockingIOError:
+                return changed
+            offset = 0
+            while offset < len(data):
+                wd, mask, _, length = _EVENT.unpack_from(data, offset)
+                offset += _EVENT.size
+                name = data[offset:offset + length].rstrip(b"\0")
+                offset += length
+                if mask & IN_Q_OVERFLOW:
+                    return None
+                if wd in self.folders and name:
+                    changed.add(os.path.join(self.folders[wd], os.fsdecode(name)))
+
+    def close(self):
+        os.close(self.fd)
+
+
+class CurriculumWatcher:
+    """Thread latar belakang yang memanggil ``reload`` store kurikulum yang berubah.
+
+    ``mode`` = ``"auto"`` (inotify kalau bisa, selain itu polling),
+    ``"inotify"``, atau ``"poll"``; ``interval`` = jeda polling (detik).
+    """
+
+    def __init__(self, registry, mode="auto", interval=2.0):
+        if mode not in ("auto", "inotify", "poll"):
+            raise ValueError(f"Mode watcher tidak dikenal: {mode}")
+        self.registry = registry
+        self.mode = mode
+        self.interval = interval
+        self.backend = None
+        self.reloads = 0
+        self._thread = None
+        self._stop = None
+
+    def start(self):
+        if _disabled:
+            return self
+        self._stop = threading.Event()
+        inotify = None
+        if self.mode != "poll" and sys.platform.startswith("linux"):
+            folders = {os.path.dirname(os.path.abspath(path)) for path in self.registry.paths()}
+            try:
+                inotify = _Inotify(sorted(folder for folder in folders if os.path.isdir(folder)))
+            except (OSError, AttributeError) as e:
+                logger.warning("inotify tidak tersedia, memakai polling", extra={"error": str(e)})
+        if inotify is None and self.mode == "inotify":
+            raise OSError("inotify tidak tersedia")
+        self.backend = "inotify" if inotify is not None else "poll"
+        self.registry.set_watched(True)
+        self._thread = threading.Thread(
+            target=self._run, args=(inotify, self._stop), name="curriculum-watcher", daemon=True,
+        )
+        self._thread.start()
+        _watchers.add(self)
+        return self
+
+    def stop(self, timeout=5):
+        if self._thread is not None and self._thread.is_alive():
+            self._stop.set()
+            self._thread.join(timeout)
+        self._thread = None
+        self.registry.set_watched(False)
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def _run(self, inotify, stop):
+        # Perubahan selama watcher belum berjalan (mis. antara fork dan request
+        # pertama) tidak menghasilkan event inotify
+        self.check()
+        try:
+            while not stop.is_set():
+                if inotify is None:
+                    stop.wait(self.interval)
+                    changed = None
+                else:
+                    # Timeout tetap ada supaya kurikulum degraded dicoba lagi setelah backoff
+                    changed = inotify.wait(self.interval)
+                    if changed is not None:
+                        changed = {os.path.abspath(path) for path in changed}
+                        if not changed and not self._degraded():
+                            continue
+                        while True:
+                            more = inotify.wait(SETTLE_SECONDS)
+                            if not more:
+                                break
+                            changed.update(os.path.abspath(path) for path in more)
+                if not stop.is_set():
+                    self.check(changed)
+        finally:
+            if inotify is not None:
+                inotify.close()
+
+    def _degraded(self):
+        return any(store.failures for store in self.registry.stores())
+
+    def check(self, changed=None):
+        """Muat ulang store yang filenya ada di ``changed`` (None = periksa semua)"""
+        for store in self.registry.stores():
+            if store.current is None and not store.failures:
+                # Belum pernah dipakai atau sudah dilepas: dibaca saat dipakai lagi
+                continue
+            if changed is not None and os.path.abspath(store.path) not in changed and not store.failures:
+                continue
+            try:
+                if store.reload():
+                    self.reloads += 1
+            except Exception:
+                logger.exception("Watcher gagal memuat ulang kurikulum", extra={"path": store.path})
+
+    def _after_fork(self):
+        # Thread dan deskriptor inotify tidak ikut ter-fork. Hook fork hanya
+        # membuang state lama; watcher dimulai lagi oleh start_services saat
+        # proses anak melayani request pertamanya
+        self._thread = None
+        self._stop = None
+
+
+_watchers = weakref.WeakSet()
+# True di proses yang tidak melayani request (worker render), lihat disable_watchers
+_disabled = False
+
+
+def _reset_watchers_in_child():
+    for watcher in list(_watchers):
+        watcher._after_fork()
+
+
+def disable_watchers():
+    """Hentikan watcher warisan proses induk dan jangan mulai lagi di proses ini.
+
+    Dipanggil initializer worker render: worker tidak melayani request, jadi
+    tidak perlu memantau folder kurikulum maupun mengompilasi ulang workbook.
+    """
+    global _disabled
+    _disabled = True
+    for watcher in list(_watchers):
+        watcher.stop()
+    _watchers.clear()
+
+
+def _stop_watchers():
+    for watcher in list(_watchers):
+        watcher.stop()
+
+
+atexit.register(_stop_watchers)
+os.register_at_fork(after_in_child=_reset_watchers_in_child)
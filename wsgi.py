@@ -0,0 +1,12 @@
+"""
+Entry point WSGI untuk server produksi::
+
+    gunicorn --preload -w 4 wsgi:app
+
+Warm-up berjalan sekali saat modul ini diimpor (di proses master kalau
+``--preload``); pool proses render dan watcher kurikulum baru dimulai saat
+request pertama di tiap worker (``BACKGROUND_SERVICES``).
+"""
+from app import create_app
+
+app = create_app({"BACKGROUND_SERVICES": True})